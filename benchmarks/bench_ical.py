@@ -0,0 +1,132 @@
+"""
+Benchmark of the parsing of the Airbnb iCal feed.
+
+Compares the streaming ``iter_blocked_periods`` parser with building the full
+``ics.Calendar`` object model, on synthetic multi-year feeds where about a third
+of the events are blocked nights. ``ics`` is only needed by this benchmark.
+
+Usage:
+    python -m benchmarks.bench_ical
+    python -m benchmarks.bench_ical --scales 1000 --repeat 5
+"""
+
+import argparse
+import datetime
+import io
+import random
+from typing import Any, Callable, Dict, List
+
+from benchmarks.harness import (
+    BenchmarkResult,
+    batch_result,
+    peak_memory,
+    render_results,
+    time_call,
+    write_results,
+)
+from services.dataviz.src.get_blocked_days import BLOCKED_SUMMARY, iter_blocked_periods
+
+try:
+    from ics import Calendar
+except ImportError:  # pragma: no cover - optional benchmark dependency
+    Calendar = None
+
+
+def build_ical_feed(events: int, seed: int = 0) -> str:
+    """Return an Airbnb-like feed of ``events`` consecutive reservations and blocks."""
+    rng = random.Random(seed)
+    day = datetime.date(2020, 1, 1)
+    lines = [
+        "BEGIN:VCALENDAR",
+        "PRODID:-//Airbnb Inc//Hosting Calendar 1.0//EN",
+        "CALSCALE:GREGORIAN",
+        "VERSION:2.0",
+    ]
+    for index in range(events):
+        nights = rng.randint(1, 7)
+        end = day + datetime.timedelta(days=nights)
+        blocked = rng.random() < 1 / 3
+        lines += [
+            "BEGIN:VEVENT",
+            f"DTEND;VALUE=DATE:{end:%Y%m%d}",
+            f"DTSTART;VALUE=DATE:{day:%Y%m%d}",
+            f"UID:{index:08x}-bench@airbnb.com",
+        ]
+        if blocked:
+            lines.append(f"SUMMARY:{BLOCKED_SUMMARY}")
+        else:
+            lines += [
+                "DESCRIPTION:Reservation URL: https://www.airbnb.com/hosting/"
+                f"reservations/details/HM{index:08X}\\nPhone Number (Last 4 Digi",
+                " ts): 1234",
+                "SUMMARY:Reserved",
+            ]
+        lines.append("END:VEVENT")
+        day = end + datetime.timedelta(days=rng.randint(0, 3))
+    lines.append("END:VCALENDAR")
+    return "\r\n".join(lines) + "\r\n"
+
+
+def parse_streaming(feed: str) -> List[Dict[str, Any]]:
+    return list(iter_blocked_periods(io.StringIO(feed)))
+
+
+def parse_ics(feed: str) -> List[Dict[str, Any]]:
+    """The parsing of ``fetch_blocked_days_from_airbnb_ical`` before streaming."""
+    calendar = Calendar(feed)
+    return [
+        {
+            "start_date": event.begin.date(),
+            "end_date": event.end.date(),
+            "Name": event.name,
+        }
+        for event in calendar.events
+        if BLOCKED_SUMMARY in event.name
+    ]
+
+
+def bench_parser(
+    name: str,
+    parse: Callable[[str], List[Dict[str, Any]]],
+    feed: str,
+    events: int,
+    repeat: int,
+) -> BenchmarkResult:
+    latencies = [time_call(lambda: parse(feed)) for _ in range(repeat)]
+    return batch_result(name, events, latencies, peak_memory(lambda: parse(feed)))
+
+
+def main() -> None:
+    arg_parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    arg_parser.add_argument("--scales", type=int, nargs="+", default=[100, 1_000])
+    arg_parser.add_argument("--repeat", type=int, default=5)
+    arg_parser.add_argument("--seed", type=int, default=0)
+    arg_parser.add_argument("--output", help="Path of the JSON result file.")
+    args = arg_parser.parse_args()
+
+    parsers = [("streaming", parse_streaming)]
+    if Calendar is None:
+        print("ics is not installed, only the streaming parser is measured.")
+    else:
+        parsers.insert(0, ("ics.Calendar", parse_ics))
+
+    results: List[BenchmarkResult] = []
+    for scale in args.scales:
+        feed = build_ical_feed(scale, seed=args.seed)
+        if Calendar is not None:
+            ordered = sorted(parse_ics(feed), key=lambda row: row["start_date"])
+            if ordered != parse_streaming(feed):
+                raise SystemExit("The parsers disagree on the blocked periods.")
+        scale_results = [
+            bench_parser(name, parse, feed, scale, args.repeat)
+            for name, parse in parsers
+        ]
+        print(render_results(f"iCal parsing (scale {scale})", scale_results))
+        results.extend(scale_results)
+
+    path = write_results("ical", results, args.output)
+    print(f"Results written to {path}")
+
+
+if __name__ == "__main__":
+    main()
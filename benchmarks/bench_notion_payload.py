@@ -0,0 +1,131 @@
+"""
+Microbenchmark of the serialization of reservations to Notion page properties.
+
+Compares ``RESERVATION_SCHEMA.serialize`` (compiled once) with the previous
+approach of ``create_page``, which rebuilt a mapping of lambdas for every page.
+No API call is made.
+
+Usage:
+    python -m benchmarks.bench_notion_payload
+    python -m benchmarks.bench_notion_payload --scales 1000 --repeat 5
+"""
+
+import argparse
+import datetime
+import itertools
+from typing import Any, Callable, Dict, List
+
+from benchmarks.corpus import build_reservation_mails, confirmation_code
+from benchmarks.harness import (
+    BenchmarkResult,
+    batch_result,
+    peak_memory,
+    quiet,
+    render_results,
+    time_call,
+    write_results,
+)
+from services.mail_processing.parser import Parser
+from services.notion_client.schema import RESERVATION_FIELDS, RESERVATION_SCHEMA
+
+# Number of distinct parsed mails the larger batches are built from.
+SAMPLE_SIZE = 100
+
+
+def build_reservations(count: int, seed: int = 0) -> List[Dict[str, Any]]:
+    """Return ``count`` reservations shaped like the output of step 2."""
+    samples = []
+    with quiet():
+        for mail in build_reservation_mails(min(count, SAMPLE_SIZE), seed=seed):
+            samples.append(Parser(mail).parse_reservation().to_json())
+    reservations = []
+    first_day = datetime.date(2024, 1, 1)
+    for index, sample in zip(range(count), itertools.cycle(samples)):
+        reservation = dict(sample)
+        arrival = first_day + datetime.timedelta(days=index)
+        reservation["arrival_date"] = arrival.isoformat()
+        reservation["departure_date"] = (
+            arrival + datetime.timedelta(days=int(sample["number_of_nights"]))
+        ).isoformat()
+        reservation["confirmation_code"] = confirmation_code(index)
+        reservation["message_id"] = f"msg{index}"
+        reservations.append(reservation)
+    return reservations
+
+
+def legacy_serialize(reservation: Dict[str, Any]) -> Dict[str, Any]:
+    """The serialization of ``create_page`` before the compiled schema."""
+    builders = {
+        "date": lambda v: {"date": {"start": v}},
+        "number": lambda v: {"number": v},
+        "rich_text": lambda v: {"rich_text": [{"text": {"content": v}}]},
+        "title": lambda v: {"title": [{"text": {"content": v}}]},
+        "select": lambda v: {"select": {"name": v}},
+    }
+    property_mapping = {
+        field: (notion_key, builders[notion_type])
+        for field, (notion_key, notion_type) in RESERVATION_FIELDS.items()
+    }
+    props = {}
+    for field, value in reservation.items():
+        if field in property_mapping and value is not None:
+            notion_key, builder = property_mapping[field]
+            props[notion_key] = builder(value)
+    return props
+
+
+def bench_serializer(
+    name: str,
+    serialize: Callable[[Dict[str, Any]], Dict[str, Any]],
+    reservations: List[Dict[str, Any]],
+    repeat: int,
+) -> BenchmarkResult:
+    def serialize_all():
+        for reservation in reservations:
+            serialize(reservation)
+
+    latencies = [time_call(serialize_all) for _ in range(repeat)]
+    result = batch_result(
+        name, len(reservations), latencies, peak_memory(serialize_all)
+    )
+    result.extra["us_per_page"] = (
+        result.latency_ms["p50"] * 1000 / len(reservations) if reservations else 0.0
+    )
+    return result
+
+
+def main() -> None:
+    arg_parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    arg_parser.add_argument(
+        "--scales", type=int, nargs="+", default=[1_000, 10_000, 100_000]
+    )
+    arg_parser.add_argument("--repeat", type=int, default=5)
+    arg_parser.add_argument("--seed", type=int, default=0)
+    arg_parser.add_argument("--output", help="Path of the JSON result file.")
+    args = arg_parser.parse_args()
+
+    results: List[BenchmarkResult] = []
+    for scale in args.scales:
+        reservations = build_reservations(scale, seed=args.seed)
+        scale_results = [
+            bench_serializer(
+                "legacy_mapping", legacy_serialize, reservations, args.repeat
+            ),
+            bench_serializer(
+                "schema.serialize",
+                RESERVATION_SCHEMA.serialize,
+                reservations,
+                args.repeat,
+            ),
+        ]
+        print(render_results(f"Notion payload (scale {scale})", scale_results))
+        for result in scale_results:
+            print(f"{result.name}: {result.extra['us_per_page']:.2f} µs/page")
+        results.extend(scale_results)
+
+    path = write_results("notion_payload", results, args.output)
+    print(f"Results written to {path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,118 @@
+"""
+Benchmark of the worst-case search time of the ``Parser`` patterns.
+
+Runs every field pattern of every supported language on the malformed bodies
+of ``corpus.build_adversarial_bodies`` (long digit, separator, whitespace and
+letter runs after the field labels, floods of labels) and reports the slowest
+search of each pattern, next to the time of a whole ``Parser.extract``. The
+command exits with a non-zero status when a search takes longer than
+``--max-ms``, so it can run in CI.
+
+Usage:
+    python -m benchmarks.bench_patterns
+    python -m benchmarks.bench_patterns --size 1000000 --max-ms 200
+"""
+
+import argparse
+import sys
+from typing import Dict, List, Tuple
+
+from benchmarks.corpus import build_adversarial_bodies
+from benchmarks.harness import (
+    BenchmarkResult,
+    per_item_result,
+    quiet,
+    render_results,
+    time_call,
+    write_results,
+)
+from services.mail_processing.parser import Parser
+
+# (name, slowest body, seconds) of one pattern or extraction.
+WorstCase = Tuple[str, str, float]
+
+
+def body_latencies(search, bodies: Dict[str, str], repeat: int) -> Dict[str, float]:
+    """Return the slowest of ``repeat`` calls of ``search`` on every body."""
+    return {
+        name: max(time_call(lambda: search(body)) for _ in range(repeat))
+        for name, body in bodies.items()
+    }
+
+
+def _extract(language: str):
+    def extract(body: str) -> None:
+        parser = Parser({"Message_body": body}, time_budget=None)
+        parser.language = language
+        with quiet():
+            parser.extract()
+
+    return extract
+
+
+def bench_patterns(
+    bodies: Dict[str, str], repeat: int = 1
+) -> Tuple[List[BenchmarkResult], List[WorstCase]]:
+    """
+    Time every pattern and the whole extraction of every language on ``bodies``.
+
+    Returns:
+        Tuple[List[BenchmarkResult], List[WorstCase]]: One result per pattern
+        and per extraction, and the worst case of each.
+    """
+    results, worst_cases = [], []
+    for language in Parser.SUPPORTED_LANGUAGES:
+        searches = {
+            f"{language}.{field}": pattern.search
+            for field, pattern in Parser.get_language_patterns(language).items()
+        }
+        searches[f"{language}.extract"] = _extract(language)
+        for name, search in searches.items():
+            latencies = body_latencies(search, bodies, repeat)
+            body, seconds = max(latencies.items(), key=lambda item: item[1])
+            result = per_item_result(name, list(latencies.values()))
+            result.extra["worst_body"] = body
+            results.append(result)
+            worst_cases.append((name, body, seconds))
+    return results, worst_cases
+
+
+def slow_patterns(worst_cases: List[WorstCase], max_seconds: float) -> List[WorstCase]:
+    """Return the pattern searches slower than ``max_seconds``."""
+    return [
+        case
+        for case in worst_cases
+        if not case[0].endswith(".extract") and case[2] > max_seconds
+    ]
+
+
+def main() -> None:
+    arg_parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    arg_parser.add_argument("--size", type=int, default=100_000)
+    arg_parser.add_argument("--repeat", type=int, default=3)
+    arg_parser.add_argument(
+        "--max-ms",
+        type=float,
+        default=50.0,
+        help="Slowest search allowed to a pattern, in milliseconds.",
+    )
+    arg_parser.add_argument("--output", help="Path of the JSON result file.")
+    args = arg_parser.parse_args()
+
+    bodies = build_adversarial_bodies(args.size)
+    results, worst_cases = bench_patterns(bodies, args.repeat)
+    print(render_results(f"Parser patterns ({args.size} characters)", results))
+    for name, body, seconds in worst_cases:
+        print(f"{name}: worst {seconds * 1000:.2f} ms on {body}")
+
+    path = write_results("patterns", results, args.output)
+    print(f"Results written to {path}")
+
+    slow = slow_patterns(worst_cases, args.max_ms / 1000)
+    for name, body, seconds in slow:
+        print(f"SLOW {name}: {seconds * 1000:.2f} ms on {body} (> {args.max_ms} ms)")
+    sys.exit(1 if slow else 0)
+
+
+if __name__ == "__main__":
+    main()
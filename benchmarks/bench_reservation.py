@@ -0,0 +1,143 @@
+"""
+Benchmark of the memory used by parsed reservations.
+
+Builds large backfills of reservations shaped like the output of step 2, once
+as the JSON dicts of ``ParsedReservation.to_json`` and once as slotted
+``ParsedReservation`` records, and compares their memory
+per record and the cost of serializing them to Notion properties. No API call
+is made.
+
+Usage:
+    python -m benchmarks.bench_reservation
+    python -m benchmarks.bench_reservation --scales 100000 --repeat 3
+"""
+
+import argparse
+import dataclasses
+import datetime
+import itertools
+from typing import Any, Callable, Dict, List
+
+from benchmarks.corpus import build_reservation_mails, confirmation_code
+from benchmarks.harness import (
+    BenchmarkResult,
+    batch_result,
+    peak_memory,
+    quiet,
+    render_results,
+    time_call,
+    write_results,
+)
+from services.mail_processing.parser import Parser
+from services.mail_processing.reservation import ParsedReservation
+from services.notion_client.schema import RESERVATION_SCHEMA
+
+# Number of distinct parsed mails the backfills are built from.
+SAMPLE_SIZE = 100
+
+FIRST_DAY = datetime.date(2024, 1, 1)
+
+
+def parse_samples(count: int, seed: int = 0) -> List[Parser]:
+    with quiet():
+        return [Parser(mail) for mail in build_reservation_mails(count, seed=seed)]
+
+
+def dict_records(parsers: List[Parser], count: int) -> List[Dict[str, Any]]:
+    """Reservations as plain dicts of JSON values."""
+    with quiet():
+        samples = [parser.parse_reservation().to_json() for parser in parsers]
+    records = []
+    for index, sample in zip(range(count), itertools.cycle(samples)):
+        record = dict(sample)
+        arrival = FIRST_DAY + datetime.timedelta(days=index)
+        record["arrival_date"] = arrival.isoformat()
+        record["departure_date"] = (
+            arrival + datetime.timedelta(days=int(sample["number_of_nights"]))
+        ).isoformat()
+        record["confirmation_code"] = confirmation_code(index)
+        record["message_id"] = f"msg{index}"
+        records.append(record)
+    return records
+
+
+def typed_records(parsers: List[Parser], count: int) -> List[ParsedReservation]:
+    with quiet():
+        samples = [parser.parse_reservation() for parser in parsers]
+    records = []
+    for index, sample in zip(range(count), itertools.cycle(samples)):
+        arrival = FIRST_DAY + datetime.timedelta(days=index)
+        records.append(
+            dataclasses.replace(
+                sample,
+                arrival_date=arrival,
+                departure_date=arrival
+                + datetime.timedelta(days=sample.number_of_nights or 0),
+                confirmation_code=confirmation_code(index),
+                message_id=f"msg{index}",
+            )
+        )
+    return records
+
+
+def bench_records(
+    name: str,
+    build: Callable[[List[Parser], int], List[Any]],
+    serialize: Callable[[Any], Dict[str, Any]],
+    parsers: List[Parser],
+    scale: int,
+    repeat: int,
+) -> BenchmarkResult:
+    peak = peak_memory(lambda: build(parsers, scale))
+    records = build(parsers, scale)
+
+    def serialize_all():
+        for record in records:
+            serialize(record)
+
+    latencies = [time_call(serialize_all) for _ in range(repeat)]
+    result = batch_result(name, scale, latencies, peak)
+    result.extra["bytes_per_record"] = peak / scale
+    return result
+
+
+def main() -> None:
+    arg_parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    arg_parser.add_argument("--scales", type=int, nargs="+", default=[10_000, 100_000])
+    arg_parser.add_argument("--repeat", type=int, default=3)
+    arg_parser.add_argument("--seed", type=int, default=0)
+    arg_parser.add_argument("--output", help="Path of the JSON result file.")
+    args = arg_parser.parse_args()
+
+    parsers = parse_samples(SAMPLE_SIZE, seed=args.seed)
+    results: List[BenchmarkResult] = []
+    for scale in args.scales:
+        scale_results = [
+            bench_records(
+                "dict",
+                dict_records,
+                RESERVATION_SCHEMA.serialize,
+                parsers,
+                scale,
+                args.repeat,
+            ),
+            bench_records(
+                "ParsedReservation",
+                typed_records,
+                ParsedReservation.to_notion,
+                parsers,
+                scale,
+                args.repeat,
+            ),
+        ]
+        print(render_results(f"Parsed reservations (scale {scale})", scale_results))
+        for result in scale_results:
+            print(f"{result.name}: {result.extra['bytes_per_record']:.0f} bytes/record")
+        results.extend(scale_results)
+
+    path = write_results("reservation", results, args.output)
+    print(f"Results written to {path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,142 @@
+"""
+Benchmark of the shared HTTP transport.
+
+Sends sequential and concurrent requests to a local stand-in server with a
+fresh connection per request (the previous ``requests.get`` / one client per
+call behaviour) and through the pooled ``get_http_client`` transport. The
+server sleeps ``--handshake-ms`` on every new connection to stand in for the
+TCP + TLS handshake of a remote API, so no network access is needed.
+
+Usage:
+    python -m benchmarks.bench_transport
+    python -m benchmarks.bench_transport --requests 200 --handshake-ms 30
+"""
+
+import argparse
+import socket
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Iterator, List
+
+import httpx
+
+from benchmarks.harness import (
+    BenchmarkResult,
+    per_item_result,
+    render_results,
+    write_results,
+)
+from services.transport import http_client
+
+BODY = b'{"object": "list", "results": [], "has_more": false}'
+
+
+class StandInHandler(BaseHTTPRequestHandler):
+    """Answers every GET with a small JSON body, keeping connections alive."""
+
+    protocol_version = "HTTP/1.1"
+    handshake_seconds = 0.0
+    connections = 0
+    _lock = threading.Lock()
+
+    def setup(self) -> None:
+        with StandInHandler._lock:
+            StandInHandler.connections += 1
+        time.sleep(self.handshake_seconds)
+        super().setup()
+        # Headers and body are written separately: without this, Nagle and
+        # delayed ACKs add ~40 ms to every request on a reused connection.
+        self.connection.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+
+    def do_GET(self) -> None:
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(BODY)))
+        self.end_headers()
+        self.wfile.write(BODY)
+
+    def log_message(self, format, *args) -> None:
+        pass
+
+
+@contextmanager
+def stand_in_server(handshake_ms: float) -> Iterator[str]:
+    StandInHandler.handshake_seconds = handshake_ms / 1000
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StandInHandler)
+    server.daemon_threads = True
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    try:
+        yield f"http://127.0.0.1:{server.server_address[1]}/v1/databases/query"
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+def fresh_connection_get(url: str) -> None:
+    with httpx.Client(timeout=http_client.DEFAULT_TIMEOUT) as client:
+        client.get(url).raise_for_status()
+
+
+def pooled_get(url: str) -> None:
+    http_client.get_http_client().get(url).raise_for_status()
+
+
+def _timed(get: Callable[[str], None], url: str) -> float:
+    start = time.perf_counter()
+    get(url)
+    return time.perf_counter() - start
+
+
+def bench_get(
+    name: str, get: Callable[[str], None], url: str, requests: int, workers: int
+) -> BenchmarkResult:
+    StandInHandler.connections = 0
+    if workers == 1:
+        latencies = [_timed(get, url) for _ in range(requests)]
+    else:
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            latencies = list(executor.map(lambda _: _timed(get, url), range(requests)))
+    result = per_item_result(name, latencies)
+    result.extra["connections"] = StandInHandler.connections
+    result.extra["workers"] = workers
+    return result
+
+
+def main() -> None:
+    arg_parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    arg_parser.add_argument("--requests", type=int, default=100)
+    arg_parser.add_argument("--workers", type=int, nargs="+", default=[1, 4])
+    arg_parser.add_argument("--handshake-ms", type=float, default=20.0)
+    arg_parser.add_argument("--output", help="Path of the JSON result file.")
+    args = arg_parser.parse_args()
+
+    results: List[BenchmarkResult] = []
+    with stand_in_server(args.handshake_ms) as url:
+        for workers in args.workers:
+            http_client.close_transport()
+            scale_results = [
+                bench_get(
+                    "fresh_connection",
+                    fresh_connection_get,
+                    url,
+                    args.requests,
+                    workers,
+                ),
+                bench_get("shared_transport", pooled_get, url, args.requests, workers),
+            ]
+            print(render_results(f"HTTP GET ({workers} worker(s))", scale_results))
+            for result in scale_results:
+                print(f"{result.name}: {result.extra['connections']} connection(s)")
+            results.extend(scale_results)
+    http_client.close_transport()
+
+    path = write_results("transport", results, args.output)
+    print(f"Results written to {path}")
+
+
+if __name__ == "__main__":
+    main()
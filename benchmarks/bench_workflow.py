@@ -0,0 +1,176 @@
+"""
+End-to-end benchmarks of the mail processing workflow on synthetic corpora.
+
+Measures ``Parser.parse_reservation``, ``MailProcessorService.parse_reserved_mails``,
+``MailProcessorService.quality_check`` and the full ``run_workflow`` against the
+in-memory backends of ``benchmarks.fakes``. ``parse_reserved_mails`` is reported
+with an empty (cold) and a filled (warm) parse cache.
+
+Usage:
+    python -m benchmarks.bench_workflow
+    python -m benchmarks.bench_workflow --scales 10 1000 --workflow-scales 10
+"""
+
+import argparse
+import contextlib
+import os
+import tempfile
+from collections import Counter
+from typing import Dict, Iterator, List
+from unittest import mock
+
+from benchmarks.corpus import build_reservation_mails
+from benchmarks.fakes import fake_backends
+from benchmarks.harness import (
+    BenchmarkResult,
+    batch_result,
+    peak_memory,
+    per_item_result,
+    quiet,
+    render_results,
+    time_call,
+    write_results,
+)
+from services.mail_processing.mail_processor import MailProcessorService
+from services.mail_processing.parser import Parser
+
+
+def bench_parse_reservation(mails: List[Dict[str, str]]) -> BenchmarkResult:
+    def parse_all():
+        for mail in mails:
+            Parser(mail).parse_reservation()
+
+    with quiet():
+        latencies = [
+            time_call(lambda: Parser(mail).parse_reservation()) for mail in mails
+        ]
+        peak = peak_memory(parse_all)
+    return per_item_result("parse_reservation", latencies, peak)
+
+
+def _tag_reserved(backends) -> None:
+    gmail = backends["gmail"]
+    for message in gmail.store.values():
+        message["labelIds"].add("Label_reserved")
+
+
+@contextlib.contextmanager
+def _fresh_state() -> Iterator[None]:
+    """Point the journal, the ledger and the parse cache at empty files."""
+    with tempfile.TemporaryDirectory() as state_dir, mock.patch.dict(
+        os.environ,
+        {
+            "WORKFLOW_JOURNAL_PATH": os.path.join(state_dir, "journal.jsonl"),
+            "MAIL_LEDGER_PATH": os.path.join(state_dir, "ledger.sqlite3"),
+            "PARSE_CACHE_PATH": os.path.join(state_dir, "parse_cache.sqlite3"),
+        },
+    ):
+        yield
+
+
+def _time_parse(processor: MailProcessorService) -> float:
+    try:
+        return time_call(processor.parse_reserved_mails)
+    finally:
+        processor.close()
+
+
+def bench_parse_reserved_mails(
+    mails: List[Dict[str, str]], repeat: int
+) -> List[BenchmarkResult]:
+    """
+    Time ``parse_reserved_mails`` with an empty parse cache (cold) and with
+    the cache filled by an earlier run (warm).
+
+    Every sample gets its own processor, so its run journal is empty.
+    """
+    cold, warm = [], []
+    with fake_backends(mails) as backends, quiet():
+        _tag_reserved(backends)
+        for _ in range(repeat):
+            with _fresh_state():
+                cold.append(_time_parse(MailProcessorService()))
+        with _fresh_state():
+            _time_parse(MailProcessorService())
+            for _ in range(repeat):
+                warm.append(_time_parse(MailProcessorService()))
+        with _fresh_state():
+            processor = MailProcessorService()
+            peak = peak_memory(processor.parse_reserved_mails)
+            processor.close()
+    return [
+        batch_result("parse_reserved_mails (cold)", len(mails), cold, peak),
+        batch_result("parse_reserved_mails (warm)", len(mails), warm),
+    ]
+
+
+def bench_quality_check(mails: List[Dict[str, str]], repeat: int) -> BenchmarkResult:
+    latencies = []
+    with fake_backends(mails) as backends, quiet():
+        _tag_reserved(backends)
+        for _ in range(repeat):
+            with _fresh_state():
+                processor = MailProcessorService()
+                reservations = processor.parse_reserved_mails()
+                latencies.append(
+                    time_call(lambda: processor.quality_check(reservations))
+                )
+                peak = peak_memory(lambda: processor.quality_check(reservations))
+                processor.close()
+    return batch_result("quality_check", len(mails), latencies, peak)
+
+
+def bench_run_workflow(mails: List[Dict[str, str]], repeat: int) -> BenchmarkResult:
+    latencies = []
+    calls: Counter = Counter()
+    for _ in range(repeat):
+        # The workflow consumes its inbox, so every repetition gets fresh fakes.
+        with fake_backends(mails) as backends, quiet():
+            processor = MailProcessorService()
+            latencies.append(time_call(processor.run_workflow))
+            for backend in backends.values():
+                calls += Counter(backend.calls)
+    with fake_backends(mails), quiet():
+        processor = MailProcessorService()
+        peak = peak_memory(processor.run_workflow)
+    result = batch_result("run_workflow", len(mails), latencies, peak)
+    result.extra["api_calls"] = dict(calls)
+    return result
+
+
+def main() -> None:
+    arg_parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    arg_parser.add_argument(
+        "--scales", type=int, nargs="+", default=[10, 1_000, 100_000]
+    )
+    arg_parser.add_argument(
+        "--workflow-scales",
+        type=int,
+        nargs="+",
+        default=[10, 1_000],
+        help="Scales for run_workflow (calendar existence checks are linear per event).",
+    )
+    arg_parser.add_argument("--repeat", type=int, default=3)
+    arg_parser.add_argument("--seed", type=int, default=0)
+    arg_parser.add_argument("--output", help="Path of the JSON result file.")
+    args = arg_parser.parse_args()
+
+    results: List[BenchmarkResult] = []
+    for scale in sorted(set(args.scales) | set(args.workflow_scales)):
+        mails = build_reservation_mails(scale, seed=args.seed)
+        scale_results = []
+        if scale in args.scales:
+            scale_results.append(bench_parse_reservation(mails))
+            scale_results.extend(bench_parse_reserved_mails(mails, args.repeat))
+            scale_results.append(bench_quality_check(mails, args.repeat))
+        if scale in args.workflow_scales:
+            scale_results.append(bench_run_workflow(mails, args.repeat))
+        print(render_results(f"Workflow benchmarks (scale {scale})", scale_results))
+        results.extend(scale_results)
+
+    path = write_results("workflow", results, args.output)
+    print(f"Results written to {path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,65 @@
+"""
+Compare two benchmark result files and flag regressions.
+
+Usage:
+    python -m benchmarks.compare benchmarks/results/workflow-0.4.3.json new.json
+"""
+
+import argparse
+import json
+import sys
+from typing import Dict, Tuple
+
+from rich.console import Console
+from rich.table import Table
+
+
+def _index(path: str) -> Dict[Tuple[str, int], dict]:
+    with open(path) as result_file:
+        document = json.load(result_file)
+    return {(r["name"], r["scale"]): r for r in document["results"]}
+
+
+def main() -> None:
+    arg_parser = argparse.ArgumentParser(description="Compare benchmark results.")
+    arg_parser.add_argument("baseline")
+    arg_parser.add_argument("candidate")
+    arg_parser.add_argument(
+        "--threshold",
+        type=float,
+        default=0.10,
+        help="Relative p50 slowdown reported as a regression (default 10%%).",
+    )
+    args = arg_parser.parse_args()
+
+    baseline = _index(args.baseline)
+    candidate = _index(args.candidate)
+    table = Table(title=f"{args.baseline} -> {args.candidate}")
+    for column in ["Benchmark", "Scale", "p50 ms", "p50 change", "Peak change"]:
+        table.add_column(column)
+
+    regressions = 0
+    for key in sorted(baseline.keys() & candidate.keys()):
+        old, new = baseline[key], candidate[key]
+        old_p50, new_p50 = old["latency_ms"]["p50"], new["latency_ms"]["p50"]
+        change = (new_p50 - old_p50) / old_p50 if old_p50 else 0.0
+        peak_change = "-"
+        if old.get("peak_memory_bytes") and new.get("peak_memory_bytes"):
+            ratio = new["peak_memory_bytes"] / old["peak_memory_bytes"] - 1
+            peak_change = f"{ratio:+.1%}"
+        style = "red" if change > args.threshold else None
+        regressions += change > args.threshold
+        table.add_row(
+            key[0],
+            str(key[1]),
+            f"{old_p50:.3f} -> {new_p50:.3f}",
+            f"{change:+.1%}",
+            peak_change,
+            style=style,
+        )
+    Console().print(table)
+    sys.exit(1 if regressions else 0)
+
+
+if __name__ == "__main__":
+    main()
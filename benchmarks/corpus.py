@@ -0,0 +1,318 @@
+"""
+Synthetic Airbnb reservation e-mails used by the benchmark suite.
+
+The generated mails mirror the forwarded confirmation e-mails handled by
+``Parser`` (same headers, same body layout, same money formatting) so every
+field pattern matches. Stays are laid out back to back with a small gap so
+that large corpora do not trip the calendar conflict checks.
+"""
+
+import datetime
+import random
+import string
+from typing import Dict, Iterator, List
+
+FR_WEEKDAYS = ["lun", "mar", "mer", "jeu", "ven", "sam", "dim"]
+FR_WEEKDAYS_LONG = [
+    "lundi",
+    "mardi",
+    "mercredi",
+    "jeudi",
+    "vendredi",
+    "samedi",
+    "dimanche",
+]
+FR_MONTHS = [
+    "janv",
+    "févr",
+    "mars",
+    "avr",
+    "mai",
+    "juin",
+    "juil",
+    "août",
+    "sept",
+    "oct",
+    "nov",
+    "déc",
+]
+FR_MONTHS_LONG = [
+    "janvier",
+    "février",
+    "mars",
+    "avril",
+    "mai",
+    "juin",
+    "juillet",
+    "août",
+    "septembre",
+    "octobre",
+    "novembre",
+    "décembre",
+]
+EN_WEEKDAYS = ["Mon", "Tue", "Wed", "Thu", "Fri", "Sat", "Sun"]
+EN_MONTHS = [
+    "Jan",
+    "Feb",
+    "Mar",
+    "Apr",
+    "May",
+    "Jun",
+    "Jul",
+    "Aug",
+    "Sep",
+    "Oct",
+    "Nov",
+    "Dec",
+]
+
+FIRST_NAMES = ["Kurt", "Orwis", "Léa", "Anthony", "Maria", "João", "Lena", "Hiro"]
+LAST_NAMES = ["Pihl", "Huang", "Dubois", "Pinto", "García", "Silva", "Obst", "Sato"]
+LOCATIONS = [
+    ("Copenhague", "Danemark"),
+    ("Shanghai", "China"),
+    ("Lyon", "France"),
+    ("Madrid", "Spain"),
+    ("Porto", "Portugal"),
+    ("Tokyo", "Japan"),
+]
+LOCATION_IMAGE = (
+    "[https://a0.muscache.com/im/pictures/d109f44f-35a7-4336-9420-750576bec06f.jpg]"
+)
+CODE_ALPHABET = string.digits + string.ascii_uppercase
+
+
+def confirmation_code(index: int) -> str:
+    """Return a unique 10 character confirmation code for ``index``."""
+    digits = []
+    for _ in range(8):
+        index, remainder = divmod(index, len(CODE_ALPHABET))
+        digits.append(CODE_ALPHABET[remainder])
+    return "HM" + "".join(reversed(digits))
+
+
+def format_amount_fr(value: float) -> str:
+    """Format ``value`` the way French Airbnb mails do (``1\u202f388,66``)."""
+    integer, decimals = f"{value:.2f}".split(".")
+    groups = []
+    while len(integer) > 3:
+        groups.insert(0, integer[-3:])
+        integer = integer[:-3]
+    groups.insert(0, integer)
+    return "\u202f".join(groups) + "," + decimals
+
+
+def format_amount_en(value: float) -> str:
+    """Format ``value`` the way English Airbnb mails do (``1,388.66``)."""
+    return f"{value:,.2f}"
+
+
+def _stay_amounts(rng: random.Random, nights: int) -> Dict[str, float]:
+    price = round(rng.uniform(60, 400), 2)
+    total_nights = round(price * nights, 2)
+    cleaning = float(rng.choice([15, 30, 50, 65]))
+    guest_fee = round(total_nights * 0.14, 2)
+    host_fee = round((total_nights + cleaning) * 0.036, 2)
+    tourist_tax = round(total_nights * 0.05, 2)
+    return {
+        "price": price,
+        "total_nights": total_nights,
+        "cleaning": cleaning,
+        "guest_fee": guest_fee,
+        "host_fee": host_fee,
+        "tourist_tax": tourist_tax,
+        "guest_payout": round(total_nights + cleaning + guest_fee + tourist_tax, 2),
+        "host_payout": round(total_nights + cleaning - host_fee, 2),
+    }
+
+
+def _french_mail(index, rng, arrival, departure, mail_date) -> Dict[str, str]:
+    first, last = rng.choice(FIRST_NAMES), rng.choice(LAST_NAMES)
+    city, country = rng.choice(LOCATIONS)
+    nights = (departure - arrival).days
+    adults = rng.randint(1, 4)
+    amounts = _stay_amounts(rng, nights)
+    sent = (
+        f"Envoyé : {FR_WEEKDAYS_LONG[mail_date.weekday()]} {mail_date.day} "
+        f"{FR_MONTHS_LONG[mail_date.month - 1]} {mail_date.year} 11:37:12 "
+        "(UTC+01:00) Brussels, Copenhagen, Madrid, Paris"
+    )
+    headline = (
+        f"{first} {last} arrive le {arrival.day} {FR_MONTHS_LONG[arrival.month - 1]}"
+    )
+    body = (
+        f"________________________________\r\nDe : Airbnb \r\n{sent}\r\n"
+        f"À : host@example.com \r\nSujet : Réservation confirmée : {headline}\r\n\r\n\r\n"
+        f"[Airbnb]\r\nNouvelle réservation confirmée ! {first} arrive le {arrival.day} "
+        f"{FR_MONTHS_LONG[arrival.month - 1]}\r\n\r\n"
+        f"{LOCATION_IMAGE}{city}, {country}\r\n\r\nEnvoyez un message à {first}\r\n\r\n"
+        f"Arrivée\r\n\r\n{FR_WEEKDAYS[arrival.weekday()]}. {arrival.day} "
+        f"{FR_MONTHS[arrival.month - 1]}. {arrival.year}\r\n\r\n15:00\r\n\r\n"
+        f"Départ\r\n\r\n{FR_WEEKDAYS[departure.weekday()]}. {departure.day} "
+        f"{FR_MONTHS[departure.month - 1]}. {departure.year}\r\n\r\n11:00\r\n\r\n"
+        f"Voyageurs\r\n\r\n{adults} adulte{'s' if adults > 1 else ''}\r\n\r\n"
+        "Plus d'informations...\r\n\r\n"
+        f"Code de confirmation\r\n\r\n{confirmation_code(index)}\r\n\r\n"
+        "Voir le récapitulatif\r\nLe voyageur a payé\r\n\r\n"
+        f"{format_amount_fr(amounts['price'])} € x {nights} nuits\r\n\r\n"
+        f"{format_amount_fr(amounts['total_nights'])} €\r\n\r\n"
+        f"Frais de ménage\r\n\r\n{format_amount_fr(amounts['cleaning'])} €\r\n\r\n"
+        f"Frais de service voyageur\r\n\r\n{format_amount_fr(amounts['guest_fee'])} €\r\n\r\n"
+        f"Taxes de séjour\r\n\r\n{format_amount_fr(amounts['tourist_tax'])} €\r\n\r\n"
+        f"Total (EUR)\r\n{format_amount_fr(amounts['guest_payout'])} €\r\n"
+        "Versement de l'hôte\r\n\r\n"
+        f"Frais de chambre pour {nights} nuits\r\n\r\n"
+        f"{format_amount_fr(amounts['total_nights'])} €\r\n\r\n"
+        f"Frais de ménage\r\n\r\n{format_amount_fr(amounts['cleaning'])} €\r\n\r\n"
+        "Frais de service hôte (3.0 % + TVA)\r\n\r\n"
+        f"-{format_amount_fr(amounts['host_fee'])} €\r\n\r\n"
+        f"Vous gagnez\r\n{format_amount_fr(amounts['host_payout'])} €\r\n\r\n"
+        "Votre versement sera envoyé le lendemain de l'arrivée.\r\n"
+    )
+    return {
+        "Sender": "Host <host@example.com>",
+        "Subject": f"TR : Réservation confirmée\xa0: {headline}",
+        "Date": mail_date.isoformat(),
+        "Snippet": f"{sent} À : host@example.com",
+        "Message_body": body,
+    }
+
+
+def _english_mail(index, rng, arrival, departure, mail_date) -> Dict[str, str]:
+    first, last = rng.choice(FIRST_NAMES), rng.choice(LAST_NAMES)
+    city, country = rng.choice(LOCATIONS)
+    nights = (departure - arrival).days
+    adults = rng.randint(1, 4)
+    amounts = _stay_amounts(rng, nights)
+    sent = (
+        f"Envoyé : {FR_WEEKDAYS_LONG[mail_date.weekday()]} {mail_date.day} "
+        f"{FR_MONTHS_LONG[mail_date.month - 1]} {mail_date.year} 14:39:47 "
+        "(UTC+01:00) Brussels, Copenhagen, Madrid, Paris"
+    )
+    headline = f"{first} {last} arrives {arrival.day} {EN_MONTHS[arrival.month - 1]}"
+    body = (
+        f"________________________________\r\nDe : Airbnb \r\n{sent}\r\n"
+        f"À : host@example.com \r\nSujet : Reservation confirmed - {headline}\r\n\r\n\r\n"
+        f"[Airbnb]\r\nNew booking confirmed! {first} arrives {arrival.day} "
+        f"{EN_MONTHS[arrival.month - 1]}.\r\n\r\n"
+        f"{LOCATION_IMAGE}{city}, {country}\r\n\r\nSend {first} a Message\r\n\r\n"
+        f"Check-in\r\n\r\n{EN_WEEKDAYS[arrival.weekday()]}, {arrival.day} "
+        f"{EN_MONTHS[arrival.month - 1]} {arrival.year}\r\n\r\n15:00\r\n\r\n"
+        f"Checkout\r\n\r\n{EN_WEEKDAYS[departure.weekday()]}, {departure.day} "
+        f"{EN_MONTHS[departure.month - 1]} {departure.year}\r\n\r\n12:00\r\n\r\n"
+        f"Guests\r\n\r\n{adults} adult{'s' if adults > 1 else ''}\r\n\r\n"
+        "More details...\r\n\r\n"
+        f"Confirmation code\r\n\r\n{confirmation_code(index)}\r\n\r\n"
+        "View itinerary\r\nGuest paid\r\n\r\n"
+        f"€ {format_amount_en(amounts['price'])} x {nights} nights\r\n\r\n"
+        f"€ {format_amount_en(amounts['total_nights'])}\r\n\r\n"
+        f"Cleaning fee\r\n\r\n€ {format_amount_en(amounts['cleaning'])}\r\n\r\n"
+        f"Guest service fee\r\n\r\n€ {format_amount_en(amounts['guest_fee'])}\r\n\r\n"
+        f"Guests paid € {format_amount_en(amounts['tourist_tax'])} in Occupancy Taxes.\r\n\r\n"
+        f"Total (EUR)\r\n€ {format_amount_en(amounts['guest_payout'])}\r\n"
+        f"Host payout\r\n\r\n{nights}-night room fee\r\n\r\n"
+        f"€ {format_amount_en(amounts['total_nights'])}\r\n\r\n"
+        f"Cleaning fee\r\n\r\n€ {format_amount_en(amounts['cleaning'])}\r\n\r\n"
+        "Host service fee (3.0% + VAT)\r\n\r\n"
+        f"-€ {format_amount_en(amounts['host_fee'])}\r\n\r\n"
+        f"You earn\r\n€ {format_amount_en(amounts['host_payout'])}\r\n\r\n"
+        "The money for this reservation will be released after check-in.\r\n"
+    )
+    return {
+        "Sender": "Host <host@example.com>",
+        "Subject": f"TR : Reservation confirmed - {headline}",
+        "Date": mail_date.isoformat(),
+        "Snippet": f"{sent} À : host@example.com",
+        "Message_body": body,
+    }
+
+
+def iter_reservation_mails(
+    count: int, seed: int = 0, french_ratio: float = 0.5
+) -> Iterator[Dict[str, str]]:
+    """
+    Yield ``count`` synthetic reservation mails.
+
+    Args:
+        count (int): Number of mails to generate.
+        seed (int): Seed for the random generator, so corpora are reproducible.
+        french_ratio (float): Share of French mails, the rest being English.
+    """
+    rng = random.Random(seed)
+    arrival = datetime.date(2024, 1, 1)
+    for index in range(count):
+        nights = rng.randint(1, 7)
+        departure = arrival + datetime.timedelta(days=nights)
+        mail_date = arrival - datetime.timedelta(days=rng.randint(1, 60))
+        if rng.random() < french_ratio:
+            yield _french_mail(index, rng, arrival, departure, mail_date)
+        else:
+            yield _english_mail(index, rng, arrival, departure, mail_date)
+        arrival = departure + datetime.timedelta(days=rng.randint(1, 3))
+
+
+def build_reservation_mails(
+    count: int, seed: int = 0, french_ratio: float = 0.5
+) -> List[Dict[str, str]]:
+    """Return ``count`` synthetic reservation mails as a list."""
+    return list(iter_reservation_mails(count, seed=seed, french_ratio=french_ratio))
+
+
+# Field labels of both languages, as the patterns expect them, each one followed
+# in the adversarial bodies by text that almost matches what should come next.
+PATTERN_TRIGGERS = (
+    "Arrivée\r\n\r\nsam. ",
+    "Départ\r\n\r\ndim. ",
+    "Voyageurs\r\n\r\n",
+    "Code de confirmation\r\n\r\n",
+    "Le voyageur a payé\r\n\r\n",
+    "Frais de ménage pour les séjours courte durée",
+    "Frais de service voyageur\r\n\r\n",
+    "Frais de service hôte (3.0 % + TVA)\r\n\r\n-",
+    "Taxes de séjour",
+    "gagnez\r\n",
+    "Total (EUR)\r\n€ ",
+    "Check-in\r\n\r\nSat, ",
+    "Checkout\r\n\r\nSun, ",
+    "Guests\r\n\r\n",
+    "Confirmation code\r\n\r\n",
+    "Guest paid\r\n\r\n€ ",
+    "Cleaning fee\r\n\r\n€ ",
+    "Guest service fee\r\n\r\n€ ",
+    "Host service fee (3.0% + VAT)\r\n\r\n-€ ",
+    "Guests paid € ",
+    "You earn\r\n€ ",
+    LOCATION_IMAGE,
+)
+
+
+def _fill(unit: str, length: int) -> str:
+    return (unit * (length // len(unit) + 1))[:length]
+
+
+def build_adversarial_bodies(size: int = 100_000) -> Dict[str, str]:
+    """
+    Return malformed mail bodies of about ``size`` characters.
+
+    Each body follows the field labels with long runs of the characters the
+    patterns repeat (digits, separators, spaces, letters) but never with the
+    text that closes a match, the worst case for a backtracking pattern.
+    """
+    run = max(1, size // len(PATTERN_TRIGGERS))
+    mail = build_reservation_mails(2)
+    padding = _fill("> Quoted reply line of a forwarded thread.\r\n", size)
+    bodies = {
+        "digit_run": "1" * run,
+        "separator_run": _fill("1,", run),
+        "whitespace_run": _fill(" \r\n", run),
+        "letter_run": _fill("Ab ", run),
+        "alnum_run": _fill("a1-", run),
+        "digit_burst": _fill("1" * 20 + "?\r\n", run),
+    }
+    bodies = {
+        name: "".join(trigger + tail for trigger in PATTERN_TRIGGERS)
+        for name, tail in bodies.items()
+    }
+    bodies["trigger_flood"] = _fill("".join(PATTERN_TRIGGERS), size)
+    bodies["padded_mail"] = "".join(m["Message_body"] for m in mail) + padding
+    return bodies
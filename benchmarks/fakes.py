@@ -0,0 +1,449 @@
+"""
+In-memory stand-ins for the Gmail, Google Calendar and Notion APIs.
+
+The fakes implement the subset of the discovery/``notion_client`` surface the
+services call, so ``MailProcessorService.run_workflow`` runs its real code path
+(header parsing, body decoding, payload building, conflict checks) without any
+network access. Lookups are indexed so that the fakes themselves stay cheap
+compared to the code being measured.
+"""
+
+import base64
+import bisect
+import contextlib
+import datetime
+import itertools
+import os
+import re
+import tempfile
+from typing import Any, Dict, Iterator, List, Optional
+from unittest import mock
+
+
+class _Request:
+    """Mimics a googleapiclient ``HttpRequest``: the call happens on ``execute``."""
+
+    def __init__(self, func, *args, **kwargs) -> None:
+        self._func = func
+        self._args = args
+        self._kwargs = kwargs
+
+    def execute(self, *args, **kwargs) -> Any:
+        return self._func(*self._args, **self._kwargs)
+
+
+# -----------------------------
+# GMAIL
+# -----------------------------
+_QUERY_TERM = re.compile(r'(from|subject|after):("[^"]*"|\S+?)(?=[\s}]|$)')
+
+
+def _matches_query(mail: Dict[str, str], query: Optional[str]) -> bool:
+    """
+    Evaluate the subset of the Gmail search syntax built by ``SearchQuery``:
+    ``{from:x subject:"y"}`` (any term matches) and ``after:YYYY/MM/DD``.
+    """
+    if not query:
+        return True
+    alternatives = []
+    for operator, value in _QUERY_TERM.findall(query):
+        value = value.strip('"').casefold()
+        if operator == "after":
+            after = datetime.datetime.strptime(value, "%Y/%m/%d").date()
+            if datetime.date.fromisoformat(mail["Date"]) <= after:
+                return False
+        else:
+            field = mail["Sender"] if operator == "from" else mail["Subject"]
+            alternatives.append(value in field.casefold())
+    return not alternatives or any(alternatives)
+
+
+class FakeGmailApi:
+    """Fake ``gmail v1`` resource holding messages in memory."""
+
+    def __init__(self, mails: List[Dict[str, str]]) -> None:
+        self.label_list = [
+            {"id": "Label_reserved", "name": "reserved"},
+            {"id": "Label_poubelle", "name": "poubelle"},
+            {"id": "Label_review", "name": "review"},
+        ]
+        self.store: Dict[str, Dict[str, Any]] = {}
+        for index, mail in enumerate(mails):
+            msg_id = f"msg{index:08d}"
+            self.store[msg_id] = {
+                "mail": mail,
+                "labelIds": {"INBOX", "UNREAD"},
+            }
+        self.calls: Dict[str, int] = {}
+
+    def _count(self, name: str) -> None:
+        self.calls[name] = self.calls.get(name, 0) + 1
+
+    def users(self) -> "FakeGmailApi":
+        return self
+
+    def labels(self) -> "FakeGmailApi._Labels":
+        return self._Labels(self)
+
+    def messages(self) -> "FakeGmailApi._Messages":
+        return self._Messages(self)
+
+    class _Labels:
+        def __init__(self, api: "FakeGmailApi") -> None:
+            self.api = api
+
+        def list(self, **kwargs) -> _Request:
+            self.api._count("labels.list")
+            return _Request(lambda: {"labels": list(self.api.label_list)})
+
+    class _Messages:
+        def __init__(self, api: "FakeGmailApi") -> None:
+            self.api = api
+
+        def list(self, userId=None, labelIds=None, q=None, **kwargs) -> _Request:
+            self.api._count("messages.list")
+            wanted = set(labelIds or [])
+
+            def run():
+                ids = [
+                    {"id": msg_id}
+                    for msg_id, msg in self.api.store.items()
+                    if wanted <= msg["labelIds"] and _matches_query(msg["mail"], q)
+                ]
+                return {"messages": ids} if ids else {}
+
+            return _Request(run)
+
+        def get(self, userId=None, id=None, **kwargs) -> _Request:
+            self.api._count("messages.get")
+            return _Request(self.api._render, id)
+
+        def modify(self, userId=None, id=None, body=None, **kwargs) -> _Request:
+            self.api._count("messages.modify")
+            return _Request(self.api._modify, [id], body or {})
+
+        def batchModify(self, userId=None, body=None, **kwargs) -> _Request:
+            self.api._count("messages.batchModify")
+            body = dict(body or {})
+            ids = body.pop("ids", [])
+            return _Request(self.api._modify, ids, body)
+
+    def _modify(self, ids: List[str], body: Dict[str, List[str]]) -> Dict:
+        for msg_id in ids:
+            labels = self.store[msg_id]["labelIds"]
+            labels.update(body.get("addLabelIds", []))
+            labels.difference_update(body.get("removeLabelIds", []))
+        return {}
+
+    def _render(self, msg_id: str) -> Dict[str, Any]:
+        mail = self.store[msg_id]["mail"]
+        mail_date = datetime.date.fromisoformat(mail["Date"])
+        data = base64.urlsafe_b64encode(mail["Message_body"].encode("utf-8"))
+        return {
+            "id": msg_id,
+            "snippet": mail.get("Snippet", ""),
+            "payload": {
+                "headers": [
+                    {"name": "Subject", "value": mail["Subject"]},
+                    {"name": "From", "value": mail["Sender"]},
+                    {
+                        "name": "Date",
+                        "value": mail_date.strftime("%a, %d %b %Y 10:00:00 +0000"),
+                    },
+                ],
+                "parts": [
+                    {"mimeType": "text/plain", "body": {"data": data.decode("ascii")}}
+                ],
+            },
+        }
+
+
+# -----------------------------
+# GOOGLE CALENDAR
+# -----------------------------
+def _parse_rfc3339(value: str) -> datetime.datetime:
+    return datetime.datetime.fromisoformat(value.replace("Z", "+00:00"))
+
+
+class FakeCalendarApi:
+    """Fake ``calendar v3`` resource keeping events sorted by start time."""
+
+    def __init__(self, summary: str = "Airbnb réservation | Airbnb 预订") -> None:
+        self.summary = summary
+        self.events_by_id: Dict[str, Dict[str, Any]] = {}
+        self._starts: List[tuple] = []
+        self._ids = itertools.count()
+        self.calls: Dict[str, int] = {}
+
+    def _count(self, name: str) -> None:
+        self.calls[name] = self.calls.get(name, 0) + 1
+
+    def calendarList(self) -> "FakeCalendarApi":
+        return self
+
+    def list(self, **kwargs) -> _Request:
+        self._count("calendarList.list")
+        return _Request(lambda: {"items": [{"summary": self.summary, "id": "cal"}]})
+
+    def events(self) -> "FakeCalendarApi._Events":
+        return self._Events(self)
+
+    class _Events:
+        def __init__(self, api: "FakeCalendarApi") -> None:
+            self.api = api
+
+        def list(self, timeMin=None, timeMax=None, **kwargs) -> _Request:
+            self.api._count("events.list")
+            return _Request(self.api._list, timeMin, timeMax)
+
+        def insert(self, calendarId=None, body=None, **kwargs) -> _Request:
+            self.api._count("events.insert")
+            return _Request(self.api._insert, dict(body or {}))
+
+        def patch(self, calendarId=None, eventId=None, body=None, **kwargs):
+            self.api._count("events.patch")
+            return _Request(self.api._patch, eventId, dict(body or {}))
+
+        def delete(self, calendarId=None, eventId=None, **kwargs) -> _Request:
+            self.api._count("events.delete")
+            return _Request(self.api._delete, eventId)
+
+    def _list(self, time_min: Optional[str], time_max: Optional[str]) -> Dict:
+        if time_min is None and time_max is None:
+            return {"items": [self.events_by_id[i] for _, i in self._starts]}
+        lower = _parse_rfc3339(time_min)
+        upper = _parse_rfc3339(time_max)
+        # Stays are at most a few weeks long, so only look slightly before lower.
+        first = bisect.bisect_left(self._starts, (lower - datetime.timedelta(days=31),))
+        last = bisect.bisect_left(self._starts, (upper,))
+        items = []
+        for start, event_id in self._starts[first:last]:
+            event = self.events_by_id[event_id]
+            if start < upper and _parse_rfc3339(event["end"]["dateTime"]) > lower:
+                items.append(event)
+        return {"items": items}
+
+    def _insert(self, body: Dict[str, Any]) -> Dict[str, Any]:
+        event_id = f"evt{next(self._ids)}"
+        body["id"] = event_id
+        body["htmlLink"] = f"https://calendar.example/{event_id}"
+        self.events_by_id[event_id] = body
+        bisect.insort(
+            self._starts, (_parse_rfc3339(body["start"]["dateTime"]), event_id)
+        )
+        return body
+
+    def _patch(self, event_id: str, body: Dict[str, Any]) -> Dict[str, Any]:
+        event = self.events_by_id[event_id]
+        self._starts.remove((_parse_rfc3339(event["start"]["dateTime"]), event_id))
+        event.update(body)
+        bisect.insort(
+            self._starts, (_parse_rfc3339(event["start"]["dateTime"]), event_id)
+        )
+        return event
+
+    def _delete(self, event_id: str) -> None:
+        event = self.events_by_id.pop(event_id)
+        self._starts.remove((_parse_rfc3339(event["start"]["dateTime"]), event_id))
+
+
+# -----------------------------
+# NOTION
+# -----------------------------
+def _as_response_property(payload: Dict[str, Any]) -> Dict[str, Any]:
+    """Turn a request property payload into the shape Notion returns."""
+    field_type = next(iter(payload))
+    value = payload[field_type]
+    if field_type in ("rich_text", "title"):
+        value = [
+            {
+                "type": "text",
+                "text": dict(part.get("text", {})),
+                "plain_text": part.get("text", {}).get("content", ""),
+            }
+            for part in value
+        ]
+    return {"type": field_type, field_type: value}
+
+
+def _plain_text(prop: Dict[str, Any]) -> str:
+    field_type = prop.get("type")
+    return "".join(part["plain_text"] for part in prop.get(field_type, []))
+
+
+class FakeNotionClient:
+    """Fake ``notion_client.Client`` with an index on the confirmation code."""
+
+    def __init__(self, *args, **kwargs) -> None:
+        self.rows: Dict[str, Dict[str, Any]] = {}
+        self._by_code: Dict[str, List[str]] = {}
+        self._ids = itertools.count()
+        self.calls: Dict[str, int] = {}
+        self.pages = self._Pages(self)
+        self.databases = self._Databases(self)
+
+    def _count(self, name: str) -> None:
+        self.calls[name] = self.calls.get(name, 0) + 1
+
+    class _Pages:
+        def __init__(self, client: "FakeNotionClient") -> None:
+            self.client = client
+
+        def create(self, parent=None, properties=None, **kwargs) -> Dict[str, Any]:
+            self.client._count("pages.create")
+            return self.client._create(parent or {}, properties or {})
+
+        def update(self, page_id=None, properties=None, archived=None, **kwargs):
+            self.client._count("pages.update")
+            return self.client._update(page_id, properties or {}, archived)
+
+    class _Databases:
+        def __init__(self, client: "FakeNotionClient") -> None:
+            self.client = client
+
+        def query(self, database_id=None, filter=None, **kwargs) -> Dict[str, Any]:
+            self.client._count("databases.query")
+            return self.client._query(database_id, filter, **kwargs)
+
+    def _create(self, parent, properties) -> Dict[str, Any]:
+        page_id = f"page{next(self._ids)}"
+        now = datetime.datetime.now(datetime.timezone.utc).isoformat()
+        page = {
+            "id": page_id,
+            "parent": parent,
+            "archived": False,
+            "last_edited_time": now,
+            "properties": {
+                key: _as_response_property(value) for key, value in properties.items()
+            },
+        }
+        self.rows[page_id] = page
+        code_prop = page["properties"].get("Confirmation Code")
+        if code_prop:
+            self._by_code.setdefault(_plain_text(code_prop), []).append(page_id)
+        return page
+
+    def _update(self, page_id, properties, archived) -> Dict[str, Any]:
+        page = self.rows[page_id]
+        for key, value in properties.items():
+            page["properties"][key] = _as_response_property(value)
+        if archived is not None:
+            page["archived"] = archived
+        page["last_edited_time"] = datetime.datetime.now(
+            datetime.timezone.utc
+        ).isoformat()
+        return page
+
+    def _matches(self, page, database_id, query_filter) -> bool:
+        if page["archived"] or page["parent"].get("database_id") != database_id:
+            return False
+        if not query_filter:
+            return True
+        if "or" in query_filter:
+            return any(
+                self._matches(page, database_id, condition)
+                for condition in query_filter["or"]
+            )
+        if "timestamp" in query_filter:
+            bound = query_filter["last_edited_time"]["on_or_after"]
+            return page["last_edited_time"] >= bound
+        prop = page["properties"].get(query_filter["property"])
+        if prop is None:
+            return False
+        text = _plain_text(prop)
+        condition = query_filter.get("rich_text") or query_filter.get("title") or {}
+        if "equals" in condition:
+            return text == condition["equals"]
+        if "contains" in condition:
+            return condition["contains"] in text
+        return False
+
+    def _indexed_codes(self, query_filter) -> Optional[List[str]]:
+        """Return the codes of a (compound) equals filter on the code, if it is one."""
+        conditions = (query_filter or {}).get("or", [query_filter or {}])
+        codes = []
+        for condition in conditions:
+            equals = condition.get("rich_text", {}).get("equals")
+            if condition.get("property") != "Confirmation Code" or equals is None:
+                return None
+            codes.append(equals)
+        return codes
+
+    def _query(self, database_id, query_filter, start_cursor=None, page_size=100):
+        codes = self._indexed_codes(query_filter)
+        if codes is not None:
+            page_ids = dict.fromkeys(
+                page_id for code in codes for page_id in self._by_code.get(code, [])
+            )
+            candidates = [self.rows[page_id] for page_id in page_ids]
+        else:
+            candidates = list(self.rows.values())
+        results = [
+            page
+            for page in candidates
+            if self._matches(page, database_id, query_filter)
+        ]
+        offset = int(start_cursor or 0)
+        page_size = min(int(page_size or 100), 100)
+        chunk = results[offset : offset + page_size]
+        has_more = offset + page_size < len(results)
+        return {
+            "results": chunk,
+            "has_more": has_more,
+            "next_cursor": str(offset + page_size) if has_more else None,
+        }
+
+
+# -----------------------------
+# WIRING
+# -----------------------------
+@contextlib.contextmanager
+def fake_backends(
+    mails: List[Dict[str, str]],
+) -> Iterator[Dict[str, Any]]:
+    """
+    Patch the Google and Notion client factories with in-memory fakes.
+
+    Yields a dict with the ``gmail``, ``calendar`` and ``notion`` fakes, so a
+    ``MailProcessorService`` created inside the block talks to them.
+    """
+    from services.google_integration import calendar_services, gmail_services
+    from services.notion_client import notion_api_client
+
+    gmail_api = FakeGmailApi(mails)
+    calendar_api = FakeCalendarApi()
+    notion_api = FakeNotionClient()
+
+    def fake_build(service_name, version, credentials=None, **kwargs):
+        return gmail_api if service_name == "gmail" else calendar_api
+
+    env = {
+        "TOKEN_PATH": "fake_token.json",
+        "NOTION_API": "fake_token",
+        "DATABASE_ID": "fake_database",
+    }
+    with contextlib.ExitStack() as stack:
+        journal_dir = stack.enter_context(tempfile.TemporaryDirectory())
+        env["WORKFLOW_JOURNAL_PATH"] = os.path.join(journal_dir, "journal.jsonl")
+        env["MAIL_LEDGER_PATH"] = os.path.join(journal_dir, "ledger.sqlite3")
+        env["PARSE_CACHE_PATH"] = os.path.join(journal_dir, "parse_cache.sqlite3")
+        stack.enter_context(mock.patch.dict(os.environ, env))
+        for module in (gmail_services, calendar_services):
+            stack.enter_context(
+                mock.patch.object(module, "load_credentials", lambda path: None)
+            )
+            stack.enter_context(
+                mock.patch.object(
+                    module, "refresh_access_token", lambda creds, path: creds
+                )
+            )
+            stack.enter_context(
+                mock.patch.object(module, "print_token_ttl", lambda creds: None)
+            )
+            stack.enter_context(mock.patch.object(module, "build", fake_build))
+        stack.enter_context(
+            mock.patch.object(
+                notion_api_client, "get_notion_client", lambda token: notion_api
+            )
+        )
+        yield {"gmail": gmail_api, "calendar": calendar_api, "notion": notion_api}
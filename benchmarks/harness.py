@@ -0,0 +1,192 @@
+"""
+Timing, memory and reporting helpers shared by the benchmark scripts.
+"""
+
+import contextlib
+import datetime
+import gc
+import io
+import json
+import os
+import platform
+import subprocess
+import time
+import tracemalloc
+import warnings
+from dataclasses import asdict, dataclass, field
+from typing import Any, Callable, Dict, List, Optional
+
+from rich.console import Console
+from rich.table import Table
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+RESULTS_DIR = os.path.join(PROJECT_ROOT, "benchmarks", "results")
+
+
+@dataclass
+class BenchmarkResult:
+    """Measurements for one benchmark at one scale."""
+
+    name: str
+    scale: int
+    unit: str
+    samples: int
+    total_seconds: float
+    throughput_per_s: float
+    latency_ms: Dict[str, float]
+    peak_memory_bytes: Optional[int] = None
+    extra: Dict[str, Any] = field(default_factory=dict)
+
+
+def percentile(values: List[float], pct: float) -> float:
+    """Return the ``pct`` percentile of ``values`` (nearest-rank, 0 <= pct <= 100)."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = max(0, min(len(ordered) - 1, int(round(pct / 100 * len(ordered))) - 1))
+    return ordered[rank]
+
+
+def summarize_latencies(latencies: List[float]) -> Dict[str, float]:
+    """Summarize latencies given in seconds as p50/p99/max milliseconds."""
+    return {
+        "p50": percentile(latencies, 50) * 1000,
+        "p99": percentile(latencies, 99) * 1000,
+        "max": max(latencies, default=0.0) * 1000,
+    }
+
+
+@contextlib.contextmanager
+def quiet():
+    """Silence stdout and warnings, the workflow prints a line per reservation."""
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(
+        devnull
+    ), warnings.catch_warnings():
+        warnings.simplefilter("ignore")
+        yield
+
+
+def time_call(func: Callable[[], Any]) -> float:
+    """Run ``func`` once and return the elapsed wall time in seconds."""
+    start = time.perf_counter()
+    func()
+    return time.perf_counter() - start
+
+
+def peak_memory(func: Callable[[], Any]) -> int:
+    """Run ``func`` under tracemalloc and return the peak traced allocation."""
+    gc.collect()
+    tracemalloc.start()
+    try:
+        func()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return peak
+
+
+def per_item_result(
+    name: str, latencies: List[float], peak: Optional[int] = None
+) -> BenchmarkResult:
+    """Build a result where each latency sample is one processed item."""
+    total = sum(latencies)
+    return BenchmarkResult(
+        name=name,
+        scale=len(latencies),
+        unit="item",
+        samples=len(latencies),
+        total_seconds=total,
+        throughput_per_s=len(latencies) / total if total else 0.0,
+        latency_ms=summarize_latencies(latencies),
+        peak_memory_bytes=peak,
+    )
+
+
+def batch_result(
+    name: str, scale: int, latencies: List[float], peak: Optional[int] = None
+) -> BenchmarkResult:
+    """Build a result where each latency sample is one call over ``scale`` items."""
+    median = percentile(latencies, 50)
+    return BenchmarkResult(
+        name=name,
+        scale=scale,
+        unit="batch",
+        samples=len(latencies),
+        total_seconds=sum(latencies),
+        throughput_per_s=scale / median if median else 0.0,
+        latency_ms=summarize_latencies(latencies),
+        peak_memory_bytes=peak,
+    )
+
+
+def read_version() -> str:
+    with open(os.path.join(PROJECT_ROOT, "VERSION")) as version_file:
+        return version_file.read().strip()
+
+
+def git_revision() -> Optional[str]:
+    try:
+        return (
+            subprocess.check_output(
+                ["git", "rev-parse", "--short", "HEAD"],
+                cwd=PROJECT_ROOT,
+                stderr=subprocess.DEVNULL,
+            )
+            .decode()
+            .strip()
+        )
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def write_results(
+    suite: str, results: List[BenchmarkResult], output: Optional[str] = None
+) -> str:
+    """
+    Store results as JSON, by default in ``benchmarks/results/<suite>-<version>.json``.
+
+    Returns:
+        str: The path of the written file.
+    """
+    version = read_version()
+    if output is None:
+        os.makedirs(RESULTS_DIR, exist_ok=True)
+        output = os.path.join(RESULTS_DIR, f"{suite}-{version}.json")
+    document = {
+        "suite": suite,
+        "version": version,
+        "git_revision": git_revision(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "created_at": datetime.datetime.now().replace(microsecond=0).isoformat(),
+        "results": [asdict(result) for result in results],
+    }
+    with open(output, "w") as result_file:
+        json.dump(document, result_file, indent=2)
+    return output
+
+
+def render_results(title: str, results: List[BenchmarkResult]) -> str:
+    """Render results as a rich table and return the text output."""
+    table = Table(title=title)
+    for column in ["Benchmark", "Scale", "Unit", "Throughput/s", "p50 ms", "p99 ms"]:
+        table.add_column(column, justify="right" if column != "Benchmark" else "left")
+    table.add_column("Peak MiB", justify="right")
+    for result in results:
+        peak = (
+            f"{result.peak_memory_bytes / 2**20:.1f}"
+            if result.peak_memory_bytes is not None
+            else "-"
+        )
+        table.add_row(
+            result.name,
+            str(result.scale),
+            result.unit,
+            f"{result.throughput_per_s:,.0f}",
+            f"{result.latency_ms['p50']:.3f}",
+            f"{result.latency_ms['p99']:.3f}",
+            peak,
+        )
+    buffer = io.StringIO()
+    Console(file=buffer, width=120).print(table)
+    return buffer.getvalue()
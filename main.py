@@ -1,5 +1,38 @@
+import argparse
+
+from services.mail_processing.daemon import (
+    DEFAULT_MAX_INTERVAL,
+    DEFAULT_MIN_INTERVAL,
+    AdaptiveInterval,
+    MailDaemon,
+)
 from services.mail_processing.mail_processor import MailProcessorService
 
 if __name__ == "__main__":
-    processor = MailProcessorService()
-    processor.run_workflow()
+    arg_parser = argparse.ArgumentParser(description="Process the Airbnb mails.")
+    arg_parser.add_argument(
+        "--daemon",
+        action="store_true",
+        help="Keep running and process new mails as they arrive.",
+    )
+    arg_parser.add_argument(
+        "--min-interval",
+        type=float,
+        default=DEFAULT_MIN_INTERVAL,
+        help="Seconds between two polls when mails are arriving (daemon mode).",
+    )
+    arg_parser.add_argument(
+        "--max-interval",
+        type=float,
+        default=DEFAULT_MAX_INTERVAL,
+        help="Longest wait between two polls when idle (daemon mode).",
+    )
+    args = arg_parser.parse_args()
+
+    if args.daemon:
+        MailDaemon(
+            interval=AdaptiveInterval(args.min_interval, args.max_interval)
+        ).run()
+    else:
+        processor = MailProcessorService()
+        processor.run_workflow()
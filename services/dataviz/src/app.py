@@ -1,61 +1,68 @@
-from datetime import datetime
-
 import plotly.express as px
 import streamlit as st
 
+from services.dataviz.src import get_blocked_days
+from services.dataviz.src.cubes import AggregateCubes
+from services.dataviz.src.data_layer import (
+    available_years,
+    filter_year,
+    missing_columns,
+    values_by_month,
+)
+from services.dataviz.src.occupancy import OccupancyCalendar
+from services.dataviz.src.snapshot import SnapshotStore, sync_reservations
 from services.notion_client.notion_api_client import NotionClient
 
 
 # -----------------------------
-# DATA FETCHING & CACHING
+# DATA FETCHING & SNAPSHOT
 # -----------------------------
-@st.cache_data(ttl=3600 * 24)
-def fetch_data_from_notion():  # noqa: C901
-    """Fetch data from Notion via the client and return a cleaned list of dicts."""
-    notion_client = NotionClient()
-    pages = notion_client.get_all_pages()
-    data = [notion_client.parse_page(page) for page in pages]
-
-    # Convert date columns to datetime
-    date_cols = ["Arrival Date", "Departure Date", "Mail Date", "Insert Date"]
-    for row in data:
-        for col in date_cols:
-            if col in row and row[col]:
-                try:
-                    row[col] = datetime.fromisoformat(str(row[col]))
-                except Exception:
-                    row[col] = None
-
-    # Ensure numeric columns are properly converted.
-    num_cols = [
-        "Host Service Fee",
-        "Guest Service Fee",
-        "Total Nights Cost",
-        "Guest Payout",
-        "Host Payout",
-        "Cleaning Fee",
-        "Tourist Tax",
-        "Price by night",
-        "Number of Nights",
-    ]
-    for row in data:
-        for col in num_cols:
-            if col in row and row[col] is not None:
-                try:
-                    row[col] = float(row[col])
-                except Exception:
-                    row[col] = None
-
-    return data
-
-
-# Button to refresh data manually (which clears the cache)
+def fetch_blocked_days():
+    """Blocked periods from Notion, when a blocked-days database is configured."""
+    if not get_blocked_days.BLOCKED_DATE_DB_ID:
+        return []
+    return get_blocked_days.fetch_blocked_days_from_notion()
+
+
+def refresh_data(full: bool = False):
+    """
+    Delta-sync the local snapshot with Notion and keep the frame in the session.
+
+    The aggregate cubes are updated with the rows that changed since the
+    previous refresh, or built from scratch on the first one.
+    """
+    previous = st.session_state.get("reservations")
+    frame = sync_reservations(NotionClient(), SnapshotStore(), full=full)
+    blocked_days = fetch_blocked_days()
+    cubes = st.session_state.get("cubes")
+    if cubes is None or previous is None or full:
+        cubes = AggregateCubes(frame, blocked_days)
+    else:
+        cubes.apply_delta(previous, frame)
+        cubes.set_blocked_days(blocked_days)
+    st.session_state["reservations"] = frame
+    st.session_state["cubes"] = cubes
+    # One state per night, rebuilt in a few vectorized passes.
+    st.session_state["occupancy"] = OccupancyCalendar.from_frames(frame, blocked_days)
+
+
+# The snapshot is loaded and delta-synced once per session, reruns reuse it.
+if "reservations" not in st.session_state:
+    refresh_data()
+
+# Button to refresh data manually (only rows edited since the last sync)
 if st.button("Refresh Data"):
-    st.cache_data.clear()  # clear the cached data
+    refresh_data()
+    st.rerun()
+
+# Full resync, also drops the reservations archived in Notion
+if st.button("Full Resync"):
+    refresh_data(full=True)
     st.rerun()
 
-# Fetch (or load cached) data
-data = fetch_data_from_notion()
+data = st.session_state["reservations"]
+cubes = st.session_state["cubes"]
+occupancy = st.session_state["occupancy"]
 
 # -----------------------------
 # GLOBAL FILTERS
@@ -66,17 +73,76 @@ st.write(
 )
 
 # Create a global year filter based on the "Arrival Date"
-years = sorted({row["Arrival Date"].year for row in data if row.get("Arrival Date")})
+years = available_years(data)
 if years:
     selected_year = st.selectbox("Select Year", options=years)
-    filtered = [
-        row
-        for row in data
-        if row.get("Arrival Date") and row["Arrival Date"].year == selected_year
-    ]
+    filtered = filter_year(data, selected_year)
 else:
     st.error("No valid 'Arrival Date' data found.")
-    filtered = data.copy()
+    selected_year = None
+    filtered = data
+
+# -----------------------------
+# GRAPH 0: Monthly Occupancy and ADR
+# -----------------------------
+st.subheader("Monthly Occupancy and Average Daily Rate")
+
+monthly = cubes.view("month", year=selected_year).reset_index()
+monthly["month_year"] = (
+    monthly["year"].astype(str) + "-" + monthly["month"].astype(str).str.zfill(2)
+)
+col_occupancy, col_adr = st.columns(2)
+col_occupancy.plotly_chart(
+    px.bar(
+        monthly,
+        x="month_year",
+        y="occupancy_rate",
+        hover_data=["booked_nights", "blocked_nights", "available_nights"],
+        title="Occupancy rate (blocked nights excluded)",
+        labels={"month_year": "Month-Year", "occupancy_rate": "Occupancy"},
+    ),
+    use_container_width=True,
+)
+col_adr.plotly_chart(
+    px.bar(
+        monthly,
+        x="month_year",
+        y="adr",
+        title="Average daily rate (by arrival month)",
+        labels={"month_year": "Month-Year", "adr": "ADR"},
+    ),
+    use_container_width=True,
+)
+# -----------------------------
+# OCCUPANCY CALENDAR: gaps and orphan nights
+# -----------------------------
+period = (
+    (f"{selected_year}-01-01", f"{selected_year + 1}-01-01")
+    if selected_year
+    else (None, None)
+)
+nights = occupancy.counts(*period)
+col_booked, col_blocked, col_free, col_rate = st.columns(4)
+col_booked.metric("Booked nights", nights["booked"])
+col_blocked.metric("Blocked nights", nights["blocked"])
+col_free.metric("Free nights", nights["free"])
+col_rate.metric("Occupancy", f"{occupancy.occupancy_rate(*period):.0%}")
+
+min_stay = st.number_input("Minimum stay (nights)", min_value=1, value=2)
+orphans = [
+    {"From": gap.start, "To": gap.end, "Nights": gap.nights}
+    for gap in occupancy.orphan_nights(min_stay=int(min_stay))
+    if not selected_year or gap.start.year == selected_year
+]
+st.write(f"{len(orphans)} orphan gap(s) shorter than the minimum stay")
+if orphans:
+    st.dataframe(orphans)
+
+st.dataframe(
+    cubes.view("year")[
+        ["bookings", "nights", "host_payout", "tourist_tax", "adr", "occupancy_rate"]
+    ]
+)
 
 # -----------------------------
 # GRAPH 1: Average Payouts vs. Number of Nights
@@ -84,52 +150,14 @@ else:
 st.subheader("Average Payouts vs. Number of Nights")
 
 # Check required columns
-for col in ["Number of Nights", "Host Payout", "Guest Payout"]:
-    if not all(col in row for row in filtered):
-        st.error(f"Column '{col}' is missing from the data.")
-        st.stop()
-
-# Group by Number of Nights and compute average payouts.
-grouped = {}
-for row in filtered:
-    nights = row.get("Number of Nights")
-    if nights is not None:
-        if nights not in grouped:
-            grouped[nights] = {"Host Payout": [], "Guest Payout": []}
-        if row.get("Host Payout") is not None:
-            grouped[nights]["Host Payout"].append(row["Host Payout"])
-        if row.get("Guest Payout") is not None:
-            grouped[nights]["Guest Payout"].append(row["Guest Payout"])
-
-grouped_melted = []
-for nights, payouts in grouped.items():
-    host_avg = (
-        sum(payouts["Host Payout"]) / len(payouts["Host Payout"])
-        if payouts["Host Payout"]
-        else 0
-    )
-    guest_avg = (
-        sum(payouts["Guest Payout"]) / len(payouts["Guest Payout"])
-        if payouts["Guest Payout"]
-        else 0
-    )
-    grouped_melted.append(
-        {
-            "Number of Nights": nights,
-            "Payout Type": "Host Payout",
-            "Average Payout": host_avg,
-        }
-    )
-    grouped_melted.append(
-        {
-            "Number of Nights": nights,
-            "Payout Type": "Guest Payout",
-            "Average Payout": guest_avg,
-        }
-    )
+for col in missing_columns(
+    filtered, ["Number of Nights", "Host Payout", "Guest Payout"]
+):
+    st.error(f"Column '{col}' is missing from the data.")
+    st.stop()
 
 fig1 = px.bar(
-    grouped_melted,
+    cubes.payouts_by_stay_length(year=selected_year),
     x="Number of Nights",
     y="Average Payout",
     color="Payout Type",
@@ -141,18 +169,9 @@ st.plotly_chart(fig1, use_container_width=True)
 # -----------------------------
 # GRAPH 2: Box Plot of Nightly Price Distribution by Month
 # -----------------------------
-if all("Arrival Date" in row and "Price by night" in row for row in filtered):
-    for row in filtered:
-        if row.get("Arrival Date"):
-            row["month_year"] = row["Arrival Date"].strftime("%Y-%m")
-        else:
-            row["month_year"] = None
+if not missing_columns(filtered, ["Arrival Date", "Price by night"]):
     fig2 = px.box(
-        [
-            row
-            for row in filtered
-            if row.get("month_year") and row.get("Price by night") is not None
-        ],
+        values_by_month(filtered, "Price by night").sort_values("month_year"),
         x="month_year",
         y="Price by night",
         title="Box Plot: Nightly Price Distribution by Month (Based on Arrival Date)",
@@ -167,18 +186,9 @@ else:
 # -----------------------------
 st.subheader("Distribution of Number of Nights by Month")
 
-if all("Arrival Date" in row and "Number of Nights" in row for row in filtered):
-    for row in filtered:
-        if row.get("Arrival Date"):
-            row["month"] = row["Arrival Date"].strftime("%B")
-        else:
-            row["month"] = None
+if not missing_columns(filtered, ["Arrival Date", "Number of Nights"]):
     fig3 = px.box(
-        [
-            row
-            for row in filtered
-            if row.get("month") and row.get("Number of Nights") is not None
-        ],
+        values_by_month(filtered, "Number of Nights", month_column="month"),
         x="month",
         y="Number of Nights",
         title="Box Plot: Number of Nights by Month (Arrival Date)",
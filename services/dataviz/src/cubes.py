@@ -0,0 +1,306 @@
+"""
+Pre-aggregated occupancy and revenue cubes of the dashboard.
+
+The finest cubes hold additive sums only (bookings, nights, amounts, nights
+booked and blocked per calendar month), so new or edited bookings are applied
+by adding their contribution and subtracting the one of their previous version.
+The views read by the widgets (per month, year, country and stay length, with
+ADR and occupancy rate) are rolled up from those cubes once per refresh.
+"""
+
+import calendar
+from typing import Any, Dict, Iterable, List, Optional
+
+import numpy as np
+import pandas as pd
+
+from services.dataviz.src.occupancy import expand_nights
+
+DIMENSIONS = ["year", "month", "country", "stay_length"]
+
+# Frame column -> cube measure. All measures are sums.
+AMOUNT_COLUMNS = {
+    "Total Nights Cost": "nights_cost",
+    "Host Payout": "host_payout",
+    "Guest Payout": "guest_payout",
+    "Cleaning Fee": "cleaning_fee",
+    "Host Service Fee": "host_service_fee",
+    "Guest Service Fee": "guest_service_fee",
+    "Tourist Tax": "tourist_tax",
+}
+
+# Payouts are averaged over the bookings where they are known.
+COUNTED_AMOUNTS = ["host_payout", "guest_payout"]
+
+MEASURES = (
+    ["bookings", "nights"]
+    + list(AMOUNT_COLUMNS.values())
+    + [f"{measure}_count" for measure in COUNTED_AMOUNTS]
+)
+
+_MONTH_INDEX = ["year", "month"]
+
+
+def _empty_cube() -> pd.DataFrame:
+    index = pd.MultiIndex.from_arrays([[]] * len(DIMENSIONS), names=DIMENSIONS)
+    return pd.DataFrame(columns=MEASURES, index=index, dtype="float64")
+
+
+def _empty_month_series() -> pd.Series:
+    index = pd.MultiIndex.from_arrays([[], []], names=_MONTH_INDEX)
+    return pd.Series(dtype="float64", index=index)
+
+
+def _stays(frame: pd.DataFrame) -> pd.DataFrame:
+    """Return the arrival day and stay length of the rows that have both."""
+    if "Arrival Date" not in frame:
+        return pd.DataFrame({"arrival": [], "stay_length": []})
+    arrival = frame["Arrival Date"].dt.normalize()
+    nights = (
+        frame["Number of Nights"]
+        if "Number of Nights" in frame
+        else pd.Series(np.nan, index=frame.index)
+    )
+    if "Departure Date" in frame:
+        nights = nights.fillna(
+            (frame["Departure Date"].dt.normalize() - arrival).dt.days
+        )
+    stays = pd.DataFrame({"arrival": arrival, "stay_length": nights})
+    stays = stays.dropna()
+    stays = stays[stays["stay_length"] > 0]
+    stays["stay_length"] = stays["stay_length"].astype("int64")
+    return stays
+
+
+def booking_cube(frame: pd.DataFrame) -> pd.DataFrame:
+    """
+    Aggregate reservations by year, month, country and stay length.
+
+    Args:
+        frame (pd.DataFrame): Typed reservation frame (see ``data_layer``).
+
+    Returns:
+        pd.DataFrame: Additive measures (``MEASURES``) indexed by ``DIMENSIONS``.
+    """
+    stays = _stays(frame)
+    if stays.empty:
+        return _empty_cube()
+    rows = frame.loc[stays.index]
+    facts = pd.DataFrame(
+        {
+            "year": stays["arrival"].dt.year,
+            "month": stays["arrival"].dt.month,
+            "country": (
+                rows["Country"].astype("object").fillna("Unknown")
+                if "Country" in rows
+                else "Unknown"
+            ),
+            "stay_length": stays["stay_length"],
+            "bookings": 1.0,
+            "nights": stays["stay_length"].astype("float64"),
+        },
+        index=stays.index,
+    )
+    for column, measure in AMOUNT_COLUMNS.items():
+        values = rows[column] if column in rows else pd.Series(np.nan, rows.index)
+        facts[measure] = values.fillna(0.0)
+        if measure in COUNTED_AMOUNTS:
+            facts[f"{measure}_count"] = values.notna().astype("float64")
+    return facts.groupby(DIMENSIONS, observed=True)[MEASURES].sum()
+
+
+def nights_per_month(starts: Iterable[Any], nights: Iterable[int]) -> pd.Series:
+    """
+    Count the nights of many stays per calendar month.
+
+    Each stay is expanded into one entry per night (``expand_nights``), so a
+    stay crossing the end of a month is split between both months.
+
+    Returns:
+        pd.Series: Number of nights indexed by (year, month).
+    """
+    days = expand_nights(starts, nights)
+    if not len(days):
+        return _empty_month_series()
+    months, counts = np.unique(days.astype("datetime64[M]"), return_counts=True)
+    month_numbers = months.astype("int64")
+    index = pd.MultiIndex.from_arrays(
+        [1970 + month_numbers // 12, month_numbers % 12 + 1], names=_MONTH_INDEX
+    )
+    return pd.Series(counts.astype("float64"), index=index)
+
+
+def booked_nights(frame: pd.DataFrame) -> pd.Series:
+    stays = _stays(frame)
+    return nights_per_month(stays["arrival"].values, stays["stay_length"].values)
+
+
+def blocked_nights(blocked_days: List[Dict[str, Any]]) -> pd.Series:
+    """Count blocked nights per month from ``fetch_blocked_days_from_notion`` rows."""
+    if not blocked_days:
+        return _empty_month_series()
+    periods = pd.DataFrame.from_records(blocked_days)
+    start = pd.to_datetime(periods["start_date"], errors="coerce")
+    end = pd.to_datetime(periods["end_date"], errors="coerce")
+    return nights_per_month(start.values, (end - start).dt.days.fillna(0).values)
+
+
+def _add(left, right, sign: float = 1.0):
+    if right.empty:
+        return left
+    if left.empty:
+        return right * sign
+    return left.add(right * sign, fill_value=0.0)
+
+
+def _derive(view: pd.DataFrame) -> pd.DataFrame:
+    """Add the ratio metrics to a view of summed measures."""
+    view = view.copy()
+    nights = view["nights"].replace(0, np.nan)
+    view["adr"] = view["nights_cost"] / nights
+    for measure in COUNTED_AMOUNTS:
+        counts = view[f"{measure}_count"].replace(0, np.nan)
+        view[f"average_{measure}"] = (view[measure] / counts).fillna(0.0)
+    return view
+
+
+class AggregateCubes:
+    """
+    Materialized cubes of a reservation frame and the blocked days.
+
+    Build it once per data refresh, then read ``view(name)``; use
+    ``apply_delta`` after a delta sync instead of rebuilding everything.
+    """
+
+    VIEWS = ("month", "year", "country", "stay_length")
+
+    def __init__(
+        self,
+        frame: Optional[pd.DataFrame] = None,
+        blocked_days: Optional[List[Dict[str, Any]]] = None,
+    ) -> None:
+        self.bookings = _empty_cube()
+        self.booked = _empty_month_series()
+        self.blocked = blocked_nights(blocked_days or [])
+        self._views: Dict[str, pd.DataFrame] = {}
+        if frame is not None:
+            self._apply(frame, 1.0)
+        self._materialize()
+
+    def _apply(self, frame: pd.DataFrame, sign: float) -> None:
+        self.bookings = _add(self.bookings, booking_cube(frame), sign)
+        self.booked = _add(self.booked, booked_nights(frame), sign)
+
+    def add(self, frame: pd.DataFrame) -> None:
+        """Add new reservations to the cubes."""
+        self._apply(frame, 1.0)
+        self._materialize()
+
+    def remove(self, frame: pd.DataFrame) -> None:
+        """Remove reservations previously added to the cubes."""
+        self._apply(frame, -1.0)
+        self._materialize()
+
+    def apply_delta(self, old_frame: pd.DataFrame, new_frame: pd.DataFrame) -> int:
+        """
+        Update the cubes built from ``old_frame`` so they match ``new_frame``.
+
+        Rows are matched on ``page_id``; a row whose ``last_edited_time`` changed
+        is removed with its old values and added with its new ones.
+
+        Returns:
+            int: Number of rows added, removed or changed.
+        """
+        keys = ["page_id", "last_edited_time"]
+        old_keys = old_frame[keys].astype(str).agg("|".join, axis=1)
+        new_keys = new_frame[keys].astype(str).agg("|".join, axis=1)
+        removed = old_frame[~old_keys.isin(new_keys)]
+        added = new_frame[~new_keys.isin(old_keys)]
+        self._apply(removed, -1.0)
+        self._apply(added, 1.0)
+        self._materialize()
+        return len(set(removed["page_id"]) | set(added["page_id"]))
+
+    def set_blocked_days(self, blocked_days: List[Dict[str, Any]]) -> None:
+        self.blocked = blocked_nights(blocked_days)
+        self._materialize()
+
+    def _materialize(self) -> None:
+        # Empty groups left by removals are dropped.
+        cube = self.bookings[self.bookings["bookings"] > 0]
+        self.bookings = cube
+        self.booked = self.booked[self.booked > 0]
+        self._views = {
+            "country": _derive(cube.groupby("country").sum()),
+            "stay_length": _derive(cube.groupby("stay_length").sum()),
+        }
+        month = cube.groupby(_MONTH_INDEX).sum()
+        calendar_index = month.index.union(self.booked.index).union(self.blocked.index)
+        month = month.reindex(calendar_index, fill_value=0.0)
+        month["booked_nights"] = self.booked.reindex(calendar_index, fill_value=0.0)
+        month["blocked_nights"] = self.blocked.reindex(calendar_index, fill_value=0.0)
+        month["days"] = [
+            float(calendar.monthrange(int(year), int(month_number))[1])
+            for year, month_number in calendar_index
+        ]
+        self._views["month"] = self._with_occupancy(_derive(month))
+        self._views["year"] = self._with_occupancy(
+            _derive(month.groupby(level="year").sum())
+        )
+
+    @staticmethod
+    def _with_occupancy(view: pd.DataFrame) -> pd.DataFrame:
+        available = (view["days"] - view["blocked_nights"]).clip(lower=0)
+        view["available_nights"] = available
+        view["occupancy_rate"] = (
+            view["booked_nights"] / available.replace(0, np.nan)
+        ).fillna(0.0)
+        return view
+
+    def view(self, name: str, year: Optional[int] = None) -> pd.DataFrame:
+        """
+        Return a materialized view.
+
+        Args:
+            name (str): ``month``, ``year``, ``country`` or ``stay_length``.
+            year (int, optional): Restrict ``month`` to one year, or roll
+                ``country``/``stay_length`` up for one arrival year only.
+
+        Returns:
+            pd.DataFrame: Summed measures with ``adr``, average payouts and, for
+            ``month`` and ``year``, nights booked/blocked and ``occupancy_rate``.
+        """
+        if name not in self.VIEWS:
+            raise ValueError(f"Unknown cube view: {name}")
+        if year is None:
+            return self._views[name]
+        if name in ("month", "year"):
+            view = self._views[name]
+            return view[view.index.get_level_values("year") == year]
+        cube = self.bookings[self.bookings.index.get_level_values("year") == year]
+        return _derive(cube.groupby(name).sum())
+
+    def payouts_by_stay_length(self, year: Optional[int] = None) -> pd.DataFrame:
+        """
+        Average host and guest payout per stay length, in long format.
+
+        Returns:
+            pd.DataFrame: Columns ``Number of Nights``, ``Payout Type`` and
+            ``Average Payout``.
+        """
+        view = self.view("stay_length", year=year)
+        averages = view[["average_host_payout", "average_guest_payout"]].rename(
+            columns={
+                "average_host_payout": "Host Payout",
+                "average_guest_payout": "Guest Payout",
+            }
+        )
+        return (
+            averages.rename_axis("Number of Nights")
+            .reset_index()
+            .melt(
+                id_vars="Number of Nights",
+                var_name="Payout Type",
+                value_name="Average Payout",
+            )
+        )
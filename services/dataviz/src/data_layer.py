@@ -0,0 +1,129 @@
+"""
+Columnar data layer of the dashboard.
+
+Notion rows are loaded once into a typed ``pandas.DataFrame``: dates and numbers
+are coerced column by column, and the columns the charts group on (year, month)
+are derived once. Charts are built from filtered views and ``groupby``
+aggregations of that frame, rows are never copied or mutated one by one.
+"""
+
+from typing import Any, Dict, Iterable, List
+
+import pandas as pd
+
+DATE_COLUMNS = ["Arrival Date", "Departure Date", "Mail Date", "Insert Date"]
+
+NUMERIC_COLUMNS = [
+    "Host Service Fee",
+    "Guest Service Fee",
+    "Total Nights Cost",
+    "Guest Payout",
+    "Host Payout",
+    "Cleaning Fee",
+    "Tourist Tax",
+    "Price by night",
+    "Number of Nights",
+    "Number of Adults",
+    "Number of Children",
+    "Rating",
+]
+
+CATEGORY_COLUMNS = ["Country", "City"]
+
+PAYOUT_COLUMNS = ["Host Payout", "Guest Payout"]
+
+
+def coerce_dates(values: pd.Series) -> pd.Series:
+    """Parse ISO dates, invalid or missing values become ``NaT`` (naive UTC)."""
+    parsed = pd.to_datetime(values, errors="coerce", format="ISO8601", utc=True)
+    return parsed.dt.tz_localize(None)
+
+
+def coerce_numbers(values: pd.Series) -> pd.Series:
+    """Parse numbers as float64, invalid values such as ``"N/A"`` become ``NaN``."""
+    return pd.to_numeric(values, errors="coerce").astype("float64")
+
+
+def reservations_frame(rows: Iterable[Dict[str, Any]]) -> pd.DataFrame:
+    """
+    Build the typed reservation frame from parsed Notion rows.
+
+    Args:
+        rows (Iterable[Dict[str, Any]]): Rows as returned by ``NotionClient.parse_page``.
+
+    Returns:
+        pd.DataFrame: One row per reservation, with datetime64 date columns,
+        float64 numeric columns and the derived ``arrival_year``, ``month_year``
+        and ``month`` columns.
+    """
+    frame = pd.DataFrame.from_records(list(rows))
+    return normalize_frame(frame)
+
+
+def normalize_frame(frame: pd.DataFrame) -> pd.DataFrame:
+    """Coerce the column types of a reservation frame and derive the chart keys."""
+    frame = frame.copy()
+    for column in DATE_COLUMNS:
+        if column in frame:
+            frame[column] = coerce_dates(frame[column])
+    for column in NUMERIC_COLUMNS:
+        if column in frame:
+            frame[column] = coerce_numbers(frame[column])
+    for column in CATEGORY_COLUMNS:
+        if column in frame:
+            frame[column] = frame[column].astype("category")
+
+    arrival = (
+        frame["Arrival Date"]
+        if "Arrival Date" in frame
+        else pd.Series(pd.NaT, index=frame.index, dtype="datetime64[ns]")
+    )
+    frame["arrival_year"] = arrival.dt.year.astype("Int64")
+    frame["month_year"] = arrival.dt.strftime("%Y-%m")
+    frame["month"] = arrival.dt.month_name()
+    return frame
+
+
+def available_years(frame: pd.DataFrame) -> List[int]:
+    """Return the sorted arrival years present in the frame."""
+    return sorted(int(year) for year in frame["arrival_year"].dropna().unique())
+
+
+def filter_year(frame: pd.DataFrame, year: int) -> pd.DataFrame:
+    """Return the reservations arriving in ``year``."""
+    return frame[frame["arrival_year"] == year]
+
+
+def missing_columns(frame: pd.DataFrame, columns: Iterable[str]) -> List[str]:
+    """Return the required ``columns`` that the frame does not have."""
+    return [column for column in columns if column not in frame]
+
+
+def average_payouts_by_nights(frame: pd.DataFrame) -> pd.DataFrame:
+    """
+    Average host and guest payout per number of nights, in long format.
+
+    Returns:
+        pd.DataFrame: Columns ``Number of Nights``, ``Payout Type`` and
+        ``Average Payout`` (0 when no payout is known for a length of stay).
+    """
+    averages = (
+        frame.dropna(subset=["Number of Nights"])
+        .groupby("Number of Nights", sort=True)[PAYOUT_COLUMNS]
+        .mean()
+        .fillna(0)
+        .reset_index()
+    )
+    return averages.melt(
+        id_vars="Number of Nights",
+        value_vars=PAYOUT_COLUMNS,
+        var_name="Payout Type",
+        value_name="Average Payout",
+    )
+
+
+def values_by_month(
+    frame: pd.DataFrame, value_column: str, month_column: str = "month_year"
+) -> pd.DataFrame:
+    """Return the ``(month_column, value_column)`` pairs where both are known."""
+    return frame.loc[:, [month_column, value_column]].dropna()
@@ -1,98 +1,321 @@
 import datetime
+import hashlib
+import io
+import json
 import logging
 import os
+import re
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Set, Tuple
 
-import requests
-from ics import Calendar
-from notion_client import Client
+from services.listings.registry import Listing, load_listings
+from services.transport.http_client import get_http_client, get_notion_client
 
 logging.basicConfig(
     level=logging.INFO, format="%(asctime)s %(levelname)s %(name)s %(message)s"
 )
 logger = logging.getLogger(__name__)
 
-BLOCKED_DATE_DB_ID = os.environ.get("DATE_DATABASE_ID")
+BLOCKED_DATE_DB_ID = os.environ.get("DATE_DATABASE_ID") or os.environ.get(
+    "BLOCKED_DATE_DB_ID"
+)
 TOKEN = os.environ.get("NOTION_API")
 
+# Outside of the repository, so that it survives a clean checkout.
+DEFAULT_ICAL_STATE_PATH = os.path.join(
+    os.path.expanduser("~"), ".cache", "bnb-host-tools", "ical_state.json"
+)
+
+# Airbnb exports reservations and manually blocked nights alike, only the
+# latter are kept.
+BLOCKED_SUMMARY = "Airbnb (Not available)"
+
+Period = Tuple[str, str]
+
+_ESCAPED = re.compile(r"\\([\\;,nN])")
+_UNESCAPED = {"n": "\n", "N": "\n"}
+
+
+def load_ical_state(path: str, calendar_url: str) -> Dict[str, Any]:
+    """
+    Load the state of the last successful push for ``calendar_url``.
+
+    The state holds the validators of the last response (``etag``,
+    ``last_modified``) and the hash of its blocked periods. A missing or
+    unreadable file, or a state saved for another feed, gives an empty state.
+    """
+    try:
+        with open(path, "r", encoding="utf-8") as state_file:
+            state = json.load(state_file)
+    except FileNotFoundError:
+        return {"url": calendar_url}
+    except (OSError, ValueError) as error:
+        logger.warning(f"Ignoring unreadable iCal state {path}: {error}")
+        return {"url": calendar_url}
+    if state.get("url") != calendar_url:
+        return {"url": calendar_url}
+    return state
+
 
-def fetch_blocked_days_from_airbnb_ical(calendar_url: str):
+def save_ical_state(path: str, state: Dict[str, Any]) -> None:
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as state_file:
+        json.dump(state, state_file, indent=2)
+    os.replace(tmp_path, path)
+
+
+def _conditional_headers(state: Optional[Dict[str, Any]]) -> Dict[str, str]:
+    headers = {}
+    if state and state.get("etag"):
+        headers["If-None-Match"] = state["etag"]
+    if state and state.get("last_modified"):
+        headers["If-Modified-Since"] = state["last_modified"]
+    return headers
+
+
+def _periods_hash(periods: List[Dict[str, Any]]) -> str:
+    """Hash the (start, end) of the periods, in any order."""
+    key = sorted(
+        (period["start_date"].isoformat(), period["end_date"].isoformat())
+        for period in periods
+    )
+    return hashlib.sha256(json.dumps(key).encode("utf-8")).hexdigest()
+
+
+def fetch_blocked_days_from_airbnb_ical(
+    calendar_url: str, state: Optional[Dict[str, Any]] = None
+):
+    """
+    Fetch the blocked periods of the Airbnb iCal feed.
+
+    With a ``state`` (see ``load_ical_state``) the request is conditional
+    (``If-None-Match``/``If-Modified-Since``) and the state is updated with the
+    new validators and the hash of the blocked periods. The periods are hashed
+    rather than the body: Airbnb regenerates the ``DTSTAMP`` of every event on
+    each fetch.
+
+    Returns:
+        The blocked periods, or None when a state is given and the feed did not
+        change since it was saved (304 response or same blocked periods).
+    """
     logger.info(f"Fetching Airbnb iCal from URL: {calendar_url}")
-    r = requests.get(calendar_url)
+    r = get_http_client().get(calendar_url, headers=_conditional_headers(state))
+    if state is not None and r.status_code == 304:
+        logger.info("iCal feed not modified (304), skipping parsing")
+        return None
     r.raise_for_status()
 
     logger.debug("Parsing calendar data from iCal response")
-    calendar = Calendar(r.text)
-
-    blocked_events = [
-        event for event in calendar.events if "Airbnb (Not available)" in event.name
-    ]
-    logger.info(f"Found {len(blocked_events)} blocked events in calendar")
-
-    data = []
-    for evt in blocked_events:
-        logger.debug(
-            f"Blocked event: {evt.name}, {evt.begin.date()} to {evt.end.date()}"
-        )
-        data.append(
-            {
-                "start_date": evt.begin.date(),
-                "end_date": evt.end.date(),
-                "Name": evt.name,
-            }
-        )
+    data = list(iter_blocked_periods(io.StringIO(r.text)))
+    if state is not None:
+        state["etag"] = r.headers.get("ETag")
+        state["last_modified"] = r.headers.get("Last-Modified")
+        digest = _periods_hash(data)
+        if digest == state.get("hash"):
+            logger.info("iCal blocked periods unchanged, skipping the sync")
+            return None
+        state["hash"] = digest
     logger.info(f"Returning list with {len(data)} blocked days")
     return data
 
 
-def push_blocked_days_to_notion(calendar_url: str):
+def _unfold(lines: Iterable[str]) -> Iterator[str]:
+    """Join the continuation lines (starting with a space or tab) of an iCal feed."""
+    current = None
+    for line in lines:
+        line = line.rstrip("\r\n")
+        if line[:1] in (" ", "\t"):
+            if current is not None:
+                current += line[1:]
+            continue
+        if current is not None:
+            yield current
+        current = line
+    if current is not None:
+        yield current
+
+
+def _ical_date(value: str) -> datetime.date:
+    # DATE (20230901) and DATE-TIME (20230901T120000Z) values, the day is kept.
+    return datetime.date(int(value[:4]), int(value[4:6]), int(value[6:8]))
+
+
+def _unescape(text: str) -> str:
+    return _ESCAPED.sub(lambda match: _UNESCAPED.get(match[1], match[1]), text)
+
+
+def iter_blocked_periods(
+    lines: Iterable[str], summary: str = BLOCKED_SUMMARY
+) -> Iterator[Dict[str, Any]]:
+    """
+    Stream the blocked periods of an iCal feed, one line at a time.
+
+    Only the SUMMARY, DTSTART and DTEND properties of each VEVENT are read, and
+    an event is skipped as soon as its SUMMARY does not contain ``summary``.
+
+    Args:
+        lines (Iterable[str]): Lines of the feed (a file object or response).
+        summary (str): Text the SUMMARY of a blocked event contains.
+
+    Yields:
+        Dict[str, Any]: ``start_date`` and ``end_date`` (``datetime.date``) and
+        ``Name`` of each blocked event.
+    """
+    event = None
+    for line in _unfold(lines):
+        if line == "BEGIN:VEVENT":
+            event = {}
+            continue
+        if event is None:
+            continue
+        if line == "END:VEVENT":
+            if event and "start" in event and "name" in event:
+                start = event["start"]
+                # Without DTEND an all-day event lasts one day, a timed event
+                # ends when it starts (RFC 5545).
+                end = event.get("end", start + event["length"])
+                logger.debug(f"Blocked event: {event['name']}, {start} to {end}")
+                yield {"start_date": start, "end_date": end, "Name": event["name"]}
+            event = None
+            continue
+        if event is False:
+            continue
+        name, _, value = line.partition(":")
+        key = name.partition(";")[0].upper()
+        if key == "SUMMARY":
+            text = _unescape(value)
+            # Filter early: the rest of a non-blocked event is not parsed.
+            event = {**event, "name": text} if summary in text else False
+        elif key == "DTSTART":
+            event["start"] = _ical_date(value)
+            event["length"] = datetime.timedelta(days=1 if len(value) == 8 else 0)
+        elif key == "DTEND":
+            event["end"] = _ical_date(value)
+
+
+def _query_all_pages(notion_client, database_id: str) -> Iterator[Dict[str, Any]]:
+    """Yield every page of a blocked-days database, following the cursor."""
+    kwargs = {"database_id": database_id, "page_size": 100}
+    while True:
+        query = notion_client.databases.query(**kwargs)
+        yield from query.get("results", [])
+        cursor = query.get("next_cursor")
+        if not query.get("has_more") or not cursor:
+            return
+        kwargs["start_cursor"] = cursor
+
+
+def _date_property(page: Dict[str, Any], name: str) -> Optional[str]:
+    prop = page.get("properties", {}).get(name) or {}
+    start = (prop.get("date") or {}).get("start")
+    return start[:10] if start else None
+
+
+def index_blocked_pages(pages: Iterable[Dict[str, Any]]) -> Dict[Period, List[str]]:
+    """Return the IDs of the pages of each (start, end) period, as ISO dates."""
+    index: Dict[Period, List[str]] = {}
+    for page in pages:
+        start = _date_property(page, "Start Date")
+        end = _date_property(page, "End Date")
+        if start and end:
+            index.setdefault((start, end), []).append(page["id"])
+    return index
+
+
+def _run_concurrently(calls: List[tuple], max_workers: int) -> None:
+    """Run ``(function, kwargs)`` calls on at most ``max_workers`` threads."""
+    if not calls:
+        return
+    with ThreadPoolExecutor(max_workers=max(1, max_workers)) as executor:
+        futures = [executor.submit(function, **kwargs) for function, kwargs in calls]
+        for future in futures:
+            future.result()
+
+
+def push_blocked_days_to_notion(
+    calendar_url: str,
+    state_path: Optional[str] = None,
+    max_workers: int = 4,
+    database_id: Optional[str] = None,
+):
+    """
+    Synchronize the blocked periods of the Airbnb iCal feed with Notion.
+
+    The existing pages are indexed by (start, end) from a paginated query, the
+    periods missing from Notion are created and the upcoming periods that were
+    removed from Airbnb are archived. Past periods that rolled out of the feed
+    are kept. Writes run on at most ``max_workers`` threads.
+
+    With a ``state_path`` nothing at all is done when the feed did not change
+    since the last successful push. ``database_id`` defaults to
+    ``BLOCKED_DATE_DB_ID``.
+    """
     logger.info("Pushing blocked days to Notion database")
-    notion_client = Client(auth=TOKEN)
-    blocked_days = fetch_blocked_days_from_airbnb_ical(calendar_url)
+    database_id = database_id or BLOCKED_DATE_DB_ID
+    state = load_ical_state(state_path, calendar_url) if state_path else None
+    blocked_days = fetch_blocked_days_from_airbnb_ical(calendar_url, state)
+    if blocked_days is None:
+        logger.info("Blocked days unchanged since the last push, nothing to do")
+        save_ical_state(state_path, state)
+        return
     logger.debug(f"Fetched {len(blocked_days)} blocked days from Airbnb iCal")
-    existing_pages = notion_client.databases.query(database_id=BLOCKED_DATE_DB_ID).get(
-        "results", []
-    )
-    logger.info(f"Fetched {len(existing_pages)} existing pages from Notion database")
 
+    feed_periods: Set[Period] = set()
+    rows_by_period: Dict[Period, Dict[str, Any]] = {}
     for row in blocked_days:
         start = row["start_date"]
         end = row["end_date"]
-
+        period = (str(start), str(end))
+        feed_periods.add(period)
         if (end - start).days > 7:
             logger.debug(
                 f"Skipping blocked period from {start} to {end} (>{(end-start).days} days)"
             )
             continue
+        rows_by_period[period] = row
 
-        insert_date = datetime.datetime.now().isoformat()
+    notion_client = get_notion_client(TOKEN)
+    existing = index_blocked_pages(_query_all_pages(notion_client, database_id))
+    logger.info(f"Indexed {len(existing)} blocked periods from Notion database")
 
-        if not any(
-            str(start) in str(page) and str(end) in str(page) for page in existing_pages
-        ):
-            logger.info(
-                f"Creating Notion page for blocked period: {start} to {end}, Name: {row['Name']}"
-            )
-            notion_client.pages.create(
-                parent={"database_id": BLOCKED_DATE_DB_ID},
-                properties={
+    insert_date = datetime.datetime.now().isoformat()
+    creates = [
+        (
+            notion_client.pages.create,
+            {
+                "parent": {"database_id": database_id},
+                "properties": {
                     "Name": {"title": [{"text": {"content": row["Name"]}}]},
-                    "Start Date": {"date": {"start": str(start)}},
-                    "End Date": {"date": {"start": str(end)}},
+                    "Start Date": {"date": {"start": start}},
+                    "End Date": {"date": {"start": end}},
                     "Insert Date": {"date": {"start": insert_date}},
                 },
-            )
-        else:
-            logger.debug(
-                f"Blocked period {start} to {end} already exists in Notion, skipping."
-            )
+            },
+        )
+        for (start, end), row in sorted(rows_by_period.items())
+        if (start, end) not in existing
+    ]
+    today = datetime.date.today().isoformat()
+    archives = [
+        (notion_client.pages.update, {"page_id": page_id, "archived": True})
+        for (start, end), page_ids in sorted(existing.items())
+        if (start, end) not in feed_periods and end > today
+        for page_id in page_ids
+    ]
+    logger.info(
+        f"Creating {len(creates)} and archiving {len(archives)} blocked period page(s)"
+    )
+    _run_concurrently(creates + archives, max_workers)
+
+    if state is not None:
+        save_ical_state(state_path, state)
 
 
-def fetch_blocked_days_from_notion():
+def fetch_blocked_days_from_notion(database_id: Optional[str] = None):
     logger.info("Fetching blocked days from Notion database")
-    notion_client = Client(auth=TOKEN)
-    pages = notion_client.databases.query(database_id=BLOCKED_DATE_DB_ID).get(
-        "results", []
-    )
+    notion_client = get_notion_client(TOKEN)
+    pages = list(_query_all_pages(notion_client, database_id or BLOCKED_DATE_DB_ID))
     logger.debug(f"Fetched {len(pages)} pages from Notion database")
     data = []
     for page in pages:
@@ -119,11 +342,47 @@ def fetch_blocked_days_from_notion():
     return data
 
 
+def listing_state_path(base_path: str, listing: Listing, shared: bool) -> str:
+    """Return the iCal state file of a listing, one per listing when ``shared``."""
+    if not shared:
+        return base_path
+    root, extension = os.path.splitext(base_path)
+    return f"{root}-{listing.name}{extension}"
+
+
+def push_all_listings() -> List[str]:
+    """
+    Push the blocked days of every listing with an iCal feed and a database.
+
+    A failing listing is logged and does not stop the others.
+
+    Returns:
+        List[str]: The names of the listings that failed.
+    """
+    base_path = os.environ.get("ICAL_STATE_PATH", DEFAULT_ICAL_STATE_PATH)
+    listings = [
+        listing
+        for listing in load_listings()
+        if listing.ical_url and listing.blocked_database_id
+    ]
+    failed = []
+    for listing in listings:
+        try:
+            push_blocked_days_to_notion(
+                listing.ical_url,
+                state_path=listing_state_path(base_path, listing, len(listings) > 1),
+                database_id=listing.blocked_database_id,
+            )
+            logger.info(f"Pushed the blocked days of listing {listing.name}")
+        except Exception as e:
+            logger.error(
+                f"Failed to push the blocked days of listing {listing.name}: {e}",
+                exc_info=True,
+            )
+            failed.append(listing.name)
+    return failed
+
+
 if __name__ == "__main__":
-    try:
-        calendar_url = os.environ.get("CALENDAR_URL")
-        logger.info("Starting push_blocked_days_to_notion script")
-        push_blocked_days_to_notion(calendar_url)
-        logger.info("Successfully pushed blocked days from calendar to Notion")
-    except Exception as e:
-        logger.error(f"Failed to push blocked days to Notion: {e}", exc_info=True)
+    logger.info("Starting push_blocked_days_to_notion script")
+    push_all_listings()
@@ -0,0 +1,201 @@
+"""
+Nightly occupancy calendar.
+
+Reservations (arrival/departure) and blocked periods (start/end) are expanded
+into one state per night over the whole history, with vectorized range
+operations (difference arrays and cumulative sums), so occupancy rates, gaps
+between stays and orphan nights are answered with array slices instead of
+loops over the bookings.
+"""
+
+import datetime
+from dataclasses import dataclass
+from typing import Any, Iterable, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+FREE = 0
+BOOKED = 1
+BLOCKED = 2
+
+_ONE_DAY = np.timedelta64(1, "D")
+
+
+def _days(values: Iterable[Any]) -> np.ndarray:
+    if isinstance(values, pd.Series):
+        values = values.values
+    return np.asarray(values, dtype="datetime64[D]")
+
+
+def expand_nights(starts: Iterable[Any], nights: Iterable[int]) -> np.ndarray:
+    """
+    Return one date per night of every stay (``nights`` nights from ``starts``).
+
+    Stays with a missing start or no night are ignored.
+    """
+    starts = _days(starts)
+    nights = np.asarray(nights, dtype="int64")
+    keep = (nights > 0) & ~np.isnat(starts)
+    starts, nights = starts[keep], nights[keep]
+    first_night = np.repeat(np.cumsum(nights) - nights, nights)
+    offsets = np.arange(nights.sum()) - first_night
+    return np.repeat(starts, nights) + offsets.astype("timedelta64[D]")
+
+
+def _runs(mask: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """Return the start and end (exclusive) indexes of the True runs of ``mask``."""
+    edges = np.diff(np.concatenate(([0], mask.astype("int8"), [0])))
+    return np.flatnonzero(edges == 1), np.flatnonzero(edges == -1)
+
+
+@dataclass(frozen=True)
+class Gap:
+    """Free nights between two unavailable nights (``end`` is exclusive)."""
+
+    start: datetime.date
+    end: datetime.date
+
+    @property
+    def nights(self) -> int:
+        return (self.end - self.start).days
+
+
+class OccupancyCalendar:
+    """
+    One state per night (``FREE``, ``BOOKED`` or ``BLOCKED``) from ``start`` to
+    ``end`` (exclusive). A night both booked and blocked counts as booked.
+    """
+
+    def __init__(self, start: Any, end: Any) -> None:
+        self.start = np.datetime64(start, "D")
+        self.end = np.datetime64(end, "D")
+        if self.end < self.start:
+            raise ValueError("The calendar end is before its start.")
+        self.states = np.zeros(int((self.end - self.start) / _ONE_DAY), dtype="int8")
+
+    @classmethod
+    def from_intervals(
+        cls,
+        booked: Tuple[Iterable[Any], Iterable[Any]],
+        blocked: Optional[Tuple[Iterable[Any], Iterable[Any]]] = None,
+        start: Any = None,
+        end: Any = None,
+    ) -> "OccupancyCalendar":
+        """
+        Build the calendar from (starts, ends) arrays of stays and blocked periods.
+
+        Without ``start``/``end`` the calendar spans from the first to the last
+        night of all intervals.
+        """
+        blocked = blocked or ([], [])
+        starts = [_days(booked[0]), _days(blocked[0])]
+        ends = [_days(booked[1]), _days(blocked[1])]
+        if start is None or end is None:
+            all_starts = np.concatenate(starts)
+            all_ends = np.concatenate(ends)
+            valid = ~np.isnat(all_starts) & ~np.isnat(all_ends)
+            if not valid.any():
+                today = np.datetime64(datetime.date.today(), "D")
+                return cls(today, today)
+            start = all_starts[valid].min() if start is None else start
+            end = all_ends[valid].max() if end is None else end
+        calendar = cls(start, end)
+        calendar.mark(starts[1], ends[1], BLOCKED)
+        calendar.mark(starts[0], ends[0], BOOKED)
+        return calendar
+
+    @classmethod
+    def from_frames(
+        cls, reservations: pd.DataFrame, blocked_days: Optional[List[dict]] = None
+    ) -> "OccupancyCalendar":
+        """Build the calendar from the dashboard frame and the blocked-day rows."""
+        arrival = reservations.get("Arrival Date", pd.Series(dtype="datetime64[ns]"))
+        departure = reservations.get(
+            "Departure Date", pd.Series(pd.NaT, index=arrival.index)
+        )
+        if "Number of Nights" in reservations:
+            nights = pd.to_timedelta(reservations["Number of Nights"], unit="D")
+            departure = departure.fillna(arrival + nights)
+        periods = pd.DataFrame.from_records(blocked_days or [])
+        blocked = ([], [])
+        if not periods.empty:
+            blocked = (
+                pd.to_datetime(periods["start_date"], errors="coerce"),
+                pd.to_datetime(periods["end_date"], errors="coerce"),
+            )
+        return cls.from_intervals((arrival, departure), blocked)
+
+    def mark(self, starts: Iterable[Any], ends: Iterable[Any], state: int) -> None:
+        """Set the nights of every [start, end) interval to ``state``."""
+        starts, ends = _days(starts), _days(ends)
+        valid = ~np.isnat(starts) & ~np.isnat(ends) & (ends > starts)
+        first = np.clip((starts[valid] - self.start) / _ONE_DAY, 0, len(self.states))
+        last = np.clip((ends[valid] - self.start) / _ONE_DAY, 0, len(self.states))
+        coverage = np.zeros(len(self.states) + 1, dtype="int32")
+        np.add.at(coverage, first.astype("int64"), 1)
+        np.add.at(coverage, last.astype("int64"), -1)
+        self.states[np.cumsum(coverage[:-1]) > 0] = state
+
+    def _index(self, day: Any, default: int) -> int:
+        if day is None:
+            return default
+        offset = (np.datetime64(day, "D") - self.start) / _ONE_DAY
+        return int(np.clip(offset, 0, len(self.states)))
+
+    def _window(self, start: Any = None, end: Any = None) -> np.ndarray:
+        return self.states[self._index(start, 0) : self._index(end, len(self.states))]
+
+    def counts(self, start: Any = None, end: Any = None) -> dict:
+        """Number of booked, blocked and free nights in [start, end)."""
+        booked, blocked, free = np.bincount(self._window(start, end), minlength=3)[
+            [BOOKED, BLOCKED, FREE]
+        ]
+        return {"booked": int(booked), "blocked": int(blocked), "free": int(free)}
+
+    def occupancy_rate(self, start: Any = None, end: Any = None) -> float:
+        """Booked nights over the nights that were not blocked, in [start, end)."""
+        counts = self.counts(start, end)
+        available = counts["booked"] + counts["free"]
+        return counts["booked"] / available if available else 0.0
+
+    def is_free(self, start: Any, end: Any) -> bool:
+        """Whether no night of [start, end) is booked (the conflict check)."""
+        return not (self._window(start, end) == BOOKED).any()
+
+    def gaps(self, max_nights: Optional[int] = None) -> List[Gap]:
+        """
+        Free runs enclosed by unavailable nights on both sides.
+
+        Args:
+            max_nights (int, optional): Only return gaps of at most this length.
+        """
+        run_starts, run_ends = _runs(self.states == FREE)
+        # Runs touching the calendar edges are open-ended, not gaps.
+        enclosed = (run_starts > 0) & (run_ends < len(self.states))
+        run_starts, run_ends = run_starts[enclosed], run_ends[enclosed]
+        if max_nights is not None:
+            short = (run_ends - run_starts) <= max_nights
+            run_starts, run_ends = run_starts[short], run_ends[short]
+        starts = (self.start + run_starts.astype("timedelta64[D]")).tolist()
+        ends = (self.start + run_ends.astype("timedelta64[D]")).tolist()
+        return [Gap(start, end) for start, end in zip(starts, ends)]
+
+    def orphan_nights(self, min_stay: int = 2) -> List[Gap]:
+        """Gaps shorter than ``min_stay`` nights, which no guest can book."""
+        return self.gaps(max_nights=min_stay - 1)
+
+    def monthly(self) -> pd.DataFrame:
+        """Booked, blocked and free nights and occupancy rate per month."""
+        months = (
+            self.start + np.arange(len(self.states)).astype("timedelta64[D]")
+        ).astype("datetime64[M]")
+        frame = pd.DataFrame({"month": months, "state": self.states})
+        table = (
+            pd.crosstab(frame["month"], frame["state"])
+            .reindex(columns=[BOOKED, BLOCKED, FREE], fill_value=0)
+            .set_axis(["booked", "blocked", "free"], axis=1)
+        )
+        available = (table["booked"] + table["free"]).replace(0, np.nan)
+        table["occupancy_rate"] = (table["booked"] / available).fillna(0.0)
+        return table
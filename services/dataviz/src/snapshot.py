@@ -0,0 +1,148 @@
+"""
+Persisted snapshot of the dashboard data.
+
+The reservation frame is stored as a zstd-compressed Parquet file whose schema
+metadata carries a schema version and the time of the last sync with Notion. On
+startup the dashboard loads the snapshot and only asks Notion for the pages
+edited since that time.
+"""
+
+import datetime
+import os
+import warnings
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from services.dataviz.src.data_layer import normalize_frame, reservations_frame
+
+# Bump when the columns or their types change, older snapshots are then rebuilt.
+SNAPSHOT_SCHEMA_VERSION = 2
+
+DEFAULT_SNAPSHOT_PATH = os.path.join(
+    os.path.dirname(__file__), "..", "data", "reservations.parquet"
+)
+
+_VERSION_KEY = b"bnb.schema_version"
+_LAST_SYNC_KEY = b"bnb.last_sync"
+
+
+def snapshot_path() -> str:
+    """Return the snapshot location, configurable with DASHBOARD_SNAPSHOT_PATH."""
+    return os.environ.get("DASHBOARD_SNAPSHOT_PATH", DEFAULT_SNAPSHOT_PATH)
+
+
+@dataclass
+class Snapshot:
+    frame: pd.DataFrame
+    last_sync: str
+
+
+class SnapshotStore:
+    """Read and write the reservation snapshot."""
+
+    def __init__(self, path: Optional[str] = None) -> None:
+        self.path = path or snapshot_path()
+
+    def load(self) -> Optional[Snapshot]:
+        """
+        Load the snapshot.
+
+        Returns:
+            Optional[Snapshot]: None when there is no snapshot, or when it was
+            written with another schema version or cannot be read.
+        """
+        if not os.path.exists(self.path):
+            return None
+        try:
+            table = pq.read_table(self.path)
+        except (OSError, pa.ArrowException) as error:
+            warnings.warn(
+                f"Ignoring unreadable snapshot {self.path}: {error}", UserWarning
+            )
+            return None
+        metadata = table.schema.metadata or {}
+        version = metadata.get(_VERSION_KEY, b"").decode()
+        if version != str(SNAPSHOT_SCHEMA_VERSION):
+            warnings.warn(
+                f"Ignoring snapshot {self.path} with schema version '{version}' "
+                f"(expected {SNAPSHOT_SCHEMA_VERSION})",
+                UserWarning,
+            )
+            return None
+        return Snapshot(
+            frame=table.to_pandas(),
+            last_sync=metadata[_LAST_SYNC_KEY].decode(),
+        )
+
+    def save(self, frame: pd.DataFrame, last_sync: str) -> None:
+        """Write the snapshot atomically, so a crash never leaves a partial file."""
+        table = pa.Table.from_pandas(frame, preserve_index=False)
+        metadata = dict(table.schema.metadata or {})
+        metadata[_VERSION_KEY] = str(SNAPSHOT_SCHEMA_VERSION).encode()
+        metadata[_LAST_SYNC_KEY] = last_sync.encode()
+        table = table.replace_schema_metadata(metadata)
+
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        tmp_path = f"{self.path}.tmp"
+        pq.write_table(table, tmp_path, compression="zstd")
+        os.replace(tmp_path, self.path)
+
+
+def _rows(notion_client, pages: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    return [
+        {
+            "page_id": page["id"],
+            "last_edited_time": page.get("last_edited_time"),
+            **notion_client.parse_page(page),
+        }
+        for page in pages
+    ]
+
+
+def _sync_time() -> str:
+    # Notion rounds last_edited_time down to the minute: start the next delta at
+    # the minute of this sync, rows edited meanwhile are fetched again.
+    now = datetime.datetime.now(datetime.timezone.utc).replace(second=0, microsecond=0)
+    return now.isoformat()
+
+
+def sync_reservations(
+    notion_client, store: SnapshotStore, full: bool = False
+) -> pd.DataFrame:
+    """
+    Bring the snapshot up to date with Notion and return the reservation frame.
+
+    Without a usable snapshot (or with ``full=True``) every page is fetched.
+    Otherwise only the pages edited since the last sync are fetched and replace
+    their previous version. Archived pages are only dropped by a full sync.
+
+    Args:
+        notion_client (NotionClient): Client of the reservation database.
+        store (SnapshotStore): Snapshot to read and update.
+        full (bool): Ignore the snapshot and fetch every page.
+
+    Returns:
+        pd.DataFrame: The up-to-date reservation frame.
+    """
+    snapshot = None if full else store.load()
+    sync_time = _sync_time()
+    if snapshot is None:
+        frame = reservations_frame(_rows(notion_client, notion_client.get_all_pages()))
+    else:
+        edited = _rows(
+            notion_client, notion_client.get_pages_edited_since(snapshot.last_sync)
+        )
+        if not edited:
+            return snapshot.frame
+        edited_frame = reservations_frame(edited)
+        previous = snapshot.frame[
+            ~snapshot.frame["page_id"].isin(edited_frame["page_id"])
+        ]
+        # Both parts are typed already, normalizing restores the categories.
+        frame = normalize_frame(pd.concat([previous, edited_frame], ignore_index=True))
+    store.save(frame, sync_time)
+    return frame
@@ -13,10 +13,25 @@ from services.google_integration.authentification import (
     print_token_ttl,
     refresh_access_token,
 )
+from services.listings.registry import DEFAULT_CALENDAR, DEFAULT_LOCATION
+from services.telemetry.tracer import traced_execute
+
+
+def _event_code(summary):
+    """Return the confirmation code of a "{name} - {code}" event summary."""
+    if " - " not in summary:
+        return None
+    return summary.rpartition(" - ")[2].strip() or None
 
 
 class CalendarService:
-    def __init__(self, calendar_summary="Airbnb réservation | Airbnb 预订"):
+    def __init__(self, calendar_summary=DEFAULT_CALENDAR, location=DEFAULT_LOCATION):
+        """
+        Args:
+            calendar_summary (str): Summary of the calendar of the listing.
+            location (str): Address of the listing, set on its events.
+        """
+        self.location = location
         # Authenticate and build calendar service
         token_path = os.getenv("TOKEN_PATH")
         creds = load_credentials(token_path)
@@ -24,7 +39,9 @@ class CalendarService:
         print_token_ttl(creds)
         self.service = build("calendar", "v3", credentials=creds)
         # Select calendar by its summary
-        calendar_list = self.service.calendarList().list().execute()
+        calendar_list = traced_execute(
+            "calendar.calendarList.list", self.service.calendarList().list()
+        )
         calendars = calendar_list.get("items", [])
         self.calendar_id = None
         for calendar in calendars:
@@ -33,15 +50,29 @@ class CalendarService:
                 break
         if not self.calendar_id:
             raise ValueError(f"Calendar '{calendar_summary}' not found.")
-        existing_events = (
-            self.service.events()
-            .list(calendarId=self.calendar_id, singleEvents=True)
-            .execute()
-            .get("items", [])
-        )
+        self.refresh_event_cache()
+
+    def refresh_event_cache(self):
+        """Reload the summaries of the calendar events used by ``event_exists``.
+
+        The cache is built once per service; events created through
+        ``create_event`` are added to it, events edited elsewhere are only seen
+        after a refresh.
+        """
+        existing_events = traced_execute(
+            "calendar.events.list",
+            self.service.events().list(calendarId=self.calendar_id, singleEvents=True),
+        ).get("items", [])
         self.existing_event_summaries = set(
             evt.get("summary", "") for evt in existing_events
         )
+        # Reservation events by confirmation code, for ``move_event`` and
+        # ``cancel_event``.
+        self.events_by_code = {}
+        for evt in existing_events:
+            code = _event_code(evt.get("summary", ""))
+            if code:
+                self.events_by_code[code] = evt
 
     def _parse_reservation_data(self, reservation):
         """Parse and validate reservation data.
@@ -176,7 +207,7 @@ class CalendarService:
         """
         event = {
             "summary": summary,
-            "location": "7 Rue Curial, 75019 Paris, France",
+            "location": self.location,
             "description": description,
             "start": {"dateTime": start_time.isoformat(), "timeZone": "UTC"},
             "end": {"dateTime": end_time.isoformat(), "timeZone": "UTC"},
@@ -256,15 +287,16 @@ class CalendarService:
 
         # Submit the event to Google Calendar API
         try:
-            created_event = (
-                self.service.events()
-                .insert(calendarId=self.calendar_id, body=event)
-                .execute()
+            created_event = traced_execute(
+                "calendar.events.insert",
+                self.service.events().insert(calendarId=self.calendar_id, body=event),
+                body=event,
             )
             print(f"Event created: {created_event.get('htmlLink')}")
             if has_conflict:
                 print("⚠️ WARNING: This event conflicts with another booking!")
             self.existing_event_summaries.add(event_summary)
+            self.events_by_code[reservation_code] = created_event
             return created_event
         except HttpError as error:
             print(f"An error occurred: {error}")
@@ -295,16 +327,15 @@ class CalendarService:
         reference_date_iso = reference_date.strftime("%Y-%m-%dT%H:%M:%SZ")
 
         try:
-            past_events_result = (
-                self.service.events()
-                .list(
+            past_events_result = traced_execute(
+                "calendar.events.list",
+                self.service.events().list(
                     calendarId=self.calendar_id,
                     timeMax=reference_date_iso,
                     timeMin=past_date_iso,
                     singleEvents=True,
                     orderBy="startTime",
-                )
-                .execute()
+                ),
             )
             events = past_events_result.get("items", [])
             if len(events) > 2:
@@ -344,16 +375,15 @@ class CalendarService:
         reference_date_iso = reference_date.strftime("%Y-%m-%dT%H:%M:%SZ")
 
         try:
-            future_events_result = (
-                self.service.events()
-                .list(
+            future_events_result = traced_execute(
+                "calendar.events.list",
+                self.service.events().list(
                     calendarId=self.calendar_id,
                     timeMax=future_date_iso,
                     timeMin=reference_date_iso,
                     singleEvents=True,
                     orderBy="startTime",
-                )
-                .execute()
+                ),
             )
             events = future_events_result.get("items", [])
             if len(events) > 2:
@@ -522,18 +552,22 @@ class CalendarService:
         """
         # Delete events by filtering events with the given reservation code in their summary.
         try:
-            events_result = (
-                self.service.events()
-                .list(calendarId=self.calendar_id, singleEvents=True)
-                .execute()
+            events_result = traced_execute(
+                "calendar.events.list",
+                self.service.events().list(
+                    calendarId=self.calendar_id, singleEvents=True
+                ),
             )
             events = events_result.get("items", [])
             deleted = False
             for event in events:
                 if reservation_code in event.get("summary", ""):
-                    self.service.events().delete(
-                        calendarId=self.calendar_id, eventId=event.get("id")
-                    ).execute()
+                    traced_execute(
+                        "calendar.events.delete",
+                        self.service.events().delete(
+                            calendarId=self.calendar_id, eventId=event.get("id")
+                        ),
+                    )
                     print(f"Deleted event: {event.get('summary')}")
                     deleted = True
             if not deleted:
@@ -541,6 +575,79 @@ class CalendarService:
         except HttpError as error:
             print(f"An error occurred: {error}")
 
+    def move_event(self, reservation_code, arrival_date=None, departure_date=None):
+        """Move the event of a reservation to new dates.
+
+        The event is found in the confirmation-code index and only the start
+        and end that changed are patched.
+
+        Args:
+            reservation_code (str): The reservation confirmation code.
+            arrival_date (str, optional): ISO date of the new check-in.
+            departure_date (str, optional): ISO date of the new check-out.
+
+        Returns:
+            bool: True if the event was moved.
+        """
+        event = self.events_by_code.get(reservation_code)
+        if event is None:
+            print(f"No event found with reservation code: {reservation_code}")
+            return False
+        body = {}
+        for key, value in (("start", arrival_date), ("end", departure_date)):
+            if value is None:
+                continue
+            # Same format as the events of ``create_event``.
+            moved = datetime.datetime.fromisoformat(value)
+            if moved.tzinfo is None:
+                moved = moved.replace(tzinfo=datetime.timezone.utc)
+            if event.get(key, {}).get("dateTime") != moved.isoformat():
+                body[key] = {"dateTime": moved.isoformat(), "timeZone": "UTC"}
+        if not body:
+            return False
+        try:
+            updated = traced_execute(
+                "calendar.events.patch",
+                self.service.events().patch(
+                    calendarId=self.calendar_id, eventId=event.get("id"), body=body
+                ),
+                body=body,
+            )
+        except HttpError as error:
+            print(f"An error occurred: {error}")
+            return False
+        self.events_by_code[reservation_code] = updated
+        print(f"Moved event: {updated.get('summary')}")
+        return True
+
+    def cancel_event(self, reservation_code):
+        """Delete the event of a cancelled reservation, found by its code.
+
+        Args:
+            reservation_code (str): The reservation confirmation code.
+
+        Returns:
+            bool: True if the event was deleted.
+        """
+        event = self.events_by_code.get(reservation_code)
+        if event is None:
+            print(f"No event found with reservation code: {reservation_code}")
+            return False
+        try:
+            traced_execute(
+                "calendar.events.delete",
+                self.service.events().delete(
+                    calendarId=self.calendar_id, eventId=event.get("id")
+                ),
+            )
+        except HttpError as error:
+            print(f"An error occurred: {error}")
+            return False
+        del self.events_by_code[reservation_code]
+        self.existing_event_summaries.discard(event.get("summary", ""))
+        print(f"Deleted event: {event.get('summary')}")
+        return True
+
     def event_exists(self, reservation_code):
         """Check if an event with the given reservation code already exists.
 
@@ -562,10 +669,11 @@ class CalendarService:
     def delete_all_reservation_events(self):
         # Delete all events with a reservation code (i.e., with " - " in the summary)
         try:
-            events_result = (
-                self.service.events()
-                .list(calendarId=self.calendar_id, singleEvents=True)
-                .execute()
+            events_result = traced_execute(
+                "calendar.events.list",
+                self.service.events().list(
+                    calendarId=self.calendar_id, singleEvents=True
+                ),
             )
             events = events_result.get("items", [])
             deleted = False
@@ -574,9 +682,12 @@ class CalendarService:
                 if (
                     " - " in summary
                 ):  # Reservation events follow the "{name} - {reservation_code}" pattern.
-                    self.service.events().delete(
-                        calendarId=self.calendar_id, eventId=event.get("id")
-                    ).execute()
+                    traced_execute(
+                        "calendar.events.delete",
+                        self.service.events().delete(
+                            calendarId=self.calendar_id, eventId=event.get("id")
+                        ),
+                    )
                     print(f"Deleted event: {summary}")
                     deleted = True
             if not deleted:
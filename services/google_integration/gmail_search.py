@@ -0,0 +1,96 @@
+"""
+Gmail search query selecting the unread mails worth downloading.
+
+Most unread mails are neither bookings nor reviews, and were downloaded only to
+be tagged "poubelle". ``SearchQuery`` builds a Gmail ``q`` string so Gmail
+itself returns the candidates: mails from the Airbnb domain or whose subject
+carries one of the French or English keywords of the booking, update and
+review mails (forwarded mails come from the host's own address, the subject is
+what gives them away), optionally only after a date.
+
+The filter is opt-in (``GMAIL_SEARCH=1``): the unread mails it leaves out are
+trashed without being downloaded, so a booking whose subject is missing from
+the keywords would be trashed too.
+"""
+
+import datetime
+import os
+from dataclasses import dataclass, replace
+from typing import Optional, Tuple
+
+DEFAULT_SENDERS = ("airbnb.com",)
+
+# Subject keywords of the mails classified by ``parse_reservation_header``.
+SUBJECT_KEYWORDS = (
+    "Réservation confirmée",
+    "Reservation confirmed",
+    "étoiles",
+    "star",
+    # Alterations and cancellations, see ``gmail_services.UPDATE_SUBJECT_PATTERNS``.
+    "annulée",
+    "canceled",
+    "cancelled",
+    "modifiée",
+    "altered",
+)
+
+
+def _split(value: str) -> Tuple[str, ...]:
+    return tuple(item.strip() for item in value.split(",") if item.strip())
+
+
+@dataclass(frozen=True)
+class SearchQuery:
+    """
+    Server-side filter of the unread mails.
+
+    Args:
+        senders (Tuple[str, ...]): Sender addresses or domains.
+        subject_keywords (Tuple[str, ...]): Words or phrases of the subject.
+        after (datetime.date, optional): Only mails received after this date.
+    """
+
+    senders: Tuple[str, ...] = DEFAULT_SENDERS
+    subject_keywords: Tuple[str, ...] = SUBJECT_KEYWORDS
+    after: Optional[datetime.date] = None
+
+    def build(self) -> str:
+        """Return the Gmail ``q`` string, e.g. ``{from:a subject:"b"} after:...``."""
+        terms = [f"from:{sender}" for sender in self.senders]
+        terms += [f'subject:"{keyword}"' for keyword in self.subject_keywords]
+        query = "{" + " ".join(terms) + "}" if terms else ""
+        if self.after is not None:
+            query = f"{query} after:{self.after:%Y/%m/%d}"
+        return query.strip()
+
+    def without_window(self) -> "SearchQuery":
+        """Return the same sender and subject filter, at any date."""
+        return replace(self, after=None)
+
+    @classmethod
+    def from_env(cls) -> Optional["SearchQuery"]:
+        """
+        Read the query from the environment.
+
+        ``GMAIL_SEARCH_SENDERS`` and ``GMAIL_SEARCH_KEYWORDS`` (comma-separated)
+        replace the defaults, ``GMAIL_SEARCH_DAYS`` keeps the mails of the last
+        days only. The filter is enabled with ``GMAIL_SEARCH=1``.
+
+        Returns:
+            Optional[SearchQuery]: The query, None when disabled (default).
+        """
+        if os.environ.get("GMAIL_SEARCH", "0") != "1":
+            return None
+        senders = os.environ.get("GMAIL_SEARCH_SENDERS")
+        keywords = os.environ.get("GMAIL_SEARCH_KEYWORDS")
+        days = os.environ.get("GMAIL_SEARCH_DAYS")
+        after = None
+        if days:
+            after = datetime.date.today() - datetime.timedelta(days=int(days))
+        return cls(
+            senders=_split(senders) if senders is not None else DEFAULT_SENDERS,
+            subject_keywords=(
+                _split(keywords) if keywords is not None else SUBJECT_KEYWORDS
+            ),
+            after=after,
+        )
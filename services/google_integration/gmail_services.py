@@ -1,7 +1,7 @@
 import base64
 import os
 import re
-from typing import Dict, List, Optional
+from typing import Dict, List, Optional, Pattern, Set
 
 from bs4 import BeautifulSoup
 from dateutil import parser
@@ -13,6 +13,60 @@ from services.google_integration.authentification import (
     print_token_ttl,
     refresh_access_token,
 )
+from services.google_integration.gmail_search import SearchQuery
+from services.telemetry.tracer import traced_execute
+
+# Header types of the mails tagged "reserved" and parsed by the workflow.
+RESERVED_TYPES = ("reservation", "alteration", "cancellation")
+
+# Most IDs accepted by one ``messages.batchModify`` call.
+BATCH_MODIFY_LIMIT = 1000
+
+# Forwarding prefixes ("TR :", "Fwd:", ...) in front of an Airbnb subject.
+_FORWARDED = r"^(?:(?:TR|RE|Fwd?|FW|WG)\s*:\s*)*(?:Your\s+|Votre\s+)?"
+
+# Subjects of the Airbnb alteration and cancellation mails, e.g. "Reservation
+# HM... canceled", "Réservation annulée", "Votre réservation a été modifiée".
+# Anchored on the reservation, so a confirmation offering "free cancellation"
+# or a policy update mentioning cancellations does not match.
+UPDATE_SUBJECT_PATTERNS: Dict[str, Pattern] = {
+    "cancellation": re.compile(
+        _FORWARDED + r"(?:Reservation|Réservation)\b[^\r\n]{0,60}?"
+        r"\b(?:cancell?ed|annulée)\b",
+        re.IGNORECASE,
+    ),
+    "alteration": re.compile(
+        _FORWARDED + r"(?:Reservation|Réservation)\b[^\r\n]{0,60}?"
+        r"\b(?:altered|modifiée)\b",
+        re.IGNORECASE,
+    ),
+}
+
+# Requests are not accepted yet, the reservation is unchanged.
+REQUEST_PATTERN = re.compile(r"\b(?:request|demande)\b", re.IGNORECASE)
+
+# Header line of a mail forwarded from Airbnb ("De : Airbnb", "From: Airbnb").
+_FORWARDED_FROM_AIRBNB = re.compile(
+    r"^\s*(?:De|From)\s*:[^\r\n]*\bairbnb\b", re.IGNORECASE | re.MULTILINE
+)
+
+
+def classify_update(subject: str) -> Optional[str]:
+    """Return ``cancellation`` or ``alteration`` for an update mail, else None."""
+    if REQUEST_PATTERN.search(subject):
+        return None
+    for kind, pattern in UPDATE_SUBJECT_PATTERNS.items():
+        if pattern.search(subject):
+            return kind
+    return None
+
+
+def is_from_airbnb(content: Dict[str, str]) -> bool:
+    """Whether a mail was sent by Airbnb, directly or forwarded by the host."""
+    if "airbnb" in content.get("Sender", "").lower():
+        return True
+    # The forwarded header is at the top of the body.
+    return bool(_FORWARDED_FROM_AIRBNB.search(content.get("Message_body", "")[:2000]))
 
 
 class GmailService:
@@ -33,6 +87,10 @@ class GmailService:
         self.user_id = "me"
         self.label_id_one = "INBOX"
         self.label_id_two = "UNREAD"
+        # Server-side filter of the unread mails, None to download them all.
+        self.search_query: Optional[SearchQuery] = SearchQuery.from_env()
+        # Label IDs by lowercase name, listed once (see ``label_ids``).
+        self._label_ids: Optional[Dict[str, str]] = None
         self.reservation_label_id = self.get_label_id("reserved")
         self.trash_label_id = self.get_label_id("poubelle")
         self.review_label_id = self.get_label_id("review")
@@ -50,9 +108,7 @@ class GmailService:
             if not label_id:
                 print(f"[yellow]Label '{label_name}' not found.[/yellow]")
                 return
-            self.gmail.users().messages().modify(
-                userId=self.user_id, id=msg_id, body={"addLabelIds": [label_id]}
-            ).execute()
+            self._add_label(msg_id, label_id)
         except HttpError as error:
             print(f"[red]An error occurred while tagging the email: {error}[/red]")
 
@@ -66,16 +122,38 @@ class GmailService:
         Returns:
             Optional[str]: The label ID if found; otherwise, None.
         """
-        try:
-            response = self.gmail.users().labels().list(userId=self.user_id).execute()
-            labels = response.get("labels", [])
-            for label in labels:
-                if label["name"].lower() == label_name.lower():
-                    return label["id"]
-            return None
-        except HttpError as error:
-            print(f"[red]An error occurred while fetching the label ID: {error}[/red]")
-            return None
+        return self.label_ids().get(label_name.lower())
+
+    def label_ids(self, refresh: bool = False) -> Dict[str, str]:
+        """
+        Returns the label IDs by lowercase label name.
+
+        Labels are listed once and cached, every lookup of a run (and of every
+        cycle of the daemon) reuses them.
+
+        Args:
+            refresh (bool, optional): List the labels again, to pick up labels
+                created or renamed since.
+
+        Returns:
+            Dict[str, str]: The label IDs; empty when listing failed.
+        """
+        if self._label_ids is None or refresh:
+            try:
+                response = traced_execute(
+                    "gmail.labels.list",
+                    self.gmail.users().labels().list(userId=self.user_id),
+                )
+            except HttpError as error:
+                print(
+                    f"[red]An error occurred while fetching the label ID: {error}[/red]"
+                )
+                return {}
+            self._label_ids = {
+                label["name"].lower(): label["id"]
+                for label in response.get("labels", [])
+            }
+        return self._label_ids
 
     def mark_as_read(self, msg_id: str) -> None:
         """
@@ -85,35 +163,103 @@ class GmailService:
             msg_id (str): The email message ID.
         """
         try:
-            self.gmail.users().messages().modify(
-                userId=self.user_id, id=msg_id, body={"removeLabelIds": ["UNREAD"]}
-            ).execute()
+            body = {"removeLabelIds": ["UNREAD"]}
+            traced_execute(
+                "gmail.messages.modify",
+                self.gmail.users()
+                .messages()
+                .modify(userId=self.user_id, id=msg_id, body=body),
+                body=body,
+            )
         except HttpError as error:
             print(f"An error occurred while marking the email as read: {error}")
 
-    def list_unread_mails(self) -> List[str]:
+    def list_unread_mails(self, verbose: bool = True) -> List[str]:
         """
         Lists unread mail IDs from specified labels.
 
+        Args:
+            verbose (bool, optional): Print the number of unread mails.
+
         Returns:
             List[str]: List of unread email IDs.
         """
         try:
-            unread_msgs = (
+            unread_msgs = traced_execute(
+                "gmail.messages.list",
                 self.gmail.users()
                 .messages()
                 .list(
                     userId=self.user_id, labelIds=[self.label_id_one, self.label_id_two]
-                )
-                .execute()
+                ),
             )
             mssg_list = unread_msgs.get("messages", [])
-            print("Total unread messages in inbox: ", str(len(mssg_list)))
+            if verbose:
+                print("Total unread messages in inbox: ", str(len(mssg_list)))
             return [mssg["id"] for mssg in mssg_list]
         except HttpError as error:
             print(f"An error occurred: {error}")
             return []
 
+    def list_candidate_mails(self, query: Optional[SearchQuery] = None) -> List[str]:
+        """
+        Lists the IDs of the unread mails matching ``search_query``.
+
+        Gmail applies the query, so only booking and review candidates are
+        returned. Without a query, every unread mail is a candidate.
+
+        Args:
+            query (SearchQuery, optional): Replaces ``search_query``.
+
+        Returns:
+            List[str]: List of candidate email IDs.
+        """
+        query = query or self.search_query
+        if query is None:
+            return self.list_unread_mails(verbose=False)
+        try:
+            response = traced_execute(
+                "gmail.messages.list",
+                self.gmail.users()
+                .messages()
+                .list(
+                    userId=self.user_id,
+                    labelIds=[self.label_id_one, self.label_id_two],
+                    q=query.build(),
+                ),
+            )
+            return [msg["id"] for msg in response.get("messages", [])]
+        except HttpError as error:
+            print(f"An error occurred while searching unread mails: {error}")
+            return self.list_unread_mails(verbose=False)
+
+    def trash_mails(self, msg_ids: List[str]) -> None:
+        """
+        Tags mails as 'poubelle' and marks them as read, by ID only.
+
+        One ``batchModify`` call handles up to ``BATCH_MODIFY_LIMIT`` mails,
+        none of them is downloaded.
+
+        Args:
+            msg_ids (List[str]): The email IDs.
+        """
+        body = {"removeLabelIds": ["UNREAD"]}
+        if self.trash_label_id:
+            body["addLabelIds"] = [self.trash_label_id]
+        for start in range(0, len(msg_ids), BATCH_MODIFY_LIMIT):
+            chunk = msg_ids[start : start + BATCH_MODIFY_LIMIT]
+            try:
+                traced_execute(
+                    "gmail.messages.batchModify",
+                    self.gmail.users()
+                    .messages()
+                    .batchModify(userId=self.user_id, body={"ids": chunk, **body}),
+                    body=body,
+                )
+                print(f"Tagged {len(chunk)} emails as poubelle and marked as read.")
+            except HttpError as error:
+                print(f"An error occurred while trashing emails: {error}")
+
     def _parse_headers(self, headers: List[Dict[str, str]]) -> Dict[str, str]:
         temp_dict: Dict[str, str] = {}
         for header in headers:
@@ -156,11 +302,9 @@ class GmailService:
             Dict[str, str]: A dictionary containing email details.
         """
         try:
-            message = (
-                self.gmail.users()
-                .messages()
-                .get(userId=self.user_id, id=msg_id)
-                .execute()
+            message = traced_execute(
+                "gmail.messages.get",
+                self.gmail.users().messages().get(userId=self.user_id, id=msg_id),
             )
             payload = message["payload"]
             temp_dict = self._parse_headers(payload["headers"])
@@ -181,9 +325,12 @@ class GmailService:
 
         Args:
             content (Dict[str, str]): Email details (must include 'Subject').
+                Alterations and cancellations must also come from Airbnb
+                (``is_from_airbnb``), other mails take the 'none' path.
 
         Returns:
             Dict[str, Optional[str]]: {'type': str, 'full_name': Optional[str], 'rating': Optional[str]}
+            where 'type' is 'reservation', 'alteration', 'cancellation', 'review' or 'none'.
         """
         subject = content.get("Subject", "")
         # Check for reservation patterns
@@ -203,6 +350,9 @@ class GmailService:
                 "full_name": match_res_fr.group("name").strip(),
                 "rating": None,
             }
+        update_kind = classify_update(subject)
+        if update_kind and is_from_airbnb(content):
+            return {"type": update_kind, "full_name": None, "rating": None}
         pattern_review = r"^TR\s*:\s*(?P<name>\S+).*?(?P<rating>\d+)(?:-star|\sétoiles)"
         match_review = re.search(pattern_review, subject, re.IGNORECASE)
         if match_review:
@@ -213,47 +363,93 @@ class GmailService:
             }
         return {"type": "none", "full_name": None, "rating": None}
 
-    def process_unread_emails(self) -> None:
+    def _add_label(self, msg_id: str, label_id: str) -> None:
+        body = {"addLabelIds": [label_id]}
+        traced_execute(
+            "gmail.messages.modify",
+            self.gmail.users()
+            .messages()
+            .modify(userId=self.user_id, id=msg_id, body=body),
+            body=body,
+        )
+
+    def process_unread_emails(self, skip_ids: Optional[Set[str]] = None) -> None:
         """
         Processes unread mails:
-        - Tags mails as 'reserved' if reservation confirmed,
+        - Tags mails as 'reserved' if reservation confirmed, altered or cancelled,
         - Otherwise tags as 'poubelle' and marks as read.
+
+        Only the candidates of ``search_query`` are downloaded and classified;
+        the unread mails failing its sender and subject filter are trashed in
+        bulk by ID. Mails passing the filter but older than its date window are
+        left unread.
+
+        Args:
+            skip_ids (Set[str], optional): IDs of mails already handled by an
+                interrupted run; they are neither downloaded nor tagged again.
         """
         try:
-            unread_ids = self.list_unread_mails()
+            unread_ids = [
+                msg_id
+                for msg_id in self.list_unread_mails()
+                if not (skip_ids and msg_id in skip_ids)
+            ]
+            # Listed after the unread mails: a mail arriving in between is left
+            # for the next run, never trashed unseen.
+            candidates = set(self.list_candidate_mails())
+            kept = candidates
+            if self.search_query is not None and self.search_query.after:
+                # The date window limits the downloads, not what is kept.
+                kept = set(
+                    self.list_candidate_mails(self.search_query.without_window())
+                )
             for msg_id in unread_ids:
+                if msg_id not in candidates:
+                    continue
                 content = self.get_mail_content(msg_id)
                 reservation_info = self.parse_reservation_header(content)
-                if reservation_info["type"] == "reservation":
+                if reservation_info["type"] in RESERVED_TYPES:
                     if self.reservation_label_id:
-                        self.gmail.users().messages().modify(
-                            userId=self.user_id,
-                            id=msg_id,
-                            body={"addLabelIds": [self.reservation_label_id]},
-                        ).execute()
+                        self._add_label(msg_id, self.reservation_label_id)
                         print(
-                            f"Tagged email {msg_id} as reserved for {reservation_info.get('full_name').split(' ')[0]}."
+                            f"Tagged email {msg_id} as reserved ({reservation_info['type']})."
                         )
                 # Check for review email with a regex matching 5-star patterns in both English and French
                 elif reservation_info["type"] == "review":
-                    self.gmail.users().messages().modify(
-                        userId=self.user_id,
-                        id=msg_id,
-                        body={"addLabelIds": [self.review_label_id]},
-                    ).execute()
+                    self._add_label(msg_id, self.review_label_id)
                     print(f"Tagged email {msg_id} as review email.")
                 else:
                     if self.trash_label_id:
-                        self.gmail.users().messages().modify(
-                            userId=self.user_id,
-                            id=msg_id,
-                            body={"addLabelIds": [self.trash_label_id]},
-                        ).execute()
+                        self._add_label(msg_id, self.trash_label_id)
                     self.mark_as_read(msg_id)
                     print(f"Tagged email {msg_id} as poubelle and marked as read.")
+            self.trash_mails([msg_id for msg_id in unread_ids if msg_id not in kept])
         except Exception as error:
             print(f"An error occurred while processing unread emails: {error}")
 
+    def list_unread_ids_by_label(self, label: str) -> List[str]:
+        """
+        Lists the IDs of unread emails tagged with the specified label.
+
+        Args:
+            label (str): The label to filter the emails.
+
+        Returns:
+            List[str]: The message IDs, without downloading any content.
+        """
+        try:
+            label_id = self.get_label_id(label)
+            response = traced_execute(
+                "gmail.messages.list",
+                self.gmail.users()
+                .messages()
+                .list(userId=self.user_id, labelIds=[label_id, "UNREAD"]),
+            )
+            return [msg["id"] for msg in response.get("messages", [])]
+        except HttpError as error:
+            print(f"An error occurred while listing mails for label {label}: {error}")
+            return []
+
     def get_unread_emails_content_by_label(self, label: str) -> List[Dict[str, str]]:
         """
         Retrieves the content of all unread emails tagged with the specified label.
@@ -266,11 +462,11 @@ class GmailService:
         """
         try:
             label_id = self.get_label_id(label)
-            response = (
+            response = traced_execute(
+                "gmail.messages.list",
                 self.gmail.users()
                 .messages()
-                .list(userId=self.user_id, labelIds=[label_id, "UNREAD"])
-                .execute()
+                .list(userId=self.user_id, labelIds=[label_id, "UNREAD"]),
             )
             messages = response.get("messages", [])
             contents: List[Dict[str, str]] = []
@@ -310,11 +506,11 @@ class GmailService:
             if not label_id:
                 print(f"Label '{label}' not found.")
                 return
-            response = (
+            response = traced_execute(
+                "gmail.messages.list",
                 self.gmail.users()
                 .messages()
-                .list(userId=self.user_id, labelIds=[label_id, "UNREAD"])
-                .execute()
+                .list(userId=self.user_id, labelIds=[label_id, "UNREAD"]),
             )
             messages = response.get("messages", [])
             for msg in messages:
@@ -0,0 +1,160 @@
+"""
+Registry of the listings handled by the workflow.
+
+Each listing has its own Gmail label, Google Calendar, Notion databases, iCal
+feed and address. The registry is read from the JSON file named by
+``LISTINGS_CONFIG``; without it a single listing is built from the environment
+variables of a one-listing setup (``DATABASE_ID``, ``CALENDAR_URL``, ...).
+
+Example ``listings.json``::
+
+    [
+        {"name": "curial", "label": "curial", "database_id": "...",
+         "calendar": "Curial", "location": "7 Rue Curial, 75019 Paris, France",
+         "ical_url": "https://www.airbnb.com/calendar/ical/1.ics",
+         "blocked_database_id": "..."},
+        {"name": "loft", "label": "loft", "database_id": "...",
+         "calendar": "Loft", "location": "..."}
+    ]
+"""
+
+import json
+import os
+from dataclasses import dataclass, fields
+from typing import Dict, Iterable, List, Optional
+
+DEFAULT_CALENDAR = "Airbnb réservation | Airbnb 预订"
+DEFAULT_LOCATION = "7 Rue Curial, 75019 Paris, France"
+
+
+@dataclass(frozen=True)
+class Listing:
+    """
+    One property and where its data lives.
+
+    ``label`` is the Gmail label that routes reservation and review mails to the
+    listing; the listing without a label receives the mails carrying no listing
+    label.
+    """
+
+    name: str
+    database_id: str
+    calendar: str = DEFAULT_CALENDAR
+    location: str = DEFAULT_LOCATION
+    label: Optional[str] = None
+    ical_url: Optional[str] = None
+    blocked_database_id: Optional[str] = None
+
+
+_FIELDS = {field.name for field in fields(Listing)}
+
+
+def default_listing() -> Listing:
+    """
+    The single listing configured by the environment variables.
+
+    ``DATABASE_ID`` is only required by the clients that use it (``NotionClient``
+    asserts it), the blocked-days job runs without it.
+    """
+    return Listing(
+        name="default",
+        database_id=os.environ.get("DATABASE_ID", ""),
+        ical_url=os.environ.get("CALENDAR_URL"),
+        blocked_database_id=(
+            os.environ.get("DATE_DATABASE_ID") or os.environ.get("BLOCKED_DATE_DB_ID")
+        ),
+    )
+
+
+def validate_listings(listings: Iterable[Listing]) -> List[Listing]:
+    """
+    Check that listing names and labels are unique and routing is unambiguous.
+
+    Raises:
+        ValueError: On an empty registry, a duplicate name or label, or more
+            than one listing without a label.
+    """
+    listings = list(listings)
+    if not listings:
+        raise ValueError("The listing registry is empty.")
+    names = [listing.name for listing in listings]
+    labels = [listing.label for listing in listings if listing.label]
+    for kind, values in (("name", names), ("label", labels)):
+        duplicates = sorted({value for value in values if values.count(value) > 1})
+        if duplicates:
+            raise ValueError(f"Duplicate listing {kind}: {', '.join(duplicates)}")
+    if len(listings) - len(labels) > 1:
+        raise ValueError("Only one listing can be configured without a label.")
+    return listings
+
+
+def load_listings(path: Optional[str] = None) -> List[Listing]:
+    """
+    Load the listing registry.
+
+    Args:
+        path (str, optional): JSON file with a list of listings. Defaults to
+            ``LISTINGS_CONFIG``; without it the registry holds ``default_listing()``.
+
+    Returns:
+        List[Listing]: The listings, in the order of the file.
+
+    Raises:
+        ValueError: When an entry misses ``name`` or ``database_id``, has unknown
+            keys, or the registry is invalid (see ``validate_listings``).
+    """
+    path = path or os.environ.get("LISTINGS_CONFIG")
+    if not path:
+        return [default_listing()]
+    with open(path, "r", encoding="utf-8") as config_file:
+        entries = json.load(config_file)
+    listings = []
+    for entry in entries:
+        unknown = sorted(set(entry) - _FIELDS)
+        if unknown:
+            raise ValueError(f"Unknown listing setting(s): {', '.join(unknown)}")
+        if not entry.get("name") or not entry.get("database_id"):
+            raise ValueError(f"Listing without name or database_id: {entry}")
+        listings.append(Listing(**entry))
+    return validate_listings(listings)
+
+
+def route_messages(
+    listings: List[Listing],
+    message_ids: Iterable[str],
+    labelled: Dict[str, Iterable[str]],
+) -> Dict[str, List[str]]:
+    """
+    Assign messages to listings from the Gmail labels they carry.
+
+    Args:
+        listings (List[Listing]): The registry.
+        message_ids (Iterable[str]): Messages to route.
+        labelled (Dict[str, Iterable[str]]): IDs of the messages carrying the label
+            of each labelled listing, by listing name.
+
+    Returns:
+        Dict[str, List[str]]: Message IDs by listing name. Messages carrying
+        several listing labels, or none when every listing has a label, are left
+        out (see ``unrouted``).
+    """
+    members = {name: set(ids) for name, ids in labelled.items()}
+    fallback = next((listing for listing in listings if not listing.label), None)
+    routes: Dict[str, List[str]] = {listing.name: [] for listing in listings}
+    for msg_id in message_ids:
+        owners = [
+            listing.name
+            for listing in listings
+            if listing.label and msg_id in members.get(listing.name, ())
+        ]
+        if not owners and fallback is not None:
+            owners = [fallback.name]
+        if len(owners) == 1:
+            routes[owners[0]].append(msg_id)
+    return routes
+
+
+def unrouted(message_ids: Iterable[str], routes: Dict[str, List[str]]) -> List[str]:
+    """Return the messages that ``route_messages`` assigned to no listing."""
+    routed = {msg_id for ids in routes.values() for msg_id in ids}
+    return [msg_id for msg_id in message_ids if msg_id not in routed]
@@ -0,0 +1,133 @@
+"""
+Locale-aware parsing of the money amounts of Airbnb mails.
+
+Amounts are written ``1 388,66 €`` (narrow no-break space groups) in French
+mails, ``€ 1,388.66`` in English ones and ``-36,03 €`` / ``-€ 36.03`` for the
+host service fee. ``AMOUNT_FORMATS`` holds the decimal and grouping separators
+of each locale (the only place to change for a new locale); ``AmountParser``
+strips currency symbols and spaces with one translation table, reads the sign
+and resolves the separators with the locale rules. An amount that cannot be
+read is reported, never turned into 0.0.
+"""
+
+import functools
+import re
+from dataclasses import dataclass
+from typing import Dict, Mapping, Optional, Tuple
+
+CURRENCY_SYMBOLS = "€$£"
+SPACES = " \t\u00a0\u202f\u2009"
+MINUS_SIGNS = "-\u2212\u2013"
+
+# Values of a field that was not found in the mail.
+MISSING_VALUES = (None, "", "N/A")
+
+
+@dataclass(frozen=True)
+class AmountFormat:
+    """Separators of the amounts of one locale (spaces are always grouping)."""
+
+    decimal: str
+    group: str
+
+
+AMOUNT_FORMATS: Dict[str, AmountFormat] = {
+    "fr": AmountFormat(decimal=",", group="."),
+    "en": AmountFormat(decimal=".", group=","),
+    "de": AmountFormat(decimal=",", group="."),
+    "es": AmountFormat(decimal=",", group="."),
+    "it": AmountFormat(decimal=",", group="."),
+    "pt": AmountFormat(decimal=",", group="."),
+}
+
+_STRIP = str.maketrans("", "", CURRENCY_SYMBOLS + SPACES)
+_DIGITS = re.compile(r"\d+(?:[.,]\d+)*")
+_SEPARATORS = re.compile(r"[.,]")
+
+
+class AmountParser:
+    """Parse the amounts of one locale."""
+
+    def __init__(self, locale: str) -> None:
+        if locale not in AMOUNT_FORMATS:
+            raise ValueError(f"No amount format for locale '{locale}'")
+        self.locale = locale
+        self.format = AMOUNT_FORMATS[locale]
+
+    def _decimal_separator(self, text: str) -> Optional[str]:
+        """Return the decimal separator used in ``text``, None for an integer."""
+        separators = _SEPARATORS.findall(text)
+        if not separators:
+            return None
+        if len(set(separators)) > 1:
+            # "1.388,66" or "1,388.66": the last separator is the decimal one.
+            return separators[-1]
+        separator = separators[0]
+        groups = text.split(separator)
+        if separator == self.format.group and all(len(g) == 3 for g in groups[1:]):
+            return None
+        if len(separators) == 1:
+            return separator
+        raise ValueError(f"Ambiguous separators in amount: {text!r}")
+
+    def parse(self, value: str) -> float:
+        """
+        Parse one amount.
+
+        Args:
+            value (str): Amount as written in the mail, with or without currency.
+
+        Returns:
+            float: The amount, negative when it starts or ends with a minus sign.
+
+        Raises:
+            ValueError: If ``value`` is not an amount.
+        """
+        text = value.translate(_STRIP)
+        negative = False
+        if text[:1] and text[0] in MINUS_SIGNS:
+            negative, text = True, text[1:].translate(_STRIP)
+        elif text[-1:] and text[-1] in MINUS_SIGNS:
+            negative, text = True, text[:-1]
+        if not _DIGITS.fullmatch(text):
+            raise ValueError(f"Unparsable amount: {value!r}")
+        decimal = self._decimal_separator(text)
+        if decimal is None:
+            number = _SEPARATORS.sub("", text)
+        else:
+            integer, _, fraction = text.rpartition(decimal)
+            number = f"{_SEPARATORS.sub('', integer)}.{fraction}"
+        amount = float(number)
+        return -amount if negative else amount
+
+    def parse_many(
+        self, values: Mapping[str, Optional[str]]
+    ) -> Tuple[Dict[str, Optional[float]], Dict[str, str]]:
+        """
+        Parse the amounts of a batch of fields in one call.
+
+        Args:
+            values (Mapping[str, Optional[str]]): Raw amount of each field.
+
+        Returns:
+            Tuple[Dict[str, Optional[float]], Dict[str, str]]: The amount of each
+            field (None when missing or unparsable), and the raw value of each
+            unparsable field.
+        """
+        amounts: Dict[str, Optional[float]] = {}
+        errors: Dict[str, str] = {}
+        for field, value in values.items():
+            amounts[field] = None
+            if value in MISSING_VALUES:
+                continue
+            try:
+                amounts[field] = self.parse(value)
+            except ValueError:
+                errors[field] = value
+        return amounts, errors
+
+
+@functools.lru_cache(maxsize=None)
+def amount_parser(locale: str) -> AmountParser:
+    """Return the shared ``AmountParser`` of ``locale``."""
+    return AmountParser(locale)
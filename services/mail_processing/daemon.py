@@ -0,0 +1,146 @@
+"""
+Long-running mode of the mail workflow.
+
+``main.py`` run from cron builds the Gmail, Calendar and Notion clients, lists
+the Gmail labels and loads the calendar events on every start, and a booking
+mailed just after a run waits for the next one. ``MailDaemon`` builds them once
+and polls the inbox: the workflow runs when an unread mail shows up that the
+previous run did not leave unread. The ledger and the parse cache make each
+run incremental.
+
+The poll interval adapts to the activity: it drops to ``min_interval`` after a
+poll that found mail (booking peaks come in bursts) and grows by ``backoff``
+after each idle poll or failed run, up to ``max_interval``. SIGTERM and SIGINT stop the
+daemon between two runs; a run in progress completes, so its Notion and
+Calendar writes and its journal are flushed, then the ledger and the parse
+cache are closed.
+"""
+
+import signal
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Optional, Set
+
+from rich import print
+
+from services.mail_processing.mail_processor import MailProcessorService
+
+DEFAULT_MIN_INTERVAL = 60.0
+DEFAULT_MAX_INTERVAL = 30 * 60.0
+
+# Labels and calendar events edited elsewhere are picked up this often.
+DEFAULT_REFRESH_INTERVAL = 6 * 60 * 60.0
+
+
+@dataclass
+class AdaptiveInterval:
+    """Poll interval that shrinks on activity and backs off when idle."""
+
+    min_interval: float = DEFAULT_MIN_INTERVAL
+    max_interval: float = DEFAULT_MAX_INTERVAL
+    backoff: float = 2.0
+    current: float = field(init=False)
+
+    def __post_init__(self) -> None:
+        if not 0 <= self.min_interval <= self.max_interval:
+            raise ValueError("Poll intervals must satisfy 0 <= min <= max.")
+        if self.backoff < 1:
+            raise ValueError("The poll backoff must be at least 1.")
+        self.current = self.min_interval
+
+    def next(self, active: bool) -> float:
+        """Return the wait before the next poll, after an active or idle poll."""
+        if active:
+            self.current = self.min_interval
+        else:
+            self.current = min(self.max_interval, self.current * self.backoff)
+        return self.current
+
+
+class MailDaemon:
+    """
+    Run the mail workflow whenever new mail arrives, with warm clients.
+
+    Args:
+        processor (MailProcessorService, optional): The service to run; created
+            (with the clients of every listing) when not given.
+        interval (AdaptiveInterval, optional): The poll interval policy.
+        refresh_interval (float): Seconds between two refreshes of the Gmail
+            label and calendar event caches.
+    """
+
+    def __init__(
+        self,
+        processor: Optional[MailProcessorService] = None,
+        interval: Optional[AdaptiveInterval] = None,
+        refresh_interval: float = DEFAULT_REFRESH_INTERVAL,
+    ) -> None:
+        self.processor = processor or MailProcessorService()
+        self.interval = interval or AdaptiveInterval()
+        self.refresh_interval = refresh_interval
+        self.stopping = threading.Event()
+        self.runs = 0
+        # Unread mails left by the last successful run (unsupported, unrouted).
+        self._settled: Set[str] = set()
+        self._refreshed_at = time.monotonic()
+
+    def stop(self, signum: Optional[int] = None, frame=None) -> None:
+        """Ask the daemon to stop once the current run is over."""
+        if not self.stopping.is_set():
+            print("[bold yellow]Stopping after the current run...[/bold yellow]")
+        self.stopping.set()
+
+    def poll_once(self) -> bool:
+        """
+        Run the workflow if the inbox has new unread mail.
+
+        Returns:
+            bool: Whether a run completed on new mail. A failed run counts as
+            idle, so a run that keeps failing is retried less and less often.
+        """
+        gmail = self.processor.gmail_service
+        unread = set(gmail.list_unread_mails(verbose=False))
+        if not unread - self._settled:
+            return False
+        self.runs += 1
+        try:
+            self.processor.run_workflow()
+        except Exception as error:
+            # The mails are not settled, the next poll retries them.
+            print(f"[bold red]Workflow run failed: {error!r}[/bold red]")
+            return False
+        self._settled = set(gmail.list_unread_mails(verbose=False))
+        return True
+
+    def _refresh_if_due(self) -> None:
+        if time.monotonic() - self._refreshed_at < self.refresh_interval:
+            return
+        self.processor.refresh_caches()
+        self._refreshed_at = time.monotonic()
+
+    def run(self, max_polls: Optional[int] = None) -> None:
+        """
+        Poll until SIGTERM or SIGINT (or ``max_polls`` polls), then shut down.
+
+        Must be called from the main thread, which receives the signals.
+        """
+        previous = {
+            signum: signal.signal(signum, self.stop)
+            for signum in (signal.SIGTERM, signal.SIGINT)
+        }
+        polls = 0
+        try:
+            self.processor.warm_up()
+            while not self.stopping.is_set():
+                active = self.poll_once()
+                polls += 1
+                if max_polls is not None and polls >= max_polls:
+                    break
+                self._refresh_if_due()
+                self.stopping.wait(self.interval.next(active))
+        finally:
+            self.processor.close()
+            for signum, handler in previous.items():
+                signal.signal(signum, handler)
+        print(f"[blue]Daemon stopped after {self.runs} workflow run(s).[/blue]")
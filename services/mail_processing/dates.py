@@ -0,0 +1,165 @@
+"""
+Resolution of the stay dates of Airbnb mails.
+
+Mails give the arrival and departure as a day, a localized month token
+("janv.", "Sep", "März") and, not always, a year. Month tokens are looked up
+in ``MONTHS``, one table precomputed from the month names of every locale and
+their 3 and 4 letter abbreviations. A missing year is inferred: the arrival is
+the first occurrence of its day on or after the mail date (a booking mailed in
+December for January is for the next year), the departure the first one after
+the arrival. Resolutions are cached, a backfill parses the same dates again
+and again.
+"""
+
+import datetime
+import functools
+from typing import Dict, Iterable, List, Optional, Tuple
+
+# fmt: off
+MONTH_NAMES: Dict[str, Tuple[str, ...]] = {
+    "fr": (
+        "janvier", "février", "mars", "avril", "mai", "juin",
+        "juillet", "août", "septembre", "octobre", "novembre", "décembre",
+    ),
+    "en": (
+        "january", "february", "march", "april", "may", "june",
+        "july", "august", "september", "october", "november", "december",
+    ),
+    "de": (
+        "januar", "februar", "märz", "april", "mai", "juni",
+        "juli", "august", "september", "oktober", "november", "dezember",
+    ),
+    "es": (
+        "enero", "febrero", "marzo", "abril", "mayo", "junio",
+        "julio", "agosto", "septiembre", "octubre", "noviembre", "diciembre",
+    ),
+}
+# fmt: on
+
+ABBREVIATION_LENGTHS = (3, 4)
+
+# A forwarded mail may be sent a few days after the arrival it announces.
+PAST_ARRIVAL_TOLERANCE = datetime.timedelta(days=7)
+
+# (day, month token, year or None), as extracted from the mail.
+DateParts = Tuple[str, str, Optional[str]]
+
+
+def _month_table(names: Dict[str, Tuple[str, ...]]) -> Dict[str, int]:
+    """Map every month name and unambiguous abbreviation to its number."""
+    table: Dict[str, int] = {}
+    ambiguous = set()
+    for locale_names in names.values():
+        for number, name in enumerate(locale_names, start=1):
+            for length in ABBREVIATION_LENGTHS:
+                token = name[:length]
+                if table.get(token, number) != number:
+                    ambiguous.add(token)
+                table[token] = number
+    for token in ambiguous:
+        del table[token]
+    for locale_names in names.values():
+        for number, name in enumerate(locale_names, start=1):
+            table[name] = number
+    return table
+
+
+MONTHS = _month_table(MONTH_NAMES)
+
+
+def month_number(token: str) -> Optional[int]:
+    """Return the number of a localized month name or abbreviation."""
+    return MONTHS.get(token.strip().rstrip(".").casefold())
+
+
+def _parts(parts: Optional[DateParts]) -> Optional[Tuple[int, int, Optional[int]]]:
+    if parts is None:
+        return None
+    day, token, year = parts
+    month = month_number(token or "")
+    try:
+        return int(day), month, int(year) if year else None
+    except (TypeError, ValueError):
+        return None
+
+
+def _exact(year: int, month: Optional[int], day: int) -> Optional[datetime.date]:
+    try:
+        return datetime.date(year, month, day)
+    except (TypeError, ValueError):
+        return None
+
+
+def _next_occurrence(month: int, day: int, floor: datetime.date):
+    """First ``month``/``day`` on or after ``floor`` (Feb 29 may skip years)."""
+    for year in range(floor.year, floor.year + 5):
+        candidate = _exact(year, month, day)
+        if candidate is not None and candidate >= floor:
+            return candidate
+    return None
+
+
+def _previous_occurrence(month: int, day: int, ceiling: datetime.date):
+    """Last ``month``/``day`` on or before ``ceiling``."""
+    for year in range(ceiling.year, ceiling.year - 5, -1):
+        candidate = _exact(year, month, day)
+        if candidate is not None and candidate <= ceiling:
+            return candidate
+    return None
+
+
+@functools.lru_cache(maxsize=4096)
+def resolve_stay(
+    arrival: Optional[DateParts],
+    departure: Optional[DateParts],
+    mail_date: Optional[datetime.date] = None,
+) -> Tuple[Optional[datetime.date], Optional[datetime.date]]:
+    """
+    Resolve the arrival and departure dates of a stay.
+
+    Args:
+        arrival (Optional[DateParts]): Day, month token and year (or None).
+        departure (Optional[DateParts]): Day, month token and year (or None).
+        mail_date (Optional[datetime.date]): Date the booking was mailed, used
+            when neither date carries a year.
+
+    Returns:
+        Tuple[Optional[datetime.date], Optional[datetime.date]]: The dates, None
+        when they cannot be resolved.
+    """
+    arrival_parts, departure_parts = _parts(arrival), _parts(departure)
+    arrival_date = departure_date = None
+    if departure_parts and departure_parts[2] is not None:
+        day, month, year = departure_parts
+        departure_date = _exact(year, month, day)
+
+    if arrival_parts:
+        day, month, year = arrival_parts
+        if year is not None:
+            arrival_date = _exact(year, month, day)
+        elif departure_date is not None:
+            arrival_date = _previous_occurrence(
+                month, day, departure_date - datetime.timedelta(days=1)
+            )
+        elif mail_date is not None:
+            arrival_date = _next_occurrence(
+                month, day, mail_date - PAST_ARRIVAL_TOLERANCE
+            )
+
+    if departure_parts and departure_date is None:
+        day, month, _ = departure_parts
+        floor = arrival_date + datetime.timedelta(days=1) if arrival_date else None
+        if floor is None and mail_date is not None:
+            floor = mail_date - PAST_ARRIVAL_TOLERANCE
+        if floor is not None:
+            departure_date = _next_occurrence(month, day, floor)
+    return arrival_date, departure_date
+
+
+def resolve_stays(
+    stays: Iterable[
+        Tuple[Optional[DateParts], Optional[DateParts], Optional[datetime.date]]
+    ]
+) -> List[Tuple[Optional[datetime.date], Optional[datetime.date]]]:
+    """Resolve a batch of ``(arrival, departure, mail_date)`` stays."""
+    return [resolve_stay(*stay) for stay in stays]
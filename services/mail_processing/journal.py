@@ -0,0 +1,106 @@
+import datetime
+import json
+import os
+import threading
+import warnings
+from typing import Any, Dict, Iterable, Optional, Set
+
+DEFAULT_JOURNAL_PATH = ".workflow_journal.jsonl"
+
+STAGES = ("fetched", "parsed", "notion", "calendar", "read")
+
+
+def journal_path() -> str:
+    """Return the journal location, configurable with WORKFLOW_JOURNAL_PATH."""
+    return os.environ.get("WORKFLOW_JOURNAL_PATH", DEFAULT_JOURNAL_PATH)
+
+
+class RunJournal:
+    """
+    Durable, append-only record of the units of work done by a workflow run.
+
+    Every completed stage of a message (fetched, parsed, written to Notion,
+    written to Calendar, marked as read) is appended as one JSON line and synced
+    to disk before the workflow moves on. When a run dies, the next run loads the
+    journal and skips the work that is already done. ``complete`` removes the
+    file, so the following run starts from scratch.
+
+    With ``path=None`` the journal only lives in memory.
+    """
+
+    def __init__(self, path: Optional[str] = None) -> None:
+        self.path = path
+        self.entries: Dict[str, Dict[str, Any]] = {}
+        self.resumed = False
+        # Listings are saved concurrently, each record is written as a whole.
+        self._lock = threading.Lock()
+        if path and os.path.exists(path):
+            self._load()
+
+    def _load(self) -> None:
+        with open(self.path, "r", encoding="utf-8") as journal_file:
+            for line_number, line in enumerate(journal_file, start=1):
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:
+                    # A crash while appending leaves a truncated last line.
+                    warnings.warn(
+                        f"Ignoring unreadable journal line {line_number} in {self.path}",
+                        UserWarning,
+                    )
+                    continue
+                stages = self.entries.setdefault(record["message_id"], {})
+                stages[record["stage"]] = record.get("payload")
+        self.resumed = bool(self.entries)
+
+    def record(self, stage: str, message_id: str, payload: Any = None) -> None:
+        """
+        Mark ``stage`` as done for ``message_id`` and persist it.
+
+        Args:
+            stage (str): One of ``STAGES``.
+            message_id (str): The Gmail message ID.
+            payload (Any, optional): JSON-serializable data needed to resume
+                without repeating the stage (mail content, parsed reservation).
+        """
+        if stage not in STAGES:
+            raise ValueError(f"Unknown journal stage: {stage}")
+        with self._lock:
+            self.entries.setdefault(message_id, {})[stage] = payload
+            if not self.path:
+                return
+            line = json.dumps(
+                {
+                    "stage": stage,
+                    "message_id": message_id,
+                    "payload": payload,
+                    "at": datetime.datetime.now().replace(microsecond=0).isoformat(),
+                },
+                ensure_ascii=False,
+            )
+            with open(self.path, "a", encoding="utf-8") as journal_file:
+                journal_file.write(line + "\n")
+                journal_file.flush()
+                os.fsync(journal_file.fileno())
+
+    def done(self, stage: str, message_id: str) -> bool:
+        return stage in self.entries.get(message_id, {})
+
+    def payload(self, stage: str, message_id: str) -> Any:
+        return self.entries.get(message_id, {}).get(stage)
+
+    def message_ids(self, stage: Optional[str] = None) -> Set[str]:
+        """Return the message IDs known to the journal, optionally for one stage."""
+        if stage is None:
+            return set(self.entries)
+        return {msg_id for msg_id, stages in self.entries.items() if stage in stages}
+
+    def pending(self, stage: str, message_ids: Iterable[str]) -> list:
+        """Return the message IDs of ``message_ids`` for which ``stage`` is not done."""
+        return [msg_id for msg_id in message_ids if not self.done(stage, msg_id)]
+
+    def complete(self) -> None:
+        """Close the run: forget the entries and remove the journal file."""
+        self.entries = {}
+        if self.path and os.path.exists(self.path):
+            os.remove(self.path)
@@ -0,0 +1,203 @@
+"""
+Persistent ledger of the processed reservation mails.
+
+The run journal only covers one run, and the Gmail UNREAD state is the only
+thing that stops later runs from fetching and parsing the same mails again;
+it is left untouched in debug mode or when marking as read fails. The ledger
+is a small SQLite database, kept across runs, with one row per message: its
+confirmation code, the parse outcome and whether it was written to Notion and
+Calendar. A message written to both is completed and is skipped before its body
+is downloaded.
+
+The completed message IDs are also loaded in a Bloom filter, so the common
+case (a new message) is answered in memory without a query.
+"""
+
+import datetime
+import hashlib
+import math
+import os
+import sqlite3
+import threading
+from dataclasses import dataclass
+from typing import Iterable, Optional, Set
+
+DEFAULT_LEDGER_PATH = os.path.join(
+    os.path.expanduser("~"), ".cache", "bnb-host-tools", "ledger.sqlite3"
+)
+
+SINKS = ("notion", "calendar")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS messages (
+    message_id TEXT PRIMARY KEY,
+    confirmation_code TEXT,
+    parse_status TEXT,
+    notion INTEGER NOT NULL DEFAULT 0,
+    calendar INTEGER NOT NULL DEFAULT 0,
+    completed_at TEXT,
+    updated_at TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS messages_confirmation_code
+    ON messages (confirmation_code);
+"""
+
+
+def ledger_path() -> str:
+    """Return the ledger location, configurable with MAIL_LEDGER_PATH."""
+    return os.environ.get("MAIL_LEDGER_PATH", DEFAULT_LEDGER_PATH)
+
+
+def _now() -> str:
+    return datetime.datetime.now().replace(microsecond=0).isoformat()
+
+
+class BloomFilter:
+    """
+    Set membership with no false negatives and about ``error_rate`` false
+    positives, in ``-capacity * ln(error_rate) / ln(2)^2`` bits.
+    """
+
+    def __init__(self, capacity: int, error_rate: float = 0.01) -> None:
+        capacity = max(1, capacity)
+        self.size = max(8, int(-capacity * math.log(error_rate) / math.log(2) ** 2))
+        self.hashes = max(1, round(self.size / capacity * math.log(2)))
+        self.bits = bytearray((self.size + 7) // 8)
+
+    def _positions(self, key: str) -> Iterable[int]:
+        # Double hashing: k positions from the two halves of one digest.
+        digest = hashlib.blake2b(key.encode("utf-8"), digest_size=16).digest()
+        first = int.from_bytes(digest[:8], "little")
+        second = int.from_bytes(digest[8:], "little") | 1
+        return ((first + index * second) % self.size for index in range(self.hashes))
+
+    def add(self, key: str) -> None:
+        for position in self._positions(key):
+            self.bits[position >> 3] |= 1 << (position & 7)
+
+    def __contains__(self, key: str) -> bool:
+        return all(
+            self.bits[position >> 3] & (1 << (position & 7))
+            for position in self._positions(key)
+        )
+
+
+class MessageLedger:
+    """
+    Parse outcome and sink status of every reservation mail, across runs.
+
+    Args:
+        path (str, optional): SQLite file; ``":memory:"`` keeps the ledger in
+            memory only. Defaults to ``ledger_path()``.
+        capacity (int): Minimum number of completed messages the Bloom filter
+            is sized for.
+    """
+
+    def __init__(self, path: Optional[str] = None, capacity: int = 10_000) -> None:
+        self.path = path or ledger_path()
+        if self.path != ":memory:":
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        # Listings are saved on several threads, all writes go through the lock.
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(self.path, check_same_thread=False)
+        with self._lock, self._connection:
+            self._connection.executescript(_SCHEMA)
+            completed = [
+                row[0]
+                for row in self._connection.execute(
+                    "SELECT message_id FROM messages WHERE completed_at IS NOT NULL"
+                )
+            ]
+        self._filter = BloomFilter(max(capacity, 2 * len(completed)))
+        for message_id in completed:
+            self._filter.add(message_id)
+
+    def close(self) -> None:
+        self._connection.close()
+
+    def _upsert(self, message_id: str, **columns) -> None:
+        columns["updated_at"] = _now()
+        names = ", ".join(columns)
+        updates = ", ".join(f"{name} = excluded.{name}" for name in columns)
+        with self._lock, self._connection:
+            self._connection.execute(
+                f"INSERT INTO messages (message_id, {names}) "
+                f"VALUES (?{', ?' * len(columns)}) "
+                f"ON CONFLICT (message_id) DO UPDATE SET {updates}",
+                (message_id, *columns.values()),
+            )
+
+    def record_parse(
+        self, message_id: str, confirmation_code: Optional[str], status: str
+    ) -> None:
+        """
+        Record the parse outcome of a message.
+
+        Args:
+            message_id (str): The Gmail message ID.
+            confirmation_code (str, optional): The parsed confirmation code.
+            status (str): ``parsed``, or why the message was not parsed.
+        """
+        self._upsert(
+            message_id, confirmation_code=confirmation_code, parse_status=status
+        )
+
+    def record_sink(self, message_id: str, sink: str) -> None:
+        """Record that a message was written to ``sink`` (one of ``SINKS``)."""
+        if sink not in SINKS:
+            raise ValueError(f"Unknown ledger sink: {sink}")
+        self._upsert(message_id, **{sink: 1})
+        with self._lock, self._connection:
+            completed = self._connection.execute(
+                "UPDATE messages SET completed_at = ? WHERE message_id = ? "
+                "AND notion = 1 AND calendar = 1 AND completed_at IS NULL",
+                (_now(), message_id),
+            ).rowcount
+        if completed:
+            self._filter.add(message_id)
+
+    def is_completed(self, message_id: str) -> bool:
+        """Whether the message was written to every sink by some run."""
+        if message_id not in self._filter:
+            return False
+        with self._lock:
+            row = self._connection.execute(
+                "SELECT 1 FROM messages WHERE message_id = ? "
+                "AND completed_at IS NOT NULL",
+                (message_id,),
+            ).fetchone()
+        return row is not None
+
+    def code_completed(self, confirmation_code: str) -> bool:
+        """Whether some message of this confirmation code is completed."""
+        with self._lock:
+            row = self._connection.execute(
+                "SELECT 1 FROM messages WHERE confirmation_code = ? "
+                "AND completed_at IS NOT NULL LIMIT 1",
+                (confirmation_code,),
+            ).fetchone()
+        return row is not None
+
+    def status(self, message_id: str) -> Optional[dict]:
+        """Return the ledger row of a message, None when it is unknown."""
+        with self._lock:
+            cursor = self._connection.execute(
+                "SELECT * FROM messages WHERE message_id = ?", (message_id,)
+            )
+            row = cursor.fetchone()
+            names = [column[0] for column in cursor.description]
+        return dict(zip(names, row)) if row else None
+
+    def __contains__(self, message_id: str) -> bool:
+        return self.is_completed(message_id)
+
+
+@dataclass(frozen=True)
+class SkipIds:
+    """Messages of an interrupted run plus the messages completed by any run."""
+
+    run_ids: Set[str]
+    ledger: MessageLedger
+
+    def __contains__(self, message_id: str) -> bool:
+        return message_id in self.run_ids or message_id in self.ledger
@@ -0,0 +1,89 @@
+"""
+Locale detection of Airbnb mails.
+
+Each locale is described by a set of keywords of its reservation mails (the
+table below is the only place to change to recognize a new locale). Detection
+reads the subject and the header region of the body only, splits it into words
+once and looks every word up in a single keyword -> locale table, so its cost
+depends on the size of that region and not on the number of locales.
+"""
+
+import re
+from collections import Counter
+from typing import Dict, Iterable
+
+# Characters of the body read after the subject; the booking summary (dates,
+# guests, confirmation code) of every Airbnb template starts within them.
+HEADER_REGION_CHARS = 2000
+
+UNKNOWN_LOCALE = "unknown"
+
+# Locale -> words of its reservation mails, casefolded. A word may only belong
+# to one locale. On a tie the locale listed first wins.
+LOCALE_KEYWORDS: Dict[str, Iterable[str]] = {
+    "fr": ("réservation", "confirmée", "arrivée", "départ", "voyageurs", "nuits"),
+    "en": ("reservation", "confirmed", "check-in", "checkout", "guests", "nights"),
+    "de": ("buchung", "bestätigt", "anreise", "abreise", "gäste", "nächte"),
+    "es": ("reserva", "confirmada", "llegada", "salida", "huéspedes", "noches"),
+    "it": ("prenotazione", "confermata", "arrivo", "partenza", "ospiti", "notti"),
+    "pt": ("hóspedes", "noites", "chegada", "saída", "anfitrião"),
+}
+
+_WORDS = re.compile(r"[^\W\d_]+(?:-[^\W\d_]+)*")
+
+
+def _keyword_table(table: Dict[str, Iterable[str]]) -> Dict[str, str]:
+    keywords: Dict[str, str] = {}
+    for locale, words in table.items():
+        for word in words:
+            word = word.casefold()
+            if word in keywords:
+                raise ValueError(
+                    f"Keyword '{word}' belongs to locales {keywords[word]} and {locale}"
+                )
+            keywords[word] = locale
+    return keywords
+
+
+class LocaleDetector:
+    """Score every locale of a keyword table in one pass over a mail header."""
+
+    def __init__(
+        self,
+        table: Dict[str, Iterable[str]] = LOCALE_KEYWORDS,
+        region_chars: int = HEADER_REGION_CHARS,
+    ) -> None:
+        self.keywords = _keyword_table(table)
+        self.order = {locale: rank for rank, locale in enumerate(table)}
+        self.region_chars = region_chars
+
+    def scores(self, subject: str, body: str) -> Counter:
+        """Count the keywords of each locale in the subject and header region."""
+        counts: Counter = Counter()
+        for text in (subject, body[: self.region_chars]):
+            for word in _WORDS.findall(text):
+                locale = self.keywords.get(word.casefold())
+                if locale:
+                    counts[locale] += 1
+        return counts
+
+    def detect(self, subject: str, body: str) -> str:
+        """
+        Return the locale with the most keywords, or ``UNKNOWN_LOCALE``.
+
+        Args:
+            subject (str): Subject of the mail (may be empty).
+            body (str): Body of the mail, only its header region is read.
+        """
+        counts = self.scores(subject, body)
+        if not counts:
+            return UNKNOWN_LOCALE
+        return max(counts, key=lambda locale: (counts[locale], -self.order[locale]))
+
+
+DEFAULT_DETECTOR = LocaleDetector()
+
+
+def detect_locale(subject: str, body: str) -> str:
+    """Detect the locale of a mail with ``LOCALE_KEYWORDS``."""
+    return DEFAULT_DETECTOR.detect(subject, body)
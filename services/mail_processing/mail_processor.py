@@ -1,22 +1,65 @@
+import contextvars
+import datetime
 import os
+import warnings
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, List, Union
 
 from rich import print
 from rich.console import Console
 from rich.progress import Progress, SpinnerColumn, TextColumn
 
 from services.google_integration.calendar_services import CalendarService
-from services.google_integration.gmail_services import GmailService
+from services.google_integration.gmail_services import GmailService, classify_update
+from services.listings.registry import (
+    Listing,
+    load_listings,
+    route_messages,
+    unrouted,
+)
 from services.notion_client.notion_api_client import NotionClient
+from services.telemetry.tracer import export_settings, get_tracer
 
+from .journal import RunJournal, journal_path
+from .ledger import MessageLedger, SkipIds
+from .parse_cache import ParseCache
 from .parser import Parser
+from .reservation import ParsedReservation, ReservationPatch
+from .updates import parse_update
+
+
+@dataclass
+class ListingServices:
+    """The Notion and Calendar clients of one listing."""
+
+    listing: Listing
+    notion_client: NotionClient
+    calendar_service: CalendarService
+
+
+def _from_journal(
+    payload: Dict[str, Any]
+) -> Union[ParsedReservation, ReservationPatch]:
+    """Read back a parsed record of the journal (patches carry their ``kind``)."""
+    if "kind" in payload:
+        return ReservationPatch.from_json(payload)
+    return ParsedReservation.from_json(payload)
 
 
 class MailProcessorService:
     def __init__(self, debug: bool = False) -> None:
         self.gmail_service = GmailService()
-        self.notion_client = NotionClient()
-        self.calendar_service = CalendarService()
+        self.listings = load_listings()
+        self._listing_services: Dict[str, ListingServices] = {}
         self.debug = debug
+        self.journal = RunJournal()
+        self.ledger = MessageLedger()
+        self.parse_cache = ParseCache()
+        # Unread mails completed by an earlier run, marked as read in step 4.
+        self.completed_unread: List[str] = []
+        # Alterations and cancellations parsed in step 2, applied in step 3.
+        self.patches: List[ReservationPatch] = []
 
         # Initialize attendees list if in debug mode
         if self.debug:
@@ -32,115 +75,296 @@ class MailProcessorService:
                     "[yellow]No calendar notification attendees configured in environment[/yellow]"
                 )
 
-    def parse_reserved_mails(self) -> list:
-        """Second step: Get reserved emails and parse them"""
-        reserved_emails = self.gmail_service.get_unread_emails_content_by_label(
-            label="reserved"
-        )
-        print(f"Mail content : {reserved_emails}") if self.debug else None
-        parsed_results = []
-
-        # fmt: off
-        month_mapping = {
-            "jan": "01", "janv": "01",
-            "fév": "02", "févr": "02", "feb": "02",
-            "mar": "03", "mars": "03",
-            "avr": "04", "apr": "04",
-            "mai": "05", "may": "05",
-            "jun": "06", "juin": "06",
-            "jul": "07", "juil": "07",
-            "août": "08", "aoû": "08", "aug": "08",
-            "sep": "09", "sept": "09",
-            "oct": "10",
-            "nov": "11",
-            "déc": "12", "dec": "12"
-        }
-        # fmt: on
+    def _fetch_reserved_mail(self, msg_id: str) -> dict:
+        """Return the content of a reserved mail, from the journal when available."""
+        if self.journal.done("fetched", msg_id):
+            return self.journal.payload("fetched", msg_id)
+        email = self.gmail_service.get_mail_content(msg_id)
+        self.journal.record("fetched", msg_id, email)
+        return email
 
-        for email in reserved_emails:
+    def _parse_reserved_mail(
+        self, msg_id: str
+    ) -> Union[ParsedReservation, ReservationPatch, None]:
+        """Parse one reserved mail, from the parse cache when possible."""
+        cached = self.parse_cache.get(msg_id)
+        if cached is not None:
+            return ParsedReservation.from_json(cached)
+        email = self._fetch_reserved_mail(msg_id)
+        print(f"Mail content : {email}") if self.debug else None
+        with get_tracer().span("parser.parse_reservation", kind="internal") as span:
             parser = Parser(email, debug=self.debug)
-            parsed_data = parser.parse_data()
-
-            arr_day = parsed_data.get("arrival_day", "")
-            arr_month = parsed_data.get("arrival_month", "").lower()
-            arr_year = parsed_data.get("arrival_year", "")
-            arr_month_num = month_mapping.get(arr_month, "01")
-            parsed_data[
-                "arrival_date"
-            ] = f"{arr_year}-{arr_month_num.zfill(2)}-{arr_day.zfill(2)}"
-
-            dep_day = parsed_data.get("departure_day", "")
-            dep_month = parsed_data.get("departure_month", "").lower()
-            dep_year = parsed_data.get("departure_year", "")
-            dep_month_num = month_mapping.get(dep_month, "01")
-            parsed_data[
-                "departure_date"
-            ] = f"{dep_year}-{dep_month_num.zfill(2)}-{dep_day.zfill(2)}"
-            keys_to_remove = [
-                "arrival_day",
-                "arrival_month",
-                "arrival_year",
-                "departure_day",
-                "departure_month",
-                "departure_year",
-            ]
-            for key in keys_to_remove:
-                parsed_data.pop(key, None)
-            parsed_results.append(parsed_data)
+            span.set_attribute("language", parser.language)
+            update_kind = classify_update(parser.subject)
+            if update_kind:
+                try:
+                    return parse_update(parser, update_kind)
+                except ValueError as error:
+                    self.ledger.record_parse(msg_id, None, "no code")
+                    warnings.warn(f"Skipping mail {msg_id}: {error}", UserWarning)
+                    return None
+            if not parser.is_supported:
+                self.ledger.record_parse(msg_id, None, "unsupported")
+                warnings.warn(
+                    f"Skipping mail {msg_id}: language '{parser.language}' "
+                    "is not supported",
+                    UserWarning,
+                )
+                return None
+            reservation = parser.parse_reservation()
+        # A partial result (time budget exceeded) is parsed again next run.
+        if not parser.is_partial:
+            self.parse_cache.put(msg_id, parser.language, reservation.to_json())
+        return reservation
+
+    def parse_reserved_mails(self) -> List[ParsedReservation]:
+        """Second step: Get reserved emails and parse them.
+
+        Mails already downloaded or parsed by an interrupted run are taken from
+        the run journal instead of being fetched and parsed again. Each parsed
+        reservation carries the ``message_id`` of its mail. Mails in a language
+        without patterns are skipped with a warning and stay unread. Mails that
+        the ledger knows as saved to Notion and Calendar by an earlier run are
+        skipped before their body is downloaded, and mails parsed by an earlier
+        run with the same patterns are taken from the parse cache. A mail whose
+        confirmation code was already saved from another mail is not saved
+        again, it is only marked as read.
+
+        Alteration and cancellation mails are parsed into ``self.patches``,
+        oldest first, instead of being returned.
+        """
+        message_ids = self.gmail_service.list_unread_ids_by_label(label="reserved")
+        parsed_results = []
+        self.completed_unread = []
+        self.patches = []
+
+        for msg_id in message_ids:
+            if not self.journal.done("parsed", msg_id) and self.ledger.is_completed(
+                msg_id
+            ):
+                self.completed_unread.append(msg_id)
+                continue
+            if self.journal.done("parsed", msg_id):
+                record = _from_journal(self.journal.payload("parsed", msg_id))
+            else:
+                record = self._parse_reserved_mail(msg_id)
+                if record is None:
+                    continue
+                record.message_id = msg_id
+                self.journal.record("parsed", msg_id, record.to_json())
+                self.ledger.record_parse(msg_id, record.confirmation_code, "parsed")
+            if isinstance(record, ReservationPatch):
+                self.patches.append(record)
+                continue
+            if self.ledger.code_completed(record.confirmation_code):
+                # The same booking forwarded again under a new message ID.
+                self.completed_unread.append(msg_id)
+                continue
+            reservation = record
+            parsed_results.append(reservation)
 
             if self.debug:
-                print(parsed_data.get("name", "No name found."))
-                for key, value in parsed_data.items():
-                    if value == "N/A" and key != "city" and key != "host_service_tax":
+                print(reservation.name or "No name found.")
+                for key in reservation.missing_fields():
+                    if key not in ("city", "host_service_tax"):
                         print(f"[bold red]{key}: No data found.[/bold red]")
 
+        self.patches.sort(key=lambda patch: patch.mail_date or datetime.date.min)
         self.quality_check(parsed_results)
         return parsed_results
 
-    def quality_check(self, reservations: list) -> None:
+    def quality_check(self, reservations: List[ParsedReservation]) -> None:
         """Performs quality checks on reservations:
-        - Ensures each reservation has a valid confirmation_code (exists and isn't 'N/A').
-        - Ensures each reservation has a valid host_payout (exists and isn't 'N/A').
+        - Ensures each reservation has a confirmation_code.
+        - Ensures each reservation has a host_payout.
         - Checks for duplicate confirmation codes.
         """
         seen_codes = set()
         for reservation in reservations:
-            code = reservation.get("confirmation_code")
-            host_payout = reservation.get("host_payout")
+            code = reservation.confirmation_code
 
-            if not code or code == "N/A":
+            if code is None:
+                raise ValueError("Invalid reservation: 'confirmation_code' is missing.")
+            if reservation.host_payout is None:
                 raise ValueError(
-                    "Invalid reservation: 'confirmation_code' is missing or 'N/A'."
-                )
-            if not host_payout or host_payout == "N/A":
-                raise ValueError(
-                    f"Invalid reservation with code {code}: 'host_payout' is missing or 'N/A'."
+                    f"Invalid reservation with code {code}: 'host_payout' is missing."
                 )
             if code in seen_codes:
                 raise ValueError(f"Duplicate reservation code found: {code}")
             seen_codes.add(code)
 
-    def process_review_mails(self) -> None:
-        """Process review emails"""
-        review_emails = self.gmail_service.get_unread_emails_content_by_label(
-            label="review"
-        )
-        try:
-            for mail_content in review_emails:
-                reservation_info = self.gmail_service.parse_reservation_header(
-                    mail_content
+    def listing_services(self, listing: Listing) -> ListingServices:
+        """Return the clients of ``listing``, created on first use."""
+        services = self._listing_services.get(listing.name)
+        if services is None:
+            services = ListingServices(
+                listing=listing,
+                notion_client=NotionClient(database_id=listing.database_id),
+                calendar_service=CalendarService(
+                    calendar_summary=listing.calendar, location=listing.location
+                ),
+            )
+            self._listing_services[listing.name] = services
+        return services
+
+    def warm_up(self) -> None:
+        """
+        Create the clients of every listing ahead of the first run.
+
+        A listing whose clients cannot be created is reported; its clients are
+        created again on first use.
+        """
+        for listing in self.listings:
+            try:
+                self.listing_services(listing)
+            except Exception as error:
+                print(f"[bold red]Listing {listing.name} failed: {error!r}[/bold red]")
+
+    def refresh_caches(self) -> None:
+        """List the Gmail labels and the calendar events of every listing again."""
+        self.gmail_service.label_ids(refresh=True)
+        for services in self._listing_services.values():
+            services.calendar_service.refresh_event_cache()
+
+    def close(self) -> None:
+        """Close the ledger and the parse cache."""
+        self.ledger.close()
+        self.parse_cache.close()
+
+    def route(self, message_ids: List[str]) -> Dict[str, List[str]]:
+        """
+        Assign mails to listings from their Gmail listing label.
+
+        Mails that match no listing (or several) are left unread with a warning,
+        so they are picked up again once the labels are fixed.
+        """
+        labelled = {
+            listing.name: self.gmail_service.list_unread_ids_by_label(listing.label)
+            for listing in self.listings
+            if listing.label
+        }
+        routes = route_messages(self.listings, message_ids, labelled)
+        for msg_id in unrouted(message_ids, routes):
+            warnings.warn(
+                f"Mail {msg_id} matches no single listing, it is left unread",
+                UserWarning,
+            )
+        return routes
+
+    def _run_listing(
+        self,
+        span_name: str,
+        task: Callable[[ListingServices, List[str]], None],
+        services: ListingServices,
+        message_ids: List[str],
+    ) -> None:
+        with get_tracer().span(span_name, kind="internal") as span:
+            span.set_attribute("listing", services.listing.name)
+            task(services, message_ids)
+
+    def for_each_listing(
+        self,
+        span_name: str,
+        routes: Dict[str, List[str]],
+        task: Callable[[ListingServices, List[str]], None],
+    ) -> Dict[str, Exception]:
+        """
+        Run ``task(services, message_ids)`` for every listing with mails.
+
+        Listings run concurrently and are isolated from each other: the error of
+        one listing is reported and returned, the others complete.
+
+        Returns:
+            Dict[str, Exception]: The error of each failed listing, by name.
+        """
+        failures: Dict[str, Exception] = {}
+        jobs = []
+        for listing in self.listings:
+            message_ids = routes.get(listing.name)
+            if not message_ids:
+                continue
+            try:
+                # Created here: refreshing the credentials is not thread-safe.
+                jobs.append((listing.name, self.listing_services(listing)))
+            except Exception as error:
+                failures[listing.name] = error
+                continue
+        with ThreadPoolExecutor(max_workers=max(1, len(jobs))) as executor:
+            futures = {
+                name: executor.submit(
+                    contextvars.copy_context().run,
+                    self._run_listing,
+                    span_name,
+                    task,
+                    services,
+                    routes[name],
                 )
-                if reservation_info["type"] == "review":
-                    print(
-                        f"Full name {reservation_info['full_name']} and rating {reservation_info['rating']}"
-                    )
-                    self.notion_client.update_row_by_name(
-                        name=reservation_info["full_name"],
-                        rating=int(reservation_info["rating"]),
-                    )
-            self.gmail_service.mark_mails_as_read_for_label(label="review")
-        except Exception as error:
-            print(f"An error occurred while processing unread emails: {error}")
+                for name, services in jobs
+            }
+            for name, future in futures.items():
+                try:
+                    future.result()
+                except Exception as error:
+                    failures[name] = error
+        for name, error in failures.items():
+            print(f"[bold red]Listing {name} failed: {error!r}[/bold red]")
+        return failures
+
+    def _save_ratings(self, services: ListingServices, reviews: list) -> None:
+        """Match the reviews of one listing to its stays and write the ratings."""
+        if not reviews:
+            return
+        guest_index = services.notion_client.build_guest_index()
+        ratings = {}
+        for reservation_info, review_date in reviews:
+            name = reservation_info["full_name"]
+            page_id = guest_index.lookup(name, review_date=review_date)
+            if page_id is None:
+                warnings.warn(
+                    f"No page found with name containing: {name}", UserWarning
+                )
+                continue
+            ratings[page_id] = int(reservation_info["rating"])
+        services.notion_client.update_ratings(ratings)
+
+    def process_review_mails(self) -> Dict[str, Exception]:
+        """
+        Process review emails.
+
+        Reviews are routed to their listing, matched to their stay with a
+        guest-name index built from one scan of the listing database, and the
+        ratings of each listing are written in one batch. The mails of a listing
+        are marked as read once its ratings are saved.
+
+        Returns:
+            Dict[str, Exception]: The error of each failed listing, by name.
+        """
+        message_ids = self.gmail_service.list_unread_ids_by_label(label="review")
+        if not message_ids:
+            return {}
+        routes = self.route(message_ids)
+        reviews = {}
+        for msg_id in (msg_id for ids in routes.values() for msg_id in ids):
+            mail_content = self.gmail_service.get_mail_content(msg_id)
+            reservation_info = self.gmail_service.parse_reservation_header(mail_content)
+            if reservation_info["type"] == "review":
+                print(
+                    f"Full name {reservation_info['full_name']} and rating {reservation_info['rating']}"
+                )
+                reviews[msg_id] = (reservation_info, mail_content.get("Date"))
+
+        failures = self.for_each_listing(
+            "workflow.listing.reviews",
+            routes,
+            lambda services, ids: self._save_ratings(
+                services, [reviews[msg_id] for msg_id in ids if msg_id in reviews]
+            ),
+        )
+        for name, ids in routes.items():
+            if name not in failures:
+                for msg_id in ids:
+                    self.gmail_service.mark_as_read(msg_id)
+        return failures
 
     def _get_calendar_notification_attendees(self):
         """Get the list of email addresses to notify for calendar events.
@@ -161,14 +385,154 @@ class MailProcessorService:
         ]
         return attendees
 
+    def _save_to_notion(
+        self, services: ListingServices, reservations: List[ParsedReservation]
+    ) -> None:
+        """Upsert the reservations not yet saved to Notion in this run."""
+        pending = [
+            reservation
+            for reservation in reservations
+            if not self.journal.done("notion", reservation.message_id)
+        ]
+        if not pending:
+            return
+        counts = services.notion_client.upsert_reservations(
+            [reservation.to_notion() for reservation in pending]
+        )
+        for reservation in pending:
+            self.journal.record("notion", reservation.message_id)
+            self.ledger.record_sink(reservation.message_id, "notion")
+        print(
+            f"[bold green]✓[/bold green] [bold cyan]Notion ({services.listing.name}): "
+            f"{counts['created']} created, "
+            f"{counts['updated']} updated, {counts['unchanged']} unchanged[/bold cyan]\n"
+        )
+
+    def _save_event(
+        self,
+        services: ListingServices,
+        reservation: ParsedReservation,
+        console: Console,
+    ) -> None:
+        """Create the Calendar event of a reservation, unless already done."""
+        msg_id = reservation.message_id
+        confirmation_code = reservation.confirmation_code
+        if self.journal.done("calendar", msg_id):
+            return
+        if services.calendar_service.event_exists(confirmation_code):
+            console.print(
+                f"[bold yellow]Warning:[/bold yellow] An event with reservation code '{confirmation_code}' already exists in Google Calendar.\n",
+                style="yellow",
+            )
+        else:
+            # Get notification attendees from environment
+            attendees = self._get_calendar_notification_attendees()
+            if attendees:
+                print(
+                    f"[bold cyan]Adding {len(attendees)} notification recipient(s) to calendar event[/bold cyan]"
+                )
+
+            # Create calendar event with attendees
+            services.calendar_service.create_event(
+                attendees=attendees, **reservation.to_calendar()
+            )
+            print(
+                f"[bold green]✓[/bold green] [bold cyan]Event created for reservation {confirmation_code}[/bold cyan]\n"
+            )
+        self.journal.record("calendar", msg_id)
+        self.ledger.record_sink(msg_id, "calendar")
+
+    def _apply_patch(self, services: ListingServices, patch: ReservationPatch) -> None:
+        """Apply an alteration or a cancellation to Notion and Calendar."""
+        msg_id = patch.message_id
+        code = patch.confirmation_code
+        if not self.journal.done("notion", msg_id):
+            outcome = services.notion_client.patch_reservation(
+                code, patch.to_notion(), archive=patch.is_cancellation
+            )
+            self.journal.record("notion", msg_id)
+            self.ledger.record_sink(msg_id, "notion")
+            print(
+                f"[bold green]✓[/bold green] [bold cyan]Notion ({services.listing.name}): "
+                f"reservation {code} {outcome} ({patch.kind})[/bold cyan]"
+            )
+        if not self.journal.done("calendar", msg_id):
+            calendar = services.calendar_service
+            if patch.is_cancellation:
+                calendar.cancel_event(code)
+            else:
+                dates = {
+                    name: patch.changes[name].isoformat()
+                    for name in ("arrival_date", "departure_date")
+                    if patch.changes.get(name) is not None
+                }
+                calendar.move_event(code, **dates)
+            self.journal.record("calendar", msg_id)
+            self.ledger.record_sink(msg_id, "calendar")
+
+    def _save_listing(
+        self,
+        services: ListingServices,
+        records: List[Union[ParsedReservation, ReservationPatch]],
+        console: Console,
+    ) -> None:
+        """
+        Save the reservations of one listing to its Notion database and calendar.
+
+        Alterations and cancellations are applied afterwards, in mail order, so
+        they find the pages and events of reservations confirmed in this run.
+        """
+        reservations = [r for r in records if isinstance(r, ParsedReservation)]
+        self._save_to_notion(services, reservations)
+        for reservation in reservations:
+            self._save_event(services, reservation, console)
+        for patch in records:
+            if isinstance(patch, ReservationPatch):
+                self._apply_patch(services, patch)
+
+    def _report_trace(self, trace_id: str) -> None:
+        """Print the per-span summary of a run and export its spans if configured."""
+        tracer = get_tracer()
+        spans = tracer.trace_spans(trace_id)
+        tracer.print_summary(spans)
+        settings = export_settings()
+        if settings["path"]:
+            tracer.export(spans, settings["path"], settings["format"])
+            print(f"[blue]Trace exported to {settings['path']}[/blue]")
+        tracer.discard(trace_id)
+
     def run_workflow(self) -> None:
-        """Execute the complete workflow"""
+        """
+        Execute the complete workflow and report where the time went.
+
+        Progress is checkpointed in the run journal (``WORKFLOW_JOURNAL_PATH``),
+        a run that was interrupted resumes where it stopped instead of starting
+        over. The parse cache hit/miss statistics are printed at the end.
+        """
+        self.journal = RunJournal(journal_path())
+        if self.journal.resumed:
+            print(
+                f"[bold yellow]Resuming interrupted run: {len(self.journal.entries)} mail(s) in the journal[/bold yellow]"
+            )
+        run_span = None
+        try:
+            with get_tracer().trace("workflow.run") as run_span:
+                self._run_steps()
+        finally:
+            # Report even when a step failed, that is when the trace matters most.
+            if run_span is not None:
+                self._report_trace(run_span.trace_id)
+            print(f"[blue]{self.parse_cache.summary()}[/blue]")
+
+    def _run_steps(self) -> None:  # noqa: C901
+        """Run the five workflow steps, each one inside its own span."""
         console = Console()
+        tracer = get_tracer()
         with Progress(
             SpinnerColumn(),
             TextColumn("[progress.description]{task.description}"),
             transient=True,
-        ) as progress:
+        ) as progress, tracer.span("workflow.step1.tag_unread", kind="internal"):
             print(
                 "[bold blue]Step 1: Processing and tagging unread emails...[/bold blue]"
             )
@@ -176,7 +540,10 @@ class MailProcessorService:
                 description="[bold magenta]Processing unread mails...[/bold magenta]",
                 total=None,
             )
-            self.gmail_service.process_unread_emails()
+            # Mails of an interrupted run are already tagged, possibly as read.
+            self.gmail_service.process_unread_emails(
+                skip_ids=SkipIds(self.journal.message_ids(), self.ledger)
+            )
             progress.update(step1, completed=True)
             print(
                 "[bold green]✓[/bold green] Step 1 completed: Emails processed and tagged\n"
@@ -186,7 +553,7 @@ class MailProcessorService:
             SpinnerColumn(),
             TextColumn("[progress.description]{task.description}"),
             transient=True,
-        ) as progress:
+        ) as progress, tracer.span("workflow.step2.parse", kind="internal"):
             print("[bold blue]Step 2: Parsing reserved emails...[/bold blue]")
             step2 = progress.add_task(
                 description="[bold magenta]Parsing reserved mails...[/bold magenta]",
@@ -201,7 +568,7 @@ class MailProcessorService:
             SpinnerColumn(),
             TextColumn("[progress.description]{task.description}"),
             transient=True,
-        ) as progress:
+        ) as progress, tracer.span("workflow.step3.save", kind="internal"):
             print(
                 "[bold blue]Step 3: Saving reservations to Notion and creating Calendar Event...[/bold blue]"
             )
@@ -209,43 +576,19 @@ class MailProcessorService:
                 description="[bold magenta]Saving reservations to Notion and creating Calendar Event ...[/bold magenta]",
                 total=None,
             )
-            if parsed_reservations:
-                for reservation in parsed_reservations:
-                    confirmation_code = reservation.get("confirmation_code")
-                    if not self.notion_client.row_exists_by_reservation_id(
-                        confirmation_code
-                    ):
-                        # print(f"Reservation is {reservation}")
-                        self.notion_client.create_page(**reservation)
-                        print(
-                            f"[bold green]✓[/bold green] [bold cyan]Reservation {confirmation_code} saved to Notion[/bold cyan]\n"
-                        )
-                    else:
-                        console.print(
-                            f"[bold yellow]Warning:[/bold yellow] A reservation with confirmation code '{confirmation_code}' already exists in Notion.\n",
-                            style="yellow",
-                        )
-
-                    if self.calendar_service.event_exists(confirmation_code):
-                        console.print(
-                            f"[bold yellow]Warning:[/bold yellow] An event with reservation code '{confirmation_code}' already exists in Google Calendar.\n",
-                            style="yellow",
-                        )
-                    else:
-                        # Get notification attendees from environment
-                        attendees = self._get_calendar_notification_attendees()
-                        if attendees:
-                            print(
-                                f"[bold cyan]Adding {len(attendees)} notification recipient(s) to calendar event[/bold cyan]"
-                            )
-
-                        # Create calendar event with attendees
-                        self.calendar_service.create_event(
-                            attendees=attendees, **reservation
-                        )
-                        print(
-                            f"[bold green]✓[/bold green] [bold cyan]Event created for reservation {confirmation_code}[/bold cyan]\n"
-                        )
+            failures = {}
+            records = {
+                record.message_id: record
+                for record in [*parsed_reservations, *self.patches]
+            }
+            if records:
+                failures = self.for_each_listing(
+                    "workflow.listing.save",
+                    self.route(list(records)),
+                    lambda services, ids: self._save_listing(
+                        services, [records[msg_id] for msg_id in ids], console
+                    ),
+                )
             else:
                 print("[yellow]No reservations to save[/yellow]")
             progress.update(step3, completed=True)
@@ -257,15 +600,24 @@ class MailProcessorService:
             SpinnerColumn(),
             TextColumn("[progress.description]{task.description}"),
             transient=True,
-        ) as progress:
+        ) as progress, tracer.span("workflow.step4.mark_read", kind="internal"):
             print("[bold blue]Step 4: Marking reserved mails as read...[/bold blue]")
             step4 = progress.add_task(
                 description="[bold magenta]Marking reserved mails as read...[/bold magenta]",
                 total=None,
             )
-            self.gmail_service.mark_mails_as_read_for_label(
-                label="reserved"
-            ) if not self.debug else None
+            if not self.debug:
+                for msg_id in records:
+                    # Mails of a failed or unrouted listing stay unread.
+                    if self.journal.done("read", msg_id) or not self.journal.done(
+                        "calendar", msg_id
+                    ):
+                        continue
+                    self.gmail_service.mark_as_read(msg_id)
+                    self.journal.record("read", msg_id)
+                # Saved by an earlier run whose step 4 did not happen.
+                for msg_id in self.completed_unread:
+                    self.gmail_service.mark_as_read(msg_id)
             progress.update(step4, completed=True)
             print(
                 "[bold green]✓[/bold green] Step 4 completed: Reserved mails marked as read\n"
@@ -275,17 +627,28 @@ class MailProcessorService:
             SpinnerColumn(),
             TextColumn("[progress.description]{task.description}"),
             transient=True,
-        ) as progress:
+        ) as progress, tracer.span("workflow.step5.reviews", kind="internal"):
             print("[bold blue]Step 5: Marking reserved mails as read...[/bold blue]")
             step5 = progress.add_task(
                 description="[bold magenta]Marking reserved mails as read...[/bold magenta]",
                 total=None,
             )
-            self.process_review_mails() if not self.debug else None
+            if not self.debug:
+                failures.update(self.process_review_mails())
             progress.update(step5, completed=True)
             print(
                 "[bold green]✓[/bold green] Step 5 completed: Reserved mails marked as read\n"
             )
 
+        if failures:
+            # The journal is kept, the next run resumes the failed listings.
+            raise RuntimeError(
+                f"Workflow failed for listing(s): {', '.join(sorted(failures))}"
+            ) from next(iter(failures.values()))
+        self.journal.complete()
         print("\n[bold green]Workflow completed successfully![/bold green]")
         print(f"[blue]Processed {len(parsed_reservations)} reservations.[/blue]")
+        if self.patches:
+            print(
+                f"[blue]Applied {len(self.patches)} alteration(s)/cancellation(s).[/blue]"
+            )
@@ -0,0 +1,122 @@
+"""
+Persistent cache of the parsed reservation mails.
+
+Parsing a mail is pure: the same body and the same patterns give the same
+reservation. The cache stores the ``ParsedReservation`` of every message,
+keyed by its message ID, together with the fingerprint of the pattern set of
+its language. A later run (debug reruns, backfills, restarts after a crash)
+takes the reservation from the cache without downloading or parsing the mail.
+Editing a pattern of ``Parser.get_language_patterns`` changes the fingerprint
+of that language, and its entries are parsed again.
+"""
+
+import datetime
+import functools
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+from typing import Any, Dict, Optional
+
+from services.mail_processing.parser import Parser
+
+DEFAULT_PARSE_CACHE_PATH = os.path.join(
+    os.path.expanduser("~"), ".cache", "bnb-host-tools", "parse_cache.sqlite3"
+)
+
+# Bump when the conversion of the extracted strings changes (amounts, dates).
+PARSER_VERSION = 1
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS parsed_mails (
+    message_id TEXT PRIMARY KEY,
+    language TEXT NOT NULL,
+    fingerprint TEXT NOT NULL,
+    payload TEXT NOT NULL,
+    parsed_at TEXT NOT NULL
+);
+"""
+
+
+def parse_cache_path() -> str:
+    """Return the cache location, configurable with PARSE_CACHE_PATH."""
+    return os.environ.get("PARSE_CACHE_PATH", DEFAULT_PARSE_CACHE_PATH)
+
+
+@functools.lru_cache(maxsize=None)
+def pattern_fingerprint(language: str) -> str:
+    """Hash of the parser version and of every pattern (source and flags)."""
+    digest = hashlib.sha256(f"v{PARSER_VERSION}:{language}".encode())
+    for field, pattern in sorted(Parser.get_language_patterns(language).items()):
+        digest.update(f"\0{field}\0{pattern.flags}\0{pattern.pattern}".encode())
+    return digest.hexdigest()
+
+
+class ParseCache:
+    """
+    Parsed reservations by message ID, with hit/miss statistics.
+
+    Args:
+        path (str, optional): SQLite file; ``":memory:"`` keeps the cache in
+            memory only. Defaults to ``parse_cache_path()``.
+    """
+
+    def __init__(self, path: Optional[str] = None) -> None:
+        self.path = path or parse_cache_path()
+        if self.path != ":memory:":
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(self.path, check_same_thread=False)
+        with self._lock, self._connection:
+            self._connection.executescript(_SCHEMA)
+        self.stats = {"hits": 0, "misses": 0, "stale": 0}
+
+    def close(self) -> None:
+        self._connection.close()
+
+    def get(self, message_id: str) -> Optional[Dict[str, Any]]:
+        """
+        Return the cached reservation of a message (as ``to_json`` output).
+
+        Returns:
+            Optional[Dict[str, Any]]: None when the message was never parsed, or
+            was parsed with patterns that have changed since (stale).
+        """
+        with self._lock:
+            row = self._connection.execute(
+                "SELECT language, fingerprint, payload FROM parsed_mails "
+                "WHERE message_id = ?",
+                (message_id,),
+            ).fetchone()
+        if row is None:
+            self.stats["misses"] += 1
+            return None
+        language, fingerprint, payload = row
+        if fingerprint != pattern_fingerprint(language):
+            self.stats["stale"] += 1
+            return None
+        self.stats["hits"] += 1
+        return json.loads(payload)
+
+    def put(self, message_id: str, language: str, payload: Dict[str, Any]) -> None:
+        """Store the reservation parsed from a message in ``language``."""
+        with self._lock, self._connection:
+            self._connection.execute(
+                "INSERT OR REPLACE INTO parsed_mails VALUES (?, ?, ?, ?, ?)",
+                (
+                    message_id,
+                    language,
+                    pattern_fingerprint(language),
+                    json.dumps(payload, ensure_ascii=False),
+                    datetime.datetime.now().replace(microsecond=0).isoformat(),
+                ),
+            )
+
+    def summary(self) -> str:
+        total = sum(self.stats.values())
+        rate = self.stats["hits"] / total if total else 0.0
+        return (
+            f"Parse cache: {self.stats['hits']} hit(s), {self.stats['misses']} "
+            f"miss(es), {self.stats['stale']} stale ({rate:.0%} hit rate)"
+        )
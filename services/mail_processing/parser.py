@@ -1,6 +1,75 @@
+import datetime
 import re
+import time
 import warnings
-from typing import Any, Dict, Match, Optional, Pattern
+from typing import Any, Dict, List, Match, Optional, Pattern, Tuple
+
+from services.mail_processing.amounts import MISSING_VALUES, amount_parser
+from services.mail_processing.dates import DateParts, month_number, resolve_stay
+from services.mail_processing.locales import detect_locale
+from services.mail_processing.reservation import ParsedReservation
+
+NUMERIC_FIELDS = [
+    "number_of_adults",
+    "number_of_children",
+    "price_by_night",
+    "number_of_nights",
+    "total_nights_cost",
+    "cleaning_fee",
+    "guest_service_fee",
+    "host_service_fee",
+    "tourist_tax",
+    "guest_payout",
+    "host_payout",
+]
+
+COUNT_FIELDS = ("number_of_adults", "number_of_children", "number_of_nights")
+
+AMOUNT_FIELDS = [field for field in NUMERIC_FIELDS if field not in COUNT_FIELDS]
+
+# Wall time allowed to the pattern searches of one mail, in seconds. Fields not
+# searched before it runs out are left missing.
+EXTRACTION_TIME_BUDGET = 2.0
+
+# Longer bodies (huge forwarded threads) are cut before the searches.
+MAX_BODY_CHARS = 1_000_000
+
+TEXT_FIELDS = (
+    "confirmation_code",
+    "name",
+    "arrival_day_of_week",
+    "departure_day_of_week",
+    "host_service_tax",
+    "country",
+    "city",
+)
+
+
+def _text(value: Any) -> Optional[str]:
+    return None if value in MISSING_VALUES else value
+
+
+def _count(value: Any) -> Optional[int]:
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def _iso_date(value: Any) -> Optional[datetime.date]:
+    try:
+        return datetime.date.fromisoformat(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def _date_parts(data: Dict[str, Any], prefix: str) -> Optional[DateParts]:
+    """Return the day, month token and year of the arrival or departure."""
+    day = data.get(f"{prefix}_day")
+    if day in MISSING_VALUES:
+        return None
+    year = data.get(f"{prefix}_year")
+    return day, data[f"{prefix}_month"], None if year in MISSING_VALUES else year
 
 
 class Parser:
@@ -8,20 +77,35 @@ class Parser:
     A parser for extracting booking details from an email message.
     """
 
-    def __init__(self, mail: Any, debug: bool = False) -> None:
+    # Languages with a pattern set in ``get_language_patterns``.
+    SUPPORTED_LANGUAGES = ("fr", "en")
+
+    def __init__(
+        self,
+        mail: Any,
+        debug: bool = False,
+        time_budget: Optional[float] = EXTRACTION_TIME_BUDGET,
+    ) -> None:
         """
         Initializes the Parser with the provided mail.
 
         Args:
             mail (Any): The email content to parse (can be a string or dict).
+            time_budget (float, optional): Seconds allowed to the pattern
+                searches of ``extract``, None for no limit.
         """
         self.debug = debug
+        self.time_budget = time_budget
+        # Fields left unsearched by the last ``extract`` (time budget exceeded).
+        self.skipped_fields: List[str] = []
         self.person_name: str = "N/A"
+        self.subject: str = ""
         if isinstance(mail, dict):
             self.mail_date = self.parse_mail_date(mail)
             print(f"Mail date: {self.mail_date}") if self.debug else None
             self.message_body: str = mail.get("Message_body", "")
             subject = mail.get("Subject", "")
+            self.subject = subject
             # Attempt to extract person's name from subject
             subject_clean = subject.replace("TR :", "").strip()
             match = re.search(
@@ -39,28 +123,71 @@ class Parser:
 
     def detect_language(self) -> str:
         """
-        Detect the language of the email based on specific keywords.
+        Detect the language of the email from the keywords of its subject and
+        of the header region of its body (see ``locales.LOCALE_KEYWORDS``).
 
         Returns:
-            str: The detected language ('fr', 'en', or 'unknown').
+            str: The detected language ('fr', 'en', 'de', ... or 'unknown').
         """
-        body_lower = self.message_body.lower()
+        return detect_locale(self.subject, self.message_body)
+
+    @property
+    def is_supported(self) -> bool:
+        """Whether the detected language has a pattern set."""
+        return self.language in self.SUPPORTED_LANGUAGES
 
-        # Simple checks on certain keywords
-        if any(keyword in body_lower for keyword in ["arrivée", "départ", "confirmée"]):
-            return "fr"
-        elif any(
-            keyword in body_lower for keyword in ["check-in", "checkout", "confirmed"]
-        ):
-            return "en"
-        return "unknown"
+    @property
+    def is_partial(self) -> bool:
+        """Whether the last ``extract`` ran out of time before every search."""
+        return bool(self.skipped_fields)
 
-    def parse_data(self) -> Dict[str, Any]:
+    def search_patterns(
+        self, patterns: Dict[str, Pattern]
+    ) -> Dict[str, Optional[Match]]:
         """
-        Parses the booking data from the message body.
+        Search the patterns in the message body within the time budget.
+
+        The confirmation code is searched first, a partial result is only
+        useful with it. The budget is checked before each search; once it is
+        spent, the remaining fields are recorded in ``skipped_fields``.
 
         Returns:
-            Dict[str, Any]: A dictionary containing the parsed data.
+            Dict[str, Optional[Match]]: The match (or None) of every searched
+            field.
+        """
+        body = self.message_body
+        if len(body) > MAX_BODY_CHARS:
+            warnings.warn(
+                f"Message body of {len(body)} characters cut to {MAX_BODY_CHARS}",
+                UserWarning,
+            )
+            body = body[:MAX_BODY_CHARS]
+        deadline = None
+        if self.time_budget is not None:
+            deadline = time.perf_counter() + self.time_budget
+
+        self.skipped_fields = []
+        matches = {}
+        for field_name in sorted(patterns, key=lambda f: f != "confirmation_code"):
+            if deadline is not None and time.perf_counter() > deadline:
+                self.skipped_fields.append(field_name)
+            else:
+                matches[field_name] = patterns[field_name].search(body)
+        if self.skipped_fields:
+            warnings.warn(
+                f"Extraction time budget of {self.time_budget}s exceeded, "
+                f"fields not searched: {', '.join(self.skipped_fields)}",
+                UserWarning,
+            )
+        return matches
+
+    def extract(self) -> Dict[str, Any]:
+        """
+        Run the patterns of the detected language on the message body.
+
+        Returns:
+            Dict[str, Any]: The raw strings of every field, "N/A" when missing
+            or not searched within the time budget.
         """
         data: Dict[str, Any] = {}
 
@@ -70,9 +197,7 @@ class Parser:
             raise ValueError("Language not detected or unsupported.")
 
         # Search all regex patterns in the message body
-        matches = {
-            key: pattern.search(self.message_body) for key, pattern in patterns.items()
-        }
+        matches = self.search_patterns(patterns)
 
         # Optionally print missing fields and raise warnings
 
@@ -97,30 +222,54 @@ class Parser:
         # Add some extra fields from the original data
         data["mail_date"] = self.mail_date
         data["name"] = self.person_name
+        return data
 
-        numeric_fields = [
-            "number_of_adults",
-            "number_of_children",
-            "price_by_night",
-            "number_of_nights",
-            "total_nights_cost",
-            "cleaning_fee",
-            "guest_service_fee",
-            "host_service_fee",
-            "tourist_tax",
-            "guest_payout",
-            "host_payout",
-        ]
-        for field in numeric_fields:
-            print(
-                f"Numeric field {field} before casted: {data[field]}"
-            ) if self.debug else None
-            try:
-                data[field] = float(data[field].replace("\u202f", ""))
-            except ValueError:
-                data[field] = 0.0
+    def parse_numbers(self, data: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Convert the counts and amounts extracted by ``extract``.
 
-        return data
+        Amounts are read with the ``AmountParser`` of the mail language, in one
+        batch; an amount that cannot be read is reported with a warning.
+
+        Returns:
+            Dict[str, Any]: The int or float of each numeric field, None when
+            missing or unparsable.
+        """
+        numbers: Dict[str, Any] = {field: _count(data[field]) for field in COUNT_FIELDS}
+        amounts, errors = amount_parser(self.language).parse_many(
+            {field: data[field] for field in AMOUNT_FIELDS}
+        )
+        for field, raw_value in errors.items():
+            warnings.warn(f"{field}: unparsable amount {raw_value!r}", UserWarning)
+        numbers.update(amounts)
+        return numbers
+
+    def parse_reservation(self) -> ParsedReservation:
+        """
+        Parses the booking data into a typed record.
+
+        A field that is missing or cannot be converted is ``None``, and the
+        years missing from the mail are inferred (see ``dates.resolve_stay``).
+
+        Returns:
+            ParsedReservation: The reservation, without its ``message_id``.
+        """
+        data = self.extract()
+        values: Dict[str, Any] = {name: _text(data.get(name)) for name in TEXT_FIELDS}
+        values.update(self.parse_numbers(data))
+        values["arrival_date"], values["departure_date"] = self.stay_dates(data)
+        values["mail_date"] = _iso_date(data["mail_date"])
+        return ParsedReservation(**values)
+
+    def stay_dates(
+        self, data: Dict[str, Any]
+    ) -> Tuple[Optional[datetime.date], Optional[datetime.date]]:
+        """Resolve the arrival and departure dates extracted by ``extract``."""
+        return resolve_stay(
+            _date_parts(data, "arrival"),
+            _date_parts(data, "departure"),
+            _iso_date(self.mail_date),
+        )
 
     @staticmethod
     def safe_get(match: Optional[Match], group, default: str = "N/A") -> str:
@@ -149,9 +298,7 @@ class Parser:
             data["arrival_day_of_week"] = self.safe_get(match, 1)
             data["arrival_day"] = self.safe_get(match, 2)
             data["arrival_month"] = self.safe_get(match, 3)
-            data["arrival_year"] = self.safe_get(
-                match, 4, self.mail_date[:4] if self.mail_date != "N/A" else "N/A"
-            )
+            data["arrival_year"] = self.safe_get(match, 4)
         else:
             data.update(
                 {
@@ -172,9 +319,7 @@ class Parser:
             data["departure_day_of_week"] = self.safe_get(match, 1)
             data["departure_day"] = self.safe_get(match, 2)
             data["departure_month"] = self.safe_get(match, 3)
-            data["departure_year"] = self.safe_get(
-                match, 4, self.mail_date[:4] if self.mail_date != "N/A" else "N/A"
-            )
+            data["departure_year"] = self.safe_get(match, 4)
         else:
             data.update(
                 {
@@ -209,10 +354,7 @@ class Parser:
         """
         Extract and set cleaning fee.
         """
-        raw_value = self.safe_get(match, 1)
-        data["cleaning_fee"] = (
-            raw_value.replace(",", ".") if raw_value != "N/A" else "N/A"
-        )
+        data["cleaning_fee"] = self.safe_get(match, 1)
 
     def parse_guest_service_fee(
         self, match: Optional[Match], data: Dict[str, Any]
@@ -220,10 +362,7 @@ class Parser:
         """
         Extract and set guest service fee.
         """
-        raw_value = self.safe_get(match, 1)
-        data["guest_service_fee"] = (
-            raw_value.replace(",", ".") if raw_value != "N/A" else "N/A"
-        )
+        data["guest_service_fee"] = self.safe_get(match, 1)
 
     def parse_host_service_fee(
         self, match: Optional[Match], data: Dict[str, Any]
@@ -235,11 +374,7 @@ class Parser:
             # Named groups for clarity
             fee_raw = self.safe_get(match, "host_service_fee")
             tax_raw = self.safe_get(match, "tax")
-            data["host_service_fee"] = (
-                fee_raw.replace(",", ".").replace("€", "").replace(" ", "")
-                if fee_raw != "N/A"
-                else "N/A"
-            )
+            data["host_service_fee"] = fee_raw
             data["host_service_tax"] = tax_raw if tax_raw != "N/A" else "N/A"
         else:
             data["host_service_fee"] = "N/A"
@@ -249,10 +384,7 @@ class Parser:
         """
         Extract and set tourist tax.
         """
-        raw_value = self.safe_get(match, 1)
-        data["tourist_tax"] = (
-            raw_value.replace(",", ".") if raw_value != "N/A" else "N/A"
-        )
+        data["tourist_tax"] = self.safe_get(match, 1)
 
     def parse_price_by_night_guest(
         self, match: Optional[Match], data: Dict[str, Any]
@@ -261,10 +393,9 @@ class Parser:
         Extract and set price per night, number of nights, and total price.
         """
         if match:
-            data["price_by_night"] = self.safe_get(match, 1).replace(",", ".")
+            data["price_by_night"] = self.safe_get(match, 1)
             data["number_of_nights"] = self.safe_get(match, 2)
-            night_cost_raw = self.safe_get(match, 3)
-            data["total_nights_cost"] = self.fix_payout_value(night_cost_raw)
+            data["total_nights_cost"] = self.safe_get(match, 3)
         else:
             data.update(
                 {
@@ -274,39 +405,17 @@ class Parser:
                 }
             )
 
-    def fix_payout_value(self, raw_value: str) -> str:
-        """
-        Cleans numeric string by removing thousands separators and ensuring a single decimal point.
-        """
-
-        cleaned = raw_value.replace("\u202f", "").strip()
-        # Remove any non-digit or punctuation except '.' and ','
-        cleaned = re.sub(r"[^\d.,]", "", cleaned)
-        # Find all punctuation positions
-        seps = [m.start() for m in re.finditer(r"[.,]", cleaned)]
-        if len(seps) > 1:
-            # Last punctuation is the decimal
-            main = re.sub(r"[.,]", "", cleaned[: seps[-1]])
-            decimal = cleaned[seps[-1] :].replace(",", ".")
-            return main + decimal
-        return cleaned.replace(",", ".")
-
     def parse_guest_payout(self, match: Optional[Match], data: Dict[str, Any]) -> None:
         """
         Extract and set the total payout from the guest.
         """
-        raw_value = self.safe_get(match, 1)
-        if raw_value != "N/A":
-            data["guest_payout"] = self.fix_payout_value(raw_value)
-        else:
-            data["guest_payout"] = "N/A"
+        data["guest_payout"] = self.safe_get(match, 1)
 
     def parse_host_payout(self, match: Optional[Match], data: Dict[str, Any]) -> None:
         """
         Extract and set the host's final payout.
         """
-        raw_value = self.safe_get(match, 1)
-        data["host_payout"] = self.fix_payout_value(raw_value)
+        data["host_payout"] = self.safe_get(match, 1)
 
     def parse_guest_location(
         self, match: Optional[Match], data: Dict[str, Any]
@@ -333,29 +442,14 @@ class Parser:
                 r"Envoyé\s*:\s*[\wé]+ (\d{1,2}) (\w+) (\d{4}) (?:\d{2}:\d{2}:\d{2})",
                 snippet,
             )
-            if date_match:
-                date = date_match.group(1)
-                month = date_match.group(2)
-                month_mapping = {
-                    "janvier": "01",
-                    "février": "02",
-                    "mars": "03",
-                    "avril": "04",
-                    "mai": "05",
-                    "juin": "06",
-                    "juillet": "07",
-                    "août": "08",
-                    "septembre": "09",
-                    "octobre": "10",
-                    "novembre": "11",
-                    "décembre": "12",
-                }
-                month = month_mapping.get(month.lower(), month)
-                year = date_match.group(3)
-                return f"{year}-{month.zfill(2)}-{date.zfill(2)}"
+            month = month_number(date_match.group(2)) if date_match else None
+            if month is not None:
+                day, year = date_match.group(1), date_match.group(3)
+                return f"{year}-{month:02d}-{day.zfill(2)}"
         return mail.get("Date", "N/A")
 
-    def get_language_patterns(self, language: str) -> Dict[str, Pattern]:
+    @staticmethod
+    def get_language_patterns(language: str) -> Dict[str, Pattern]:
         """
         Returns a dictionary of compiled regex patterns based on the language.
 
@@ -365,10 +459,13 @@ class Parser:
         Returns:
             Dict[str, Pattern]: A dictionary of field name to regex pattern.
         """
+        # Patterns start with a literal and bound their repetitions, so a search
+        # stays linear in the body size (see benchmarks/bench_patterns.py).
         # Shared pattern for guest location
         guest_location_pattern = re.compile(
-            r"[0-9a-zA-Z-]+bec06f\.jpg\]\s*(?:(?P<city>[A-Za-zÀ-ÖØ-öø-ÿ\s]+),\s*)?"
-            r"(?P<country>[A-Za-zÀ-ÖØ-öø-ÿ\s]{1,20})(?=\r\n\r\n\S)"
+            r"(?<=[0-9a-zA-Z-])bec06f\.jpg\]\s{0,4}"
+            r"(?:(?P<city>[A-Za-zÀ-ÖØ-öø-ÿ\s]{1,60}),\s*)?"
+            r"(?P<country>[A-Za-zÀ-ÖØ-öø-ÿ ]{1,60})(?=\r\n\r\n\S)"
         )
 
         if language == "fr":
@@ -389,7 +486,8 @@ class Parser:
                     r"(?<=Le\svoyageur\sa\spayé\r\n\r\n)([\d,\.]+)\s€\sx\s(\d{1,2})\snuits?\r\n\r\n([\d,\.\u202f]+)\s€"
                 ),
                 "cleaning_fee": re.compile(
-                    r"Frais de ménage\s*(?:pour les séjours courte durée\s*)?\r?\n\s*([\d\,\.]+) €",
+                    r"Frais de ménage[^\S\r\n]*(?:pour les séjours courte durée[^\S\r\n]*)?"
+                    r"\r?\n\s*([\d\,\.]+) €",
                     re.IGNORECASE,
                 ),
                 "guest_service_fee": re.compile(
@@ -398,7 +496,9 @@ class Parser:
                 "host_service_fee": re.compile(
                     r"service(?:\shôte\s\((?P<tax>\d.\d\s\%)\s\+\sTVA\))?\r\n\r\n(?P<host_service_fee>-[\d,\.]+)\s€"
                 ),
-                "tourist_tax": re.compile(r"Taxes de séjour\s*\r?\n\s*([\d,\.]+)\s€"),
+                "tourist_tax": re.compile(
+                    r"Taxes de séjour[^\S\r\n]*\r?\n\s*([\d,\.]+)\s€"
+                ),
                 "host_payout": re.compile(
                     r"(?:gagnez|EUR\))\r\n([\d\.,\u202f]+)\s€(?:\r\n\r\n)(?:Votre|L'argent)"
                 ),
@@ -434,7 +534,7 @@ class Parser:
                     r"fee(?:\s\((?P<tax>\d.\d\%)\s\+\sVAT\))?\r\n\r\n(?P<host_service_fee>-€\s[\d,\.]+)"
                 ),
                 "tourist_tax": re.compile(
-                    r"(?<=\s€\s)([\d,\.]+)*\sin\sOccupancy\sTaxes\."
+                    r"(?<=\s€\s)([\d,\.]+)\sin\sOccupancy\sTaxes\."
                 ),
                 "host_payout": re.compile(
                     r"(?:earn|EUR\))\r\n€\s([\d\.,\u202f]+)(?:\r\n\r\n)(?:The|Your)"
@@ -0,0 +1,155 @@
+"""
+Typed record of a parsed reservation mail.
+
+``ParsedReservation`` is returned by ``Parser.parse_reservation``: dates are
+``datetime.date``, counts ``int``, amounts ``float`` and a field that could not
+be extracted is ``None``, so consumers test ``is None`` instead of comparing
+strings. The record is slotted, which
+keeps large backfills small in memory, and converts itself to the Notion
+properties, the Calendar event arguments and the JSON of the run journal.
+
+``ReservationPatch`` is what an alteration or a cancellation mail changes in
+an existing reservation.
+"""
+
+import datetime
+from dataclasses import dataclass, field, fields
+from typing import Any, Dict, Optional
+
+from services.notion_client.schema import RESERVATION_SCHEMA
+
+# Fields passed to ``CalendarService.create_event``.
+CALENDAR_FIELDS = (
+    "arrival_date",
+    "departure_date",
+    "name",
+    "confirmation_code",
+    "number_of_adults",
+    "number_of_children",
+    "country",
+)
+
+_DATE_FIELDS = ("arrival_date", "departure_date", "mail_date")
+
+
+@dataclass(slots=True)
+class ParsedReservation:
+    """One reservation extracted from a confirmation mail."""
+
+    confirmation_code: Optional[str] = None
+    name: Optional[str] = None
+    arrival_date: Optional[datetime.date] = None
+    departure_date: Optional[datetime.date] = None
+    arrival_day_of_week: Optional[str] = None
+    departure_day_of_week: Optional[str] = None
+    number_of_adults: Optional[int] = None
+    number_of_children: Optional[int] = None
+    number_of_nights: Optional[int] = None
+    price_by_night: Optional[float] = None
+    total_nights_cost: Optional[float] = None
+    cleaning_fee: Optional[float] = None
+    guest_service_fee: Optional[float] = None
+    host_service_fee: Optional[float] = None
+    host_service_tax: Optional[str] = None
+    tourist_tax: Optional[float] = None
+    guest_payout: Optional[float] = None
+    host_payout: Optional[float] = None
+    country: Optional[str] = None
+    city: Optional[str] = None
+    mail_date: Optional[datetime.date] = None
+    message_id: Optional[str] = None
+
+    def missing_fields(self) -> list:
+        """Return the names of the fields that could not be extracted."""
+        return [
+            name
+            for name in _FIELD_NAMES
+            if name != "message_id" and getattr(self, name) is None
+        ]
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Return the extracted fields (``None`` ones are left out)."""
+        values = {}
+        for name in _FIELD_NAMES:
+            value = getattr(self, name)
+            if value is not None:
+                values[name] = value
+        return values
+
+    def to_notion(self) -> Dict[str, Any]:
+        """Return the Notion page properties (see ``RESERVATION_SCHEMA``)."""
+        return RESERVATION_SCHEMA.serialize(self.to_dict())
+
+    def to_calendar(self) -> Dict[str, Any]:
+        """Return the keyword arguments of ``CalendarService.create_event``."""
+        values = {}
+        for name in CALENDAR_FIELDS:
+            value = getattr(self, name)
+            if value is None:
+                continue
+            values[name] = value.isoformat() if name in _DATE_FIELDS else value
+        return values
+
+    def to_json(self) -> Dict[str, Any]:
+        """Return a JSON-serializable dict, read back by ``from_json``."""
+        values = self.to_dict()
+        for name in _DATE_FIELDS:
+            if name in values:
+                values[name] = values[name].isoformat()
+        return values
+
+    @classmethod
+    def from_json(cls, values: Dict[str, Any]) -> "ParsedReservation":
+        values = dict(values)
+        for name in _DATE_FIELDS:
+            if values.get(name) is not None:
+                values[name] = datetime.date.fromisoformat(values[name])
+        return cls(**values)
+
+
+_FIELD_NAMES = tuple(field.name for field in fields(ParsedReservation))
+
+
+@dataclass(slots=True)
+class ReservationPatch:
+    """The changes an alteration or cancellation mail makes to a reservation."""
+
+    kind: str
+    confirmation_code: str
+    # New value of every changed ``ParsedReservation`` field.
+    changes: Dict[str, Any] = field(default_factory=dict)
+    mail_date: Optional[datetime.date] = None
+    message_id: Optional[str] = None
+
+    @property
+    def is_cancellation(self) -> bool:
+        return self.kind == "cancellation"
+
+    def to_notion(self) -> Dict[str, Any]:
+        """Return the Notion properties of the changed fields only."""
+        return RESERVATION_SCHEMA.serialize(self.changes)
+
+    def to_json(self) -> Dict[str, Any]:
+        """Return a JSON-serializable dict, read back by ``from_json``."""
+        changes = dict(self.changes)
+        for name in _DATE_FIELDS:
+            if name in changes:
+                changes[name] = changes[name].isoformat()
+        return {
+            "kind": self.kind,
+            "confirmation_code": self.confirmation_code,
+            "changes": changes,
+            "mail_date": self.mail_date.isoformat() if self.mail_date else None,
+            "message_id": self.message_id,
+        }
+
+    @classmethod
+    def from_json(cls, values: Dict[str, Any]) -> "ReservationPatch":
+        values = dict(values)
+        changes = dict(values.pop("changes"))
+        for name in _DATE_FIELDS:
+            if changes.get(name) is not None:
+                changes[name] = datetime.date.fromisoformat(changes[name])
+        if values.get("mail_date") is not None:
+            values["mail_date"] = datetime.date.fromisoformat(values["mail_date"])
+        return cls(changes=changes, **values)
@@ -0,0 +1,89 @@
+"""
+Alteration and cancellation mails of Airbnb reservations.
+
+When a guest changes the dates or cancels, Airbnb sends a mail whose subject
+says so ("Reservation altered", "Réservation annulée", ...). The Gmail service
+recognizes these subjects (``gmail_services.classify_update``) and tags the
+mails "reserved"; ``parse_update`` turns such a mail into a
+``ReservationPatch``: the confirmation code, and for an alteration the fields
+the mail gives (dates, guests, amounts) with the field patterns of the
+confirmation mails. The patch updates the Notion page and the Calendar event
+of the reservation instead of creating new ones.
+"""
+
+import datetime
+import re
+import warnings
+from typing import Optional
+
+from services.mail_processing.parser import Parser
+from services.mail_processing.reservation import ReservationPatch
+
+UPDATE_KINDS = ("cancellation", "alteration")
+
+CONFIRMATION_CODE_PATTERN = re.compile(r"\b(HM[A-Z0-9]{8})\b")
+
+# Fields an alteration can change.
+PATCH_FIELDS = (
+    "arrival_date",
+    "departure_date",
+    "arrival_day_of_week",
+    "departure_day_of_week",
+    "number_of_adults",
+    "number_of_children",
+    "number_of_nights",
+    "price_by_night",
+    "total_nights_cost",
+    "cleaning_fee",
+    "guest_service_fee",
+    "host_service_fee",
+    "tourist_tax",
+    "guest_payout",
+    "host_payout",
+)
+
+
+def _mail_date(parser: Parser) -> Optional[datetime.date]:
+    try:
+        return datetime.date.fromisoformat(parser.mail_date)
+    except (TypeError, ValueError):
+        return None
+
+
+def parse_update(parser: Parser, kind: str) -> ReservationPatch:
+    """
+    Turn an alteration or cancellation mail into a patch.
+
+    Args:
+        parser (Parser): Parser of the mail.
+        kind (str): One of ``UPDATE_KINDS``.
+
+    Returns:
+        ReservationPatch: The patch, without its ``message_id``.
+
+    Raises:
+        ValueError: If the mail carries no confirmation code.
+    """
+    if kind not in UPDATE_KINDS:
+        raise ValueError(f"Unknown update kind: {kind}")
+    code, changes = None, {}
+    if kind == "alteration" and parser.is_supported:
+        with warnings.catch_warnings():
+            # An alteration only repeats some of the fields of a confirmation.
+            warnings.filterwarnings("ignore", message=".* not found$")
+            reservation = parser.parse_reservation()
+        code = reservation.confirmation_code
+        for name in PATCH_FIELDS:
+            value = getattr(reservation, name)
+            if value is not None:
+                changes[name] = value
+    if code is None:
+        match = CONFIRMATION_CODE_PATTERN.search(
+            parser.subject
+        ) or CONFIRMATION_CODE_PATTERN.search(parser.message_body)
+        code = match.group(1) if match else None
+    if code is None:
+        raise ValueError(f"No confirmation code found in the {kind} mail.")
+    return ReservationPatch(
+        kind=kind, confirmation_code=code, changes=changes, mail_date=_mail_date(parser)
+    )
@@ -0,0 +1,119 @@
+import re
+import unicodedata
+from dataclasses import dataclass
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+_SEPARATORS = re.compile(r"[\W_]+")
+
+
+def normalize_name(name: str) -> str:
+    """
+    Fold a guest name for matching: accents removed, case folded, punctuation
+    turned into spaces (``"Zoë  O'Brien"`` -> ``"zoe o brien"``).
+    """
+    decomposed = unicodedata.normalize("NFKD", name or "")
+    folded = "".join(char for char in decomposed if not unicodedata.combining(char))
+    return _SEPARATORS.sub(" ", folded.casefold()).strip()
+
+
+def name_tokens(name: str) -> Tuple[str, ...]:
+    return tuple(normalize_name(name).split())
+
+
+def _plain_text(prop: Dict[str, Any]) -> str:
+    field_type = prop.get("type", "title")
+    return "".join(text.get("plain_text", "") for text in prop.get(field_type) or [])
+
+
+def _date_start(prop: Optional[Dict[str, Any]]) -> str:
+    # ISO dates compare in chronological order, only the day part is kept.
+    return (((prop or {}).get("date") or {}).get("start") or "")[:10]
+
+
+@dataclass(frozen=True)
+class GuestStay:
+    page_id: str
+    name: str
+    arrival_date: str
+    departure_date: str
+
+
+class GuestIndex:
+    """
+    In-memory index of the stays of the reservation database by guest name.
+
+    Built once per run from a paginated scan, it resolves the guest name of a
+    review mail (often only a first name) to a single page: every token of the
+    searched name must appear in the guest name, and among the matching stays the
+    most recent one that ended on or before the review date wins.
+    """
+
+    def __init__(self, stays: Iterable[GuestStay] = ()) -> None:
+        self._by_token: Dict[str, List[GuestStay]] = {}
+        self.size = 0
+        for stay in stays:
+            self.add(stay)
+
+    @classmethod
+    def from_pages(cls, pages: Iterable[Dict[str, Any]]) -> "GuestIndex":
+        """Build the index from raw Notion pages of the reservation database."""
+        index = cls()
+        for page in pages:
+            properties = page.get("properties", {})
+            name = _plain_text(properties.get("Name", {}))
+            if not name:
+                continue
+            index.add(
+                GuestStay(
+                    page_id=page["id"],
+                    name=name,
+                    arrival_date=_date_start(properties.get("Arrival Date")),
+                    departure_date=_date_start(properties.get("Departure Date")),
+                )
+            )
+        return index
+
+    def add(self, stay: GuestStay) -> None:
+        for token in set(name_tokens(stay.name)):
+            self._by_token.setdefault(token, []).append(stay)
+        self.size += 1
+
+    def candidates(self, name: str) -> List[GuestStay]:
+        """Return the stays whose guest name contains every token of ``name``."""
+        tokens = name_tokens(name)
+        if not tokens:
+            return []
+        postings = sorted(
+            (self._by_token.get(token, []) for token in set(tokens)), key=len
+        )
+        matches = {stay.page_id: stay for stay in postings[0]}
+        for posting in postings[1:]:
+            page_ids = {stay.page_id for stay in posting}
+            matches = {k: v for k, v in matches.items() if k in page_ids}
+        return list(matches.values())
+
+    def lookup(self, name: str, review_date: Optional[str] = None) -> Optional[str]:
+        """
+        Return the page ID of the stay a review is about.
+
+        Args:
+            name (str): Guest name from the review mail.
+            review_date (str, optional): ISO date of the review mail.
+
+        Returns:
+            Optional[str]: The page ID, or None if no stay matches.
+        """
+        stays = self.candidates(name)
+        if review_date:
+            ended = [
+                stay
+                for stay in stays
+                if (stay.departure_date or stay.arrival_date) <= review_date[:10]
+            ]
+            # A review sent before the recorded departure (early checkout, stay
+            # still being edited) falls back to the closest stay overall.
+            stays = ended or stays
+        if not stays:
+            return None
+        latest = max(stays, key=lambda stay: (stay.departure_date, stay.arrival_date))
+        return latest.page_id
@@ -1,70 +1,97 @@
+import contextvars
 import datetime
 import os
 import warnings
-from typing import Any, Dict, List
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, Iterator, List, Optional
 
-from notion_client import Client
+from services.telemetry.tracer import get_tracer
+from services.transport.http_client import get_notion_client
+
+from .guest_index import GuestIndex
+from .schema import RESERVATION_SCHEMA
+
+# Number of confirmation codes looked up per query (Notion compound filter limit).
+LOOKUP_BATCH_SIZE = 100
+
+# Properties written once, when the page is created.
+CREATE_ONLY_PROPERTIES = {"Insert Date"}
+
+
+def _plain_value(prop: Dict[str, Any]) -> Any:
+    """
+    Reduce a property payload to a comparable value.
+
+    Works for the payloads built by ``PROPERTY_MAPPING`` as well as for the
+    properties returned by the API (which carry ``plain_text``).
+    """
+    for field_type in ("rich_text", "title"):
+        if field_type in prop:
+            return "".join(
+                text.get("plain_text", text.get("text", {}).get("content", ""))
+                for text in prop[field_type] or []
+            )
+    if "number" in prop:
+        return prop["number"]
+    if "date" in prop:
+        return (prop["date"] or {}).get("start")
+    if "select" in prop:
+        return (prop["select"] or {}).get("name")
+    return prop
 
 
 class NotionClient:
-    def __init__(self) -> None:
-        """Initialize client with API key and database id from environment variables."""
+    def __init__(self, database_id: Optional[str] = None) -> None:
+        """
+        Initialize client with API key and database id from environment variables.
+
+        Args:
+            database_id (str, optional): Reservation database of a listing,
+                instead of ``DATABASE_ID``.
+        """
         self.token = os.environ.get("NOTION_API")
-        self.database_id = os.environ.get("DATABASE_ID")
+        self.database_id = database_id or os.environ.get("DATABASE_ID")
         assert self.token, "Missing NOTION_API environment variable"
         assert self.database_id, "Missing DATABASE_ID environment variable"
-        self.client = Client(auth=self.token)
+        self.client = get_notion_client(self.token)
+
+    def _query(self, **kwargs) -> Dict[str, Any]:
+        """Query the database inside a ``notion.databases.query`` span."""
+        with get_tracer().span("notion.databases.query") as span:
+            span.set_request(kwargs)
+            response = self.client.databases.query(
+                database_id=self.database_id, **kwargs
+            )
+            span.set_response(response)
+        return response
+
+    def _create(self, properties: Dict[str, Any]) -> Dict[str, Any]:
+        """Create a page inside a ``notion.pages.create`` span."""
+        with get_tracer().span("notion.pages.create") as span:
+            span.set_request(properties)
+            response = self.client.pages.create(
+                parent={"database_id": self.database_id}, properties=properties
+            )
+            span.set_response(response)
+        return response
+
+    def _update(self, page_id: str, **kwargs) -> Dict[str, Any]:
+        """Update a page inside a ``notion.pages.update`` span."""
+        with get_tracer().span("notion.pages.update") as span:
+            span.set_request(kwargs)
+            response = self.client.pages.update(page_id=page_id, **kwargs)
+            span.set_response(response)
+        return response
+
+    def build_properties(self, **kwargs) -> Dict[str, Any]:
+        """Build the Notion properties of a reservation (see ``RESERVATION_SCHEMA``)."""
+        return RESERVATION_SCHEMA.serialize(kwargs)
 
     def create_page(self, **kwargs) -> Any:
-        property_mapping = {
-            "date": ("Date", lambda v: {"date": {"start": v}}),
-            "arrival_date": ("Arrival Date", lambda v: {"date": {"start": v}}),
-            "departure_date": ("Departure Date", lambda v: {"date": {"start": v}}),
-            "confirmation_code": (
-                "Confirmation Code",
-                lambda v: {"rich_text": [{"text": {"content": v}}]},
-            ),
-            "price_by_night": ("Price by night", lambda v: {"number": v}),
-            "number_of_nights": ("Number of Nights", lambda v: {"number": v}),
-            "total_nights_cost": ("Total Nights Cost", lambda v: {"number": v}),
-            "cleaning_fee": ("Cleaning Fee", lambda v: {"number": v}),
-            "guest_service_fee": ("Guest Service Fee", lambda v: {"number": v}),
-            "host_service_fee": ("Host Service Fee", lambda v: {"number": v}),
-            "tourist_tax": ("Tourist Tax", lambda v: {"number": v}),
-            "total_paid_by_guest": ("Total Paid by Guest", lambda v: {"number": v}),
-            "host_payout": ("Host Payout", lambda v: {"number": v}),
-            "number_of_adults": ("Number of Adults", lambda v: {"number": v}),
-            "number_of_children": ("Number of Children", lambda v: {"number": v}),
-            "country": ("Country", lambda v: {"select": {"name": v}}),
-            "city": ("City", lambda v: {"select": {"name": v}}),
-            "name": ("Name", lambda v: {"title": [{"text": {"content": v}}]}),
-            "subject": ("Subject", lambda v: {"rich_text": [{"text": {"content": v}}]}),
-            "insert_date": (
-                "Insert Date",
-                lambda v: {"rich_text": [{"text": {"content": v}}]},
-            ),
-            "arrival_day_of_week": (
-                "Arrival DayOfWeek",
-                lambda v: {"rich_text": [{"text": {"content": v}}]},
-            ),
-            "departure_day_of_week": (
-                "Departure DayOfWeek",
-                lambda v: {"rich_text": [{"text": {"content": v}}]},
-            ),
-            "host_service_tax": (
-                "Host Service Tax",
-                lambda v: {"rich_text": [{"text": {"content": v}}]},
-            ),
-            "guest_payout": ("Guest Payout", lambda v: {"number": v}),
-            "mail_date": ("Mail Date", lambda v: {"date": {"start": v}}),
-            "number_of_child": ("Number of child", lambda v: {"number": v}),
-        }
-        props = {}
-        for field, value in kwargs.items():
-            if field in property_mapping and value is not None:
-                notion_key, builder = property_mapping[field]
-                props[notion_key] = builder(value)
+        return self._create_reservation(self.build_properties(**kwargs))
 
+    def _create_reservation(self, props: Dict[str, Any]) -> Dict[str, Any]:
+        props = dict(props)
         props["Insert Date"] = {
             "rich_text": [
                 {
@@ -77,15 +104,12 @@ class NotionClient:
             ]
         }
 
-        return self.client.pages.create(
-            parent={"database_id": self.database_id}, properties=props
-        )
+        return self._create(props)
 
     def delete_page_by_reservation_code(self, reservation_code: str) -> int:
         if not reservation_code or reservation_code == "N/A":
             return 0
-        query = self.client.databases.query(
-            database_id=self.database_id,
+        query = self._query(
             filter={
                 "property": "Confirmation Code",
                 "rich_text": {"equals": reservation_code},  # Updated filter type
@@ -93,7 +117,7 @@ class NotionClient:
         )
         for result in query.get("results", []):
             page_id = result["id"]
-            self.client.pages.update(page_id=page_id, archived=True)
+            self._update(page_id, archived=True)
         return len(query.get("results", []))
 
     def parse_page(self, page: Dict[str, Any]) -> Dict[str, Any]:
@@ -119,8 +143,7 @@ class NotionClient:
         self, reservation_code: str
     ) -> List[Dict[str, Any]]:
         """Retrieve and parse pages that match the provided confirmation code."""
-        query = self.client.databases.query(
-            database_id=self.database_id,
+        query = self._query(
             filter={
                 "property": "Confirmation Code",
                 "rich_text": {"equals": reservation_code},
@@ -129,18 +152,188 @@ class NotionClient:
         pages = query.get("results", [])
         return [self.parse_page(page) for page in pages]
 
+    def _query_all(self, **kwargs) -> Iterator[Dict[str, Any]]:
+        """Yield every page matching the query, following the pagination cursor."""
+        cursor = None
+        while True:
+            if cursor:
+                kwargs["start_cursor"] = cursor
+            query = self._query(page_size=100, **kwargs)
+            yield from query.get("results", [])
+            cursor = query.get("next_cursor")
+            if not query.get("has_more") or not cursor:
+                return
+
     def get_all_pages(self) -> List[Any]:
-        """Retrieve all pages from the Notion database (pagination not handled)."""
-        query = self.client.databases.query(database_id=self.database_id)
-        return query.get("results", [])
+        """Retrieve all pages from the Notion database."""
+        return list(self._query_all())
+
+    def get_pages_edited_since(self, timestamp: str) -> List[Any]:
+        """
+        Retrieve the pages edited on or after ``timestamp``.
+
+        Args:
+            timestamp (str): ISO 8601 date-time, e.g. the time of the last sync.
+
+        Returns:
+            List[Any]: Raw pages (archived pages are not returned by Notion).
+        """
+        return list(
+            self._query_all(
+                filter={
+                    "timestamp": "last_edited_time",
+                    "last_edited_time": {"on_or_after": timestamp},
+                }
+            )
+        )
+
+    def get_pages_by_reservation_codes(
+        self, reservation_codes: List[str]
+    ) -> Dict[str, Dict[str, Any]]:
+        """
+        Retrieve the pages of many reservations with batched ``or`` queries.
+
+        Args:
+            reservation_codes (List[str]): Confirmation codes to look up.
+
+        Returns:
+            Dict[str, Dict[str, Any]]: Raw page by confirmation code.
+        """
+        pages = {}
+        codes = list(dict.fromkeys(reservation_codes))
+        for start in range(0, len(codes), LOOKUP_BATCH_SIZE):
+            conditions = [
+                {"property": "Confirmation Code", "rich_text": {"equals": code}}
+                for code in codes[start : start + LOOKUP_BATCH_SIZE]
+            ]
+            for page in self._query_all(filter={"or": conditions}):
+                code = _plain_value(page["properties"]["Confirmation Code"])
+                pages.setdefault(code, page)
+        return pages
+
+    def upsert_reservations(
+        self,
+        reservations: List[Dict[str, Any]],
+        max_workers: int = 4,
+    ) -> Dict[str, int]:
+        """
+        Create or update reservations, keyed on their confirmation code.
+
+        Existing rows are fetched in batches and diffed against the incoming
+        reservations: missing reservations are created, existing ones only get
+        the properties whose value changed, and identical ones are left alone.
+        Writes run on at most ``max_workers`` threads.
+
+        Args:
+            reservations (List[Dict[str, Any]]): The Notion properties of each
+                reservation, e.g. from ``build_properties``.
+            max_workers (int): Maximum number of concurrent writes.
+
+        Returns:
+            Dict[str, int]: Number of ``created``, ``updated``, ``unchanged`` and
+            ``skipped`` (no valid confirmation code) reservations.
+        """
+        counts = {"created": 0, "updated": 0, "unchanged": 0, "skipped": 0}
+        by_code = {}
+        for props in reservations:
+            code_prop = props.get("Confirmation Code")
+            code = _plain_value(code_prop) if code_prop else None
+            if not code or code == "N/A":
+                warnings.warn("Invalid reservation ID", UserWarning)
+                counts["skipped"] += 1
+                continue
+            # The last parsed version of a reservation wins.
+            by_code[code] = props
+
+        existing = self.get_pages_by_reservation_codes(list(by_code))
+        writes = []
+        for code, props in by_code.items():
+            page = existing.get(code)
+            if page is None:
+                writes.append((self._create_reservation, (props,), {}))
+                counts["created"] += 1
+                continue
+            changes = self._changed(page, props)
+            if changes:
+                writes.append((self._update, (page["id"],), {"properties": changes}))
+                counts["updated"] += 1
+            else:
+                counts["unchanged"] += 1
+
+        self._run_writes(writes, max_workers)
+        return counts
+
+    def patch_reservation(
+        self, code: str, properties: Dict[str, Any], archive: bool = False
+    ) -> str:
+        """
+        Apply an alteration or a cancellation to the page of a reservation.
+
+        A cancellation archives the page; an alteration only writes the
+        properties whose value differs from the page.
+
+        Args:
+            code (str): The confirmation code of the reservation.
+            properties (Dict[str, Any]): The altered Notion properties.
+            archive (bool): Archive the page (cancellation) instead.
+
+        Returns:
+            str: ``archived``, ``updated``, ``unchanged`` or ``missing`` (no page
+            has the confirmation code).
+        """
+        page = self.get_pages_by_reservation_codes([code]).get(code)
+        if page is None:
+            warnings.warn(f"No page found for reservation {code}", UserWarning)
+            return "missing"
+        if archive:
+            self._update(page["id"], archived=True)
+            return "archived"
+        changes = self._changed(page, properties)
+        if not changes:
+            return "unchanged"
+        self._update(page["id"], properties=changes)
+        return "updated"
+
+    def changed_properties(
+        self, page: Dict[str, Any], reservation: Dict[str, Any]
+    ) -> Dict[str, Any]:
+        """Return the properties of ``reservation`` that differ from ``page``."""
+        return self._changed(page, self.build_properties(**reservation))
+
+    def _changed(self, page: Dict[str, Any], props: Dict[str, Any]) -> Dict[str, Any]:
+        current = page.get("properties", {})
+        changes = {}
+        for notion_key, prop in props.items():
+            if notion_key in CREATE_ONLY_PROPERTIES:
+                continue
+            if notion_key not in current or _plain_value(
+                current[notion_key]
+            ) != _plain_value(prop):
+                changes[notion_key] = prop
+        return changes
+
+    def _run_writes(self, writes: List[tuple], max_workers: int) -> None:
+        """Run ``(function, args, kwargs)`` writes with bounded concurrency."""
+        if not writes:
+            return
+        with ThreadPoolExecutor(max_workers=max(1, max_workers)) as executor:
+            # Each write runs in a copy of the caller's context, so its span is
+            # attached to the current trace.
+            futures = [
+                executor.submit(
+                    contextvars.copy_context().run, function, *args, **kwargs
+                )
+                for function, args, kwargs in writes
+            ]
+            for future in futures:
+                future.result()
 
     def row_exists_by_reservation_id(self, reservation_id: str) -> bool:
         if not reservation_id or reservation_id == "N/A":
             warnings.warn("Invalid reservation ID", UserWarning)
             print(f"Invalid reservation ID: {reservation_id}")
             return False
-        query = self.client.databases.query(
-            database_id=self.database_id,
+        query = self._query(
             filter={
                 "property": "Confirmation Code",
                 "rich_text": {"equals": reservation_id},
@@ -149,14 +342,41 @@ class NotionClient:
         results = query.get("results", [])
         return len(results) > 0
 
+    def build_guest_index(self) -> GuestIndex:
+        """Index every reservation of the database by guest name (one paginated scan)."""
+        return GuestIndex.from_pages(self._query_all())
+
+    def update_ratings(self, ratings: Dict[str, int], max_workers: int = 4) -> int:
+        """
+        Set the 'Rating' property of many pages with bounded concurrency.
+
+        Args:
+            ratings (Dict[str, int]): Rating by page ID.
+            max_workers (int): Maximum number of concurrent writes.
+
+        Returns:
+            int: Number of updated pages.
+        """
+        self._run_writes(
+            [
+                (
+                    self._update,
+                    (page_id,),
+                    {"properties": {"Rating": {"number": rating}}},
+                )
+                for page_id, rating in ratings.items()
+            ],
+            max_workers,
+        )
+        return len(ratings)
+
     def update_row_by_name(self, name: str, rating: int) -> Dict[str, Any]:
         """
         Update a row by setting the 'Rating' property based on the provided rating.
         Partial match is used for the provided name.
         """
         # Query page(s) matching the provided partial name in the 'Name' property
-        query = self.client.databases.query(
-            database_id=self.database_id,
+        query = self._query(
             filter={
                 "property": "Name",
                 "title": {"contains": name},
@@ -168,9 +388,7 @@ class NotionClient:
             return {}
         page_id = results[0]["id"]
         update_properties = {"Rating": {"number": rating}}
-        updated_page = self.client.pages.update(
-            page_id=page_id, properties=update_properties
-        )
+        updated_page = self._update(page_id, properties=update_properties)
         return updated_page
 
 
@@ -0,0 +1,162 @@
+import datetime
+import warnings
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Iterable, List, Tuple
+
+# Reservation fields that are used by the workflow but are not stored in Notion.
+INTERNAL_FIELDS = frozenset({"message_id"})
+
+
+def _date(value: Any) -> Dict[str, Any]:
+    if isinstance(value, datetime.date):
+        value = value.isoformat()
+    return {"date": {"start": value}}
+
+
+def _number(value: Any) -> Dict[str, Any]:
+    return {"number": value}
+
+
+def _rich_text(value: Any) -> Dict[str, Any]:
+    return {"rich_text": [{"text": {"content": value}}]}
+
+
+def _title(value: Any) -> Dict[str, Any]:
+    return {"title": [{"text": {"content": value}}]}
+
+
+def _select(value: Any) -> Dict[str, Any]:
+    return {"select": {"name": value}}
+
+
+# Notion property type -> (payload builder, accepted Python types).
+PROPERTY_TYPES: Dict[str, Tuple[Callable[[Any], Dict[str, Any]], tuple]] = {
+    "date": (_date, (str, datetime.date)),
+    "number": (_number, (int, float)),
+    "rich_text": (_rich_text, (str,)),
+    "title": (_title, (str,)),
+    "select": (_select, (str,)),
+}
+
+# Reservation field -> (Notion property, Notion property type).
+RESERVATION_FIELDS = {
+    "date": ("Date", "date"),
+    "arrival_date": ("Arrival Date", "date"),
+    "departure_date": ("Departure Date", "date"),
+    "confirmation_code": ("Confirmation Code", "rich_text"),
+    "price_by_night": ("Price by night", "number"),
+    "number_of_nights": ("Number of Nights", "number"),
+    "total_nights_cost": ("Total Nights Cost", "number"),
+    "cleaning_fee": ("Cleaning Fee", "number"),
+    "guest_service_fee": ("Guest Service Fee", "number"),
+    "host_service_fee": ("Host Service Fee", "number"),
+    "tourist_tax": ("Tourist Tax", "number"),
+    "total_paid_by_guest": ("Total Paid by Guest", "number"),
+    "host_payout": ("Host Payout", "number"),
+    "number_of_adults": ("Number of Adults", "number"),
+    "number_of_children": ("Number of Children", "number"),
+    "country": ("Country", "select"),
+    "city": ("City", "select"),
+    "name": ("Name", "title"),
+    "subject": ("Subject", "rich_text"),
+    "insert_date": ("Insert Date", "rich_text"),
+    "arrival_day_of_week": ("Arrival DayOfWeek", "rich_text"),
+    "departure_day_of_week": ("Departure DayOfWeek", "rich_text"),
+    "host_service_tax": ("Host Service Tax", "rich_text"),
+    "guest_payout": ("Guest Payout", "number"),
+    "mail_date": ("Mail Date", "date"),
+    "number_of_child": ("Number of child", "number"),
+}
+
+
+@dataclass(frozen=True)
+class PropertySpec:
+    """How one reservation field is stored in Notion."""
+
+    field: str
+    notion_key: str
+    notion_type: str
+    build: Callable[[Any], Dict[str, Any]]
+    accepted_types: tuple
+
+
+class ReservationSchema:
+    """
+    Compiled mapping from reservation fields to Notion property payloads.
+
+    The specs are resolved once, when the schema is built, so serializing a
+    reservation is a single pass over its fields with one dict lookup each.
+    Values of the wrong type and fields that are not mapped are reported with a
+    ``UserWarning`` instead of being silently dropped.
+    """
+
+    def __init__(
+        self,
+        fields: Dict[str, Tuple[str, str]],
+        internal_fields: Iterable[str] = INTERNAL_FIELDS,
+    ) -> None:
+        self.specs: Dict[str, PropertySpec] = {}
+        for field, (notion_key, notion_type) in fields.items():
+            if notion_type not in PROPERTY_TYPES:
+                raise ValueError(
+                    f"Unknown Notion property type '{notion_type}' for field '{field}'"
+                )
+            build, accepted_types = PROPERTY_TYPES[notion_type]
+            self.specs[field] = PropertySpec(
+                field, notion_key, notion_type, build, accepted_types
+            )
+        self.internal_fields = frozenset(internal_fields)
+        # Flat tuples keep attribute lookups out of the serialization loop.
+        self._compiled = {
+            field: (spec.notion_key, spec.build, spec.accepted_types)
+            for field, spec in self.specs.items()
+        }
+
+    def unmapped_fields(self, reservation: Dict[str, Any]) -> List[str]:
+        """Return the fields of ``reservation`` that have no Notion property."""
+        return [
+            field
+            for field in reservation
+            if field not in self.specs and field not in self.internal_fields
+        ]
+
+    def serialize(self, reservation: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Convert a reservation to Notion page properties.
+
+        ``None`` values are skipped. Invalid values and unmapped fields are
+        reported and skipped.
+
+        Args:
+            reservation (Dict[str, Any]): Parsed reservation.
+
+        Returns:
+            Dict[str, Any]: Properties ready for ``pages.create``/``pages.update``.
+        """
+        compiled = self._compiled
+        properties = {}
+        for field, value in reservation.items():
+            entry = compiled.get(field)
+            if entry is None:
+                if field not in self.internal_fields:
+                    warnings.warn(
+                        f"Field '{field}' has no Notion property and is not saved",
+                        UserWarning,
+                    )
+                continue
+            if value is None:
+                continue
+            notion_key, build, accepted_types = entry
+            # bool is an int subclass, but never a valid amount or count.
+            if not isinstance(value, accepted_types) or value is True or value is False:
+                spec = self.specs[field]
+                warnings.warn(
+                    f"Invalid value for '{field}' ({spec.notion_type} expected): {value!r}",
+                    UserWarning,
+                )
+                continue
+            properties[notion_key] = build(value)
+        return properties
+
+
+RESERVATION_SCHEMA = ReservationSchema(RESERVATION_FIELDS)
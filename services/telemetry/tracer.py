@@ -0,0 +1,331 @@
+import contextlib
+import contextvars
+import json
+import os
+import secrets
+import threading
+import time
+from dataclasses import asdict, dataclass, field
+from typing import Any, ContextManager, Dict, Iterator, List, Optional
+
+from googleapiclient.errors import HttpError
+from rich.console import Console
+from rich.table import Table
+
+SPAN_KINDS = {"internal": 1, "server": 2, "client": 3}
+
+# Google API calls failing with these statuses are retried by ``traced_execute``.
+RETRY_STATUSES = frozenset({429, 500, 502, 503, 504})
+MAX_RETRIES = 3
+RETRY_BACKOFF = 0.5
+
+_current_span: contextvars.ContextVar[Optional["Span"]] = contextvars.ContextVar(
+    "current_span", default=None
+)
+
+
+def payload_size(payload: Any) -> int:
+    """Return the size in bytes of ``payload`` serialized as JSON (0 for None)."""
+    if payload is None:
+        return 0
+    try:
+        return len(json.dumps(payload, default=str))
+    except (TypeError, ValueError):
+        return len(str(payload))
+
+
+@dataclass
+class Span:
+    """
+    A timed unit of work: a workflow step or a call to an external API.
+    """
+
+    name: str
+    kind: str
+    trace_id: str
+    span_id: str
+    parent_id: Optional[str]
+    start_time_ns: int
+    duration_ns: int = 0
+    request_bytes: int = 0
+    response_bytes: int = 0
+    retries: int = 0
+    status: str = "ok"
+    error: Optional[str] = None
+    attributes: Dict[str, Any] = field(default_factory=dict)
+
+    @property
+    def duration_ms(self) -> float:
+        return self.duration_ns / 1_000_000
+
+    def set_request(self, payload: Any) -> None:
+        """Record the size of the payload sent to the API."""
+        self.request_bytes = payload_size(payload)
+
+    def set_response(self, payload: Any) -> None:
+        """Record the size of the payload returned by the API."""
+        self.response_bytes = payload_size(payload)
+
+    def record_retry(self) -> None:
+        """Count one more attempt for this call."""
+        self.retries += 1
+
+    def set_attribute(self, key: str, value: Any) -> None:
+        self.attributes[key] = value
+
+
+class Tracer:
+    """
+    Collects spans for workflow steps and external API calls.
+
+    ``trace`` opens the root span of a new trace, every span opened inside it
+    (in the same context) belongs to that trace. Spans opened outside of a trace
+    are timed but not kept. Finished traces can be summarized, exported as JSON
+    lines or as OTLP/JSON, and then discarded so that a long-lived process does
+    not accumulate spans.
+    """
+
+    def __init__(self, service_name: str = "bnb-host-tools") -> None:
+        self.service_name = service_name
+        self.spans: List[Span] = []
+        self._lock = threading.Lock()
+
+    def trace(self, name: str, **attributes) -> ContextManager[Span]:
+        """Open the root span of a new trace, e.g. one workflow run."""
+        return self._span(name, "internal", None, True, attributes)
+
+    def span(
+        self, name: str, kind: str = "client", **attributes
+    ) -> ContextManager[Span]:
+        """
+        Time the enclosed block as a span of the current trace.
+
+        Args:
+            name (str): Span name, e.g. ``gmail.messages.get`` or ``workflow.step2``.
+            kind (str): ``client`` for external calls, ``internal`` for local work.
+            **attributes: Extra attributes stored on the span.
+        """
+        parent = _current_span.get()
+        return self._span(name, kind, parent, parent is not None, attributes)
+
+    @contextlib.contextmanager
+    def _span(self, name, kind, parent, keep, attributes) -> Iterator[Span]:
+        span = Span(
+            name=name,
+            kind=kind,
+            trace_id=parent.trace_id if parent else secrets.token_hex(16),
+            span_id=secrets.token_hex(8),
+            parent_id=parent.span_id if parent else None,
+            start_time_ns=time.time_ns(),
+            attributes=dict(attributes),
+        )
+        token = _current_span.set(span)
+        start = time.perf_counter_ns()
+        try:
+            yield span
+        except Exception as error:
+            span.status = "error"
+            span.error = f"{type(error).__name__}: {error}"
+            raise
+        finally:
+            span.duration_ns = time.perf_counter_ns() - start
+            _current_span.reset(token)
+            if keep:
+                with self._lock:
+                    self.spans.append(span)
+
+    def trace_spans(self, trace_id: str) -> List[Span]:
+        with self._lock:
+            return [span for span in self.spans if span.trace_id == trace_id]
+
+    def discard(self, trace_id: str) -> None:
+        with self._lock:
+            self.spans = [span for span in self.spans if span.trace_id != trace_id]
+
+    def summarize(self, spans: List[Span]) -> List[Dict[str, Any]]:
+        """
+        Aggregate spans by name.
+
+        Returns:
+            List[Dict[str, Any]]: One row per span name, slowest total first.
+        """
+        rows: Dict[str, Dict[str, Any]] = {}
+        for span in spans:
+            row = rows.setdefault(
+                span.name,
+                {
+                    "name": span.name,
+                    "kind": span.kind,
+                    "count": 0,
+                    "total_ms": 0.0,
+                    "max_ms": 0.0,
+                    "request_bytes": 0,
+                    "response_bytes": 0,
+                    "retries": 0,
+                    "errors": 0,
+                },
+            )
+            row["count"] += 1
+            row["total_ms"] += span.duration_ms
+            row["max_ms"] = max(row["max_ms"], span.duration_ms)
+            row["request_bytes"] += span.request_bytes
+            row["response_bytes"] += span.response_bytes
+            row["retries"] += span.retries
+            row["errors"] += span.status == "error"
+        return sorted(rows.values(), key=lambda row: row["total_ms"], reverse=True)
+
+    def print_summary(self, spans: List[Span], console: Console = None) -> None:
+        """Print a table of time spent per step and per API call."""
+        console = console or Console()
+        table = Table(title="Where the time went")
+        for column in ["Span", "Calls", "Total ms", "Max ms", "Sent", "Received"]:
+            table.add_column(column, justify="left" if column == "Span" else "right")
+        table.add_column("Retries", justify="right")
+        table.add_column("Errors", justify="right")
+        for row in self.summarize(spans):
+            table.add_row(
+                row["name"],
+                str(row["count"]),
+                f"{row['total_ms']:.1f}",
+                f"{row['max_ms']:.1f}",
+                str(row["request_bytes"]),
+                str(row["response_bytes"]),
+                str(row["retries"]),
+                str(row["errors"]),
+                style="bold" if row["kind"] == "internal" else None,
+            )
+        console.print(table)
+
+    def export_jsonl(self, spans: List[Span], path: str) -> None:
+        """Append spans to ``path``, one JSON object per line."""
+        with open(path, "a") as export_file:
+            for span in spans:
+                export_file.write(json.dumps(asdict(span), default=str) + "\n")
+
+    def to_otlp(self, spans: List[Span]) -> Dict[str, Any]:
+        """Convert spans to the OTLP/JSON trace format (``ExportTraceServiceRequest``)."""
+        return {
+            "resourceSpans": [
+                {
+                    "resource": {
+                        "attributes": [
+                            _otlp_attribute("service.name", self.service_name)
+                        ]
+                    },
+                    "scopeSpans": [
+                        {
+                            "scope": {"name": "services.telemetry"},
+                            "spans": [_otlp_span(span) for span in spans],
+                        }
+                    ],
+                }
+            ]
+        }
+
+    def export_otlp(self, spans: List[Span], path: str) -> None:
+        """Append spans to ``path`` as one OTLP/JSON document per line."""
+        with open(path, "a") as export_file:
+            export_file.write(json.dumps(self.to_otlp(spans)) + "\n")
+
+    def export(self, spans: List[Span], path: str, fmt: str = "jsonl") -> None:
+        if fmt == "otlp":
+            self.export_otlp(spans, path)
+        elif fmt == "jsonl":
+            self.export_jsonl(spans, path)
+        else:
+            raise ValueError(f"Unknown trace export format: {fmt}")
+
+
+def _otlp_attribute(key: str, value: Any) -> Dict[str, Any]:
+    if isinstance(value, bool):
+        return {"key": key, "value": {"boolValue": value}}
+    if isinstance(value, int):
+        return {"key": key, "value": {"intValue": str(value)}}
+    if isinstance(value, float):
+        return {"key": key, "value": {"doubleValue": value}}
+    return {"key": key, "value": {"stringValue": str(value)}}
+
+
+def _otlp_span(span: Span) -> Dict[str, Any]:
+    attributes = dict(span.attributes)
+    attributes.update(
+        {
+            "payload.request_bytes": span.request_bytes,
+            "payload.response_bytes": span.response_bytes,
+            "retry.count": span.retries,
+        }
+    )
+    otlp = {
+        "traceId": span.trace_id,
+        "spanId": span.span_id,
+        "name": span.name,
+        "kind": SPAN_KINDS.get(span.kind, 1),
+        "startTimeUnixNano": str(span.start_time_ns),
+        "endTimeUnixNano": str(span.start_time_ns + span.duration_ns),
+        "attributes": [_otlp_attribute(k, v) for k, v in attributes.items()],
+        "status": {"code": 2, "message": span.error}
+        if span.status == "error"
+        else {"code": 1},
+    }
+    if span.parent_id:
+        otlp["parentSpanId"] = span.parent_id
+    return otlp
+
+
+def _is_retryable(error: HttpError) -> bool:
+    return getattr(error.resp, "status", None) in RETRY_STATUSES
+
+
+def traced_execute(
+    name: str,
+    request: Any,
+    body: Any = None,
+    max_retries: int = MAX_RETRIES,
+    **attributes,
+) -> Any:
+    """
+    Execute a googleapiclient request inside a span.
+
+    Rate-limited (429) and server (5xx) errors are retried up to
+    ``max_retries`` times with an exponential backoff; each retry is counted on
+    the span.
+
+    Args:
+        name (str): Span name, e.g. ``gmail.messages.list``.
+        request: The request object returned by the discovery client.
+        body (Any, optional): The request body, used for the sent payload size.
+        max_retries (int): Retries after the first attempt.
+        **attributes: Extra attributes stored on the span.
+
+    Returns:
+        Any: The API response.
+    """
+    with get_tracer().span(name, **attributes) as span:
+        span.set_request(body)
+        for attempt in range(max_retries + 1):
+            try:
+                response = request.execute()
+                break
+            except HttpError as error:
+                if attempt == max_retries or not _is_retryable(error):
+                    raise
+                span.record_retry()
+                time.sleep(RETRY_BACKOFF * 2**attempt)
+        span.set_response(response)
+    return response
+
+
+_tracer = Tracer()
+
+
+def get_tracer() -> Tracer:
+    """Return the process-wide tracer."""
+    return _tracer
+
+
+def export_settings() -> Dict[str, Optional[str]]:
+    """Read the trace export destination from the environment."""
+    return {
+        "path": os.environ.get("TRACE_EXPORT_PATH"),
+        "format": os.environ.get("TRACE_EXPORT_FORMAT", "jsonl"),
+    }
@@ -0,0 +1,102 @@
+"""
+Process-wide HTTP transport.
+
+Every Notion and iCal call goes through one ``httpx.HTTPTransport``, so the
+TLS connections to a host are opened once and kept alive across clients, with
+bounded pools and explicit timeouts. HTTP/2 is used when the optional ``h2``
+package is installed (``http2`` extra), unless ``HTTP2=0``.
+
+``notion_client.Client`` overwrites the base URL and headers of the
+``httpx.Client`` it is given, so each consumer gets its own lightweight client
+on top of the shared transport instead of sharing a client.
+"""
+
+import atexit
+import importlib.util
+import os
+import threading
+from typing import Dict, Optional
+
+import httpx
+from notion_client import Client
+
+# Seconds to connect, and to wait for each read, write or free pooled connection.
+CONNECT_TIMEOUT = 10.0
+READ_TIMEOUT = 30.0
+
+DEFAULT_TIMEOUT = httpx.Timeout(READ_TIMEOUT, connect=CONNECT_TIMEOUT)
+
+# Enough for the bounded write pools of the Notion client.
+DEFAULT_LIMITS = httpx.Limits(
+    max_connections=20, max_keepalive_connections=10, keepalive_expiry=60.0
+)
+
+_lock = threading.Lock()
+_transport: Optional[httpx.HTTPTransport] = None
+_http_client: Optional[httpx.Client] = None
+_notion_clients: Dict[str, Client] = {}
+
+
+def http2_enabled() -> bool:
+    """Whether HTTP/2 is negotiated: ``h2`` is installed and ``HTTP2`` is not 0."""
+    if os.environ.get("HTTP2", "1") == "0":
+        return False
+    return importlib.util.find_spec("h2") is not None
+
+
+def get_transport() -> httpx.HTTPTransport:
+    """Return the shared connection pool, created on first use."""
+    global _transport
+    with _lock:
+        if _transport is None:
+            # Connection errors (not HTTP errors) are retried once.
+            _transport = httpx.HTTPTransport(
+                http2=http2_enabled(), limits=DEFAULT_LIMITS, retries=1
+            )
+        return _transport
+
+
+def get_http_client() -> httpx.Client:
+    """Return the shared client for plain HTTP calls (e.g. the iCal feed)."""
+    global _http_client
+    transport = get_transport()
+    with _lock:
+        if _http_client is None:
+            _http_client = httpx.Client(
+                transport=transport, timeout=DEFAULT_TIMEOUT, follow_redirects=True
+            )
+        return _http_client
+
+
+def get_notion_client(token: str) -> Client:
+    """
+    Return the Notion client of ``token``, on the shared transport.
+
+    Clients are cached per token, so every ``NotionClient`` and script of the
+    process reuses the same pooled connections to the Notion API.
+    """
+    transport = get_transport()
+    with _lock:
+        client = _notion_clients.get(token)
+        if client is None:
+            client = Client(
+                auth=token,
+                client=httpx.Client(transport=transport),
+                timeout_ms=int(READ_TIMEOUT * 1000),
+            )
+            # ``Client`` sets one flat timeout, restore the separate connect one.
+            client.client.timeout = DEFAULT_TIMEOUT
+            _notion_clients[token] = client
+        return client
+
+
+@atexit.register
+def close_transport() -> None:
+    """Close the pooled connections; clients created afterwards start a new pool."""
+    global _transport, _http_client
+    with _lock:
+        if _transport is not None:
+            _transport.close()
+        _transport = None
+        _http_client = None
+        _notion_clients.clear()
@@ -106,9 +106,10 @@ def test_integration_with_calendar_service():
         mail_processor = MailProcessorService(debug=True)
 
         # Replace the real calendar service with our mock
-        real_calendar_service = mail_processor.calendar_service
+        services = mail_processor.listing_services(mail_processor.listings[0])
+        real_calendar_service = services.calendar_service
         mock_calendar_service = MockCalendarService()
-        mail_processor.calendar_service = mock_calendar_service
+        services.calendar_service = mock_calendar_service
 
         try:
             # Create a test reservation
@@ -124,9 +125,7 @@ def test_integration_with_calendar_service():
             # Call the mail processor workflow function that would normally create events
             # Instead, we manually trigger the code that creates an event with attendees
             attendees = mail_processor._get_calendar_notification_attendees()
-            mail_processor.calendar_service.create_event(
-                attendees=attendees, **reservation
-            )
+            services.calendar_service.create_event(attendees=attendees, **reservation)
 
             # Check if attendees were correctly passed to calendar service
             expected = ["calendar1@example.com", "calendar2@example.com"]
@@ -142,7 +141,7 @@ def test_integration_with_calendar_service():
 
         finally:
             # Restore the real calendar service
-            mail_processor.calendar_service = real_calendar_service
+            services.calendar_service = real_calendar_service
 
     finally:
         # Restore original environment variable
@@ -203,9 +202,10 @@ def test_conflict_event_with_attendees():
         mail_processor = MailProcessorService(debug=True)
 
         # Replace with mock service
-        real_calendar_service = mail_processor.calendar_service
+        services = mail_processor.listing_services(mail_processor.listings[0])
+        real_calendar_service = services.calendar_service
         mock_calendar_service = MockConflictCalendarService()
-        mail_processor.calendar_service = mock_calendar_service
+        services.calendar_service = mock_calendar_service
 
         try:
             # Create a test reservation
@@ -222,7 +222,7 @@ def test_conflict_event_with_attendees():
             attendees = mail_processor._get_calendar_notification_attendees()
 
             # Create the event with our mock service
-            event = mail_processor.calendar_service.create_event(
+            event = services.calendar_service.create_event(
                 attendees=attendees, **reservation
             )
 
@@ -261,7 +261,7 @@ def test_conflict_event_with_attendees():
 
         finally:
             # Restore real calendar service
-            mail_processor.calendar_service = real_calendar_service
+            services.calendar_service = real_calendar_service
     finally:
         # Restore original environment variable
         if original_value:
@@ -0,0 +1,34 @@
+import pytest
+
+from services.mail_processing.amounts import AmountParser, amount_parser
+
+
+@pytest.mark.parametrize(
+    "locale, raw_value, expected",
+    [
+        ("fr", "1 388,66", 1388.66),
+        ("fr", "163,33 €", 163.33),
+        ("fr", "-36,03", -36.03),
+        ("fr", "1.388,66", 1388.66),
+        ("en", "€ 1,388.66", 1388.66),
+        ("en", "-€ 36.03", -36.03),
+        ("en", "1,388", 1388.0),
+        ("en", "133.33", 133.33),
+        ("de", "1.234.567", 1234567.0),
+    ],
+)
+def test_parse_locale_amounts(locale, raw_value, expected):
+    assert amount_parser(locale).parse(raw_value) == pytest.approx(expected)
+
+
+def test_parse_many_reports_unparsable_values():
+    amounts, errors = amount_parser("en").parse_many(
+        {"cleaning_fee": "€ 65.00", "tourist_tax": "N/A", "host_payout": "1.2.3"}
+    )
+    assert amounts == {"cleaning_fee": 65.0, "tourist_tax": None, "host_payout": None}
+    assert errors == {"host_payout": "1.2.3"}
+
+
+def test_unknown_locale_is_rejected():
+    with pytest.raises(ValueError, match="No amount format"):
+        AmountParser("xx")
@@ -0,0 +1,46 @@
+import warnings
+
+from benchmarks.bench_patterns import bench_patterns, slow_patterns
+from benchmarks.corpus import build_adversarial_bodies, build_reservation_mails
+from benchmarks.fakes import fake_backends
+from services.mail_processing.mail_processor import MailProcessorService
+from services.mail_processing.parser import Parser
+
+
+def test_synthetic_mails_parse_without_missing_fields():
+    mails = build_reservation_mails(20, seed=1)
+    languages = set()
+    with warnings.catch_warnings():
+        warnings.simplefilter("error")
+        for mail in mails:
+            parser = Parser(mail)
+            languages.add(parser.language)
+            reservation = parser.parse_reservation()
+            assert reservation.host_payout > 0
+            assert reservation.number_of_nights >= 1
+    assert languages == {"fr", "en"}
+
+
+def test_synthetic_confirmation_codes_are_unique():
+    mails = build_reservation_mails(200)
+    codes = {Parser(mail).parse_reservation().confirmation_code for mail in mails}
+    assert len(codes) == 200
+
+
+def test_run_workflow_against_fake_backends():
+    mails = build_reservation_mails(5)
+    with fake_backends(mails) as backends:
+        MailProcessorService().run_workflow()
+    assert backends["notion"].calls["pages.create"] == 5
+    assert backends["calendar"].calls["events.insert"] == 5
+    assert all(
+        "UNREAD" not in message["labelIds"]
+        for message in backends["gmail"].store.values()
+    )
+
+
+def test_parser_patterns_stay_fast_on_adversarial_bodies():
+    bodies = build_adversarial_bodies(20_000)
+    _, worst_cases = bench_patterns(bodies)
+    assert {name for name, _, _ in worst_cases} >= {"en.tourist_tax", "fr.extract"}
+    assert slow_patterns(worst_cases, max_seconds=0.05) == []
@@ -0,0 +1,93 @@
+import pytest
+
+pd = pytest.importorskip("pandas")
+
+from services.dataviz.src.cubes import AggregateCubes, nights_per_month  # noqa: E402
+from services.dataviz.src.data_layer import (  # noqa: E402
+    average_payouts_by_nights,
+    reservations_frame,
+)
+
+ROWS = [
+    {
+        "page_id": "a",
+        "last_edited_time": "t1",
+        "Arrival Date": "2024-01-30",
+        "Number of Nights": 3,
+        "Total Nights Cost": 300.0,
+        "Host Payout": 280.0,
+        "Guest Payout": None,
+        "Tourist Tax": 6.0,
+        "Country": "France",
+    },
+    {
+        "page_id": "b",
+        "last_edited_time": "t1",
+        "Arrival Date": "2024-02-10",
+        "Departure Date": "2024-02-12",
+        "Total Nights Cost": 200.0,
+        "Host Payout": 190.0,
+        "Guest Payout": 250.0,
+        "Country": "Spain",
+    },
+]
+BLOCKED = [{"start_date": "2024-02-20", "end_date": "2024-02-23"}]
+
+
+def test_nights_are_split_across_months():
+    counts = nights_per_month(
+        pd.to_datetime(["2024-01-30", "2024-02-10"]).values, [3, 2]
+    )
+    assert counts.to_dict() == {(2024, 1): 2.0, (2024, 2): 3.0}
+
+
+def test_month_view_has_occupancy_and_adr():
+    cubes = AggregateCubes(reservations_frame(ROWS), BLOCKED)
+    february = cubes.view("month").loc[(2024, 2)]
+    assert february["booked_nights"] == 3
+    assert february["blocked_nights"] == 3
+    assert february["available_nights"] == 26
+    assert february["occupancy_rate"] == pytest.approx(3 / 26)
+    assert february["adr"] == pytest.approx(100.0)
+    year = cubes.view("year", year=2024).iloc[0]
+    assert year["bookings"] == 2
+    assert year["tourist_tax"] == 6.0
+
+
+def test_payouts_by_stay_length_match_the_row_level_grouping():
+    frame = reservations_frame(ROWS)
+    frame["Number of Nights"] = frame["Number of Nights"].fillna(2)
+    from_cube = AggregateCubes(frame).payouts_by_stay_length(year=2024)
+    from_rows = average_payouts_by_nights(frame)
+    merged = from_cube.merge(
+        from_rows, on=["Number of Nights", "Payout Type"], suffixes=("", "_rows")
+    )
+    assert len(merged) == 4
+    assert merged["Average Payout"].tolist() == pytest.approx(
+        merged["Average Payout_rows"].tolist()
+    )
+
+
+def test_apply_delta_matches_a_rebuild():
+    old = reservations_frame(ROWS)
+    edited = [
+        ROWS[0],
+        {**ROWS[1], "last_edited_time": "t2", "Host Payout": 100.0},
+        {
+            "page_id": "c",
+            "last_edited_time": "t2",
+            "Arrival Date": "2025-03-01",
+            "Number of Nights": 1,
+            "Total Nights Cost": 99.0,
+            "Country": "France",
+        },
+    ]
+    new = reservations_frame(edited)
+
+    cubes = AggregateCubes(old, BLOCKED)
+    assert cubes.apply_delta(old, new) == 2
+    rebuilt = AggregateCubes(new, BLOCKED)
+    for name in AggregateCubes.VIEWS:
+        pd.testing.assert_frame_equal(
+            cubes.view(name), rebuilt.view(name), check_like=True
+        )
@@ -0,0 +1,76 @@
+import signal
+
+import pytest
+
+from benchmarks.corpus import build_reservation_mails
+from benchmarks.fakes import fake_backends
+from services.mail_processing.daemon import AdaptiveInterval, MailDaemon
+
+
+def test_interval_backs_off_when_idle_and_resets_on_activity():
+    interval = AdaptiveInterval(min_interval=10, max_interval=60, backoff=2)
+    assert [interval.next(False) for _ in range(4)] == [20, 40, 60, 60]
+    assert interval.next(True) == 10
+    with pytest.raises(ValueError):
+        AdaptiveInterval(min_interval=60, max_interval=10)
+
+
+def test_daemon_runs_only_on_new_mail_with_warm_clients():
+    mails = build_reservation_mails(4)
+    with fake_backends(mails[:2]) as backends:
+        gmail = backends["gmail"]
+        daemon = MailDaemon(interval=AdaptiveInterval(0, 0))
+        poll_once = daemon.poll_once
+        polls = []
+
+        def poll_with_new_bookings():
+            polls.append(daemon.runs)
+            if len(polls) == 3:
+                # New bookings arrive while the daemon is running.
+                for index, mail in enumerate(mails[2:], start=2):
+                    gmail.store[f"msg{index:08d}"] = {
+                        "mail": mail,
+                        "labelIds": {"INBOX", "UNREAD"},
+                    }
+            return poll_once()
+
+        daemon.poll_once = poll_with_new_bookings
+        daemon.run(max_polls=4)
+        # Runs on the first poll and when the new mails show up, not when idle.
+        assert polls == [0, 1, 1, 2]
+        assert backends["notion"].calls["pages.create"] == 4
+        assert backends["calendar"].calls["events.insert"] == 4
+        # Clients, labels and the calendar event cache were loaded once.
+        assert gmail.calls["labels.list"] == 1
+        assert backends["calendar"].calls["calendarList.list"] == 1
+
+
+def test_failing_runs_back_off():
+    with fake_backends(build_reservation_mails(1)):
+        daemon = MailDaemon(interval=AdaptiveInterval(10, 60))
+
+        def fail():
+            raise RuntimeError("Notion is down")
+
+        daemon.processor.run_workflow = fail
+        waits = [daemon.interval.next(daemon.poll_once()) for _ in range(3)]
+        assert daemon.runs == 3
+        assert waits == [20, 40, 60]
+        daemon.processor.close()
+
+
+def test_sigterm_stops_the_daemon_after_the_current_run():
+    with fake_backends(build_reservation_mails(1)) as backends:
+        daemon = MailDaemon(interval=AdaptiveInterval(0, 0))
+        poll_once = daemon.poll_once
+
+        def poll_then_terminate():
+            active = poll_once()
+            signal.raise_signal(signal.SIGTERM)
+            return active
+
+        daemon.poll_once = poll_then_terminate
+        daemon.run(max_polls=10)
+        assert daemon.runs == 1
+        assert backends["notion"].calls["pages.create"] == 1
+    assert signal.getsignal(signal.SIGTERM) is signal.SIG_DFL
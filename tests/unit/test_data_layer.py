@@ -0,0 +1,64 @@
+import pytest
+
+pd = pytest.importorskip("pandas")
+
+from services.dataviz.src import data_layer  # noqa: E402
+
+ROWS = [
+    {
+        "Arrival Date": "2024-06-01",
+        "Insert Date": "2025-02-09T20:44:23",
+        "Number of Nights": 1,
+        "Host Payout": "216.9",
+        "Guest Payout": 297.24,
+        "Price by night": 210.0,
+        "Country": "France",
+    },
+    {
+        "Arrival Date": "2024-06-20",
+        "Insert Date": "2025-02-10T17:41:00.000+00:00",
+        "Number of Nights": 1,
+        "Host Payout": 100.0,
+        "Guest Payout": None,
+        "Price by night": "N/A",
+        "Country": "Spain",
+    },
+    {
+        "Arrival Date": "2023-05-23",
+        "Number of Nights": 3,
+        "Host Payout": 506.1,
+        "Guest Payout": 691.13,
+        "Price by night": 158.33,
+        "Country": "France",
+    },
+    {"Arrival Date": "not a date", "Number of Nights": None, "Host Payout": 1.0},
+]
+
+
+def test_reservations_frame_coerces_types_and_derives_keys():
+    frame = data_layer.reservations_frame(ROWS)
+    assert str(frame["Arrival Date"].dtype).startswith("datetime64")
+    assert frame["Host Payout"].dtype == "float64"
+    assert frame["Price by night"].isna().tolist() == [False, True, False, True]
+    assert frame["Insert Date"].notna().sum() == 2
+    assert frame["month_year"].tolist()[:3] == ["2024-06", "2024-06", "2023-05"]
+    assert frame["month"].iloc[0] == "June"
+    assert data_layer.available_years(frame) == [2023, 2024]
+
+
+def test_filter_year_and_average_payouts_do_not_mutate_rows():
+    rows = [dict(row) for row in ROWS]
+    frame = data_layer.reservations_frame(rows)
+    assert rows == ROWS
+
+    filtered = data_layer.filter_year(frame, 2024)
+    assert len(filtered) == 2
+    averages = data_layer.average_payouts_by_nights(filtered)
+    host = averages[averages["Payout Type"] == "Host Payout"]
+    guest = averages[averages["Payout Type"] == "Guest Payout"]
+    assert host["Average Payout"].tolist() == [pytest.approx(158.45)]
+    assert guest["Average Payout"].tolist() == [pytest.approx(297.24)]
+
+    prices = data_layer.values_by_month(filtered, "Price by night")
+    assert prices["month_year"].tolist() == ["2024-06"]
+    assert data_layer.missing_columns(frame, ["Rating", "Host Payout"]) == ["Rating"]
@@ -0,0 +1,54 @@
+import datetime
+
+import pytest
+
+from services.mail_processing.dates import month_number, resolve_stay, resolve_stays
+
+DECEMBER_MAIL = datetime.date(2024, 12, 10)
+
+
+@pytest.mark.parametrize(
+    "token, number",
+    [("janv.", 1), ("févr", 2), ("Sep", 9), ("März", 3), ("décembre", 12)],
+)
+def test_month_tokens_of_every_locale(token, number):
+    assert month_number(token) == number
+
+
+def test_ambiguous_abbreviation_is_unknown():
+    # "jui" starts both "juin" and "juillet".
+    assert month_number("jui") is None
+
+
+def test_booking_mailed_in_december_for_january_is_next_year():
+    assert resolve_stay(("3", "janv", None), ("6", "janv", None), DECEMBER_MAIL) == (
+        datetime.date(2025, 1, 3),
+        datetime.date(2025, 1, 6),
+    )
+
+
+def test_departure_after_new_year():
+    assert resolve_stay(("30", "Dec", None), ("2", "Jan", None), DECEMBER_MAIL) == (
+        datetime.date(2024, 12, 30),
+        datetime.date(2025, 1, 2),
+    )
+    # The arrival year is taken back from the departure when only it is known.
+    assert resolve_stay(("30", "Dec", None), ("2", "Jan", "2025")) == (
+        datetime.date(2024, 12, 30),
+        datetime.date(2025, 1, 2),
+    )
+
+
+def test_unresolvable_dates_are_none():
+    assert resolve_stay(("3", "foo", None), None, DECEMBER_MAIL) == (None, None)
+    assert resolve_stay(("3", "janv", None), ("6", "janv", None)) == (None, None)
+
+
+def test_batch_resolution_is_cached():
+    resolve_stay.cache_clear()
+    stay = (("4", "mai", "2025"), ("10", "mai", "2025"), None)
+    assert (
+        resolve_stays([stay] * 3)
+        == [(datetime.date(2025, 5, 4), datetime.date(2025, 5, 10))] * 3
+    )
+    assert resolve_stay.cache_info().hits == 2
@@ -1,8 +1,10 @@
 import datetime
+import json
 from unittest.mock import MagicMock, patch
 
 import pytest
 
+from benchmarks.fakes import FakeNotionClient
 from services.dataviz.src import get_blocked_days
 
 
@@ -16,17 +18,9 @@ DTEND;VALUE=DATE:20230903
 END:VEVENT
 END:VCALENDAR
 """
-    with patch("services.dataviz.src.get_blocked_days.requests.get") as mock_get, patch(
-        "services.dataviz.src.get_blocked_days.Calendar"
-    ) as mock_calendar:
-        mock_get.return_value.text = fake_ical
-        mock_get.return_value.raise_for_status = lambda: None
-
-        mock_event = MagicMock()
-        mock_event.name = "Airbnb (Not available)"
-        mock_event.begin.date.return_value = datetime.date(2023, 9, 1)
-        mock_event.end.date.return_value = datetime.date(2023, 9, 3)
-        mock_calendar.return_value.events = [mock_event]
+    with patch("services.dataviz.src.get_blocked_days.get_http_client") as mock_http:
+        mock_http.return_value.get.return_value.text = fake_ical
+        mock_http.return_value.get.return_value.raise_for_status = lambda: None
 
         result = get_blocked_days.fetch_blocked_days_from_airbnb_ical("http://fake-url")
         assert result == [
@@ -38,7 +32,41 @@ END:VCALENDAR
         ]
 
 
-@patch("services.dataviz.src.get_blocked_days.Client")
+def test_iter_blocked_periods_streams_blocked_events_only():
+    feed = [
+        "BEGIN:VCALENDAR\r\n",
+        "BEGIN:VEVENT\r\n",
+        "DTSTART;VALUE=DATE:20231230\r\n",
+        "DTEND;VALUE=DATE:20240102\r\n",
+        "SUMMARY:Airbnb (Not\r\n",
+        "  available)\r\n",
+        "END:VEVENT\r\n",
+        "BEGIN:VEVENT\r\n",
+        "DTSTART;VALUE=DATE:20240105\r\n",
+        "DTEND;VALUE=DATE:20240107\r\n",
+        "SUMMARY:Reserved\r\n",
+        "END:VEVENT\r\n",
+        "BEGIN:VEVENT\r\n",
+        "SUMMARY:Airbnb (Not available)\r\n",
+        "DTSTART:20240110T150000Z\r\n",
+        "END:VEVENT\r\n",
+        "END:VCALENDAR\r\n",
+    ]
+    assert list(get_blocked_days.iter_blocked_periods(feed)) == [
+        {
+            "start_date": datetime.date(2023, 12, 30),
+            "end_date": datetime.date(2024, 1, 2),
+            "Name": "Airbnb (Not available)",
+        },
+        {
+            "start_date": datetime.date(2024, 1, 10),
+            "end_date": datetime.date(2024, 1, 10),
+            "Name": "Airbnb (Not available)",
+        },
+    ]
+
+
+@patch("services.dataviz.src.get_blocked_days.get_notion_client")
 def test_fetch_blocked_days_from_notion_parses_pages(mock_client):
     mock_notion = MagicMock()
     mock_client.return_value = mock_notion
@@ -67,7 +95,7 @@ def test_fetch_blocked_days_from_notion_parses_pages(mock_client):
     ]
 
 
-@patch("services.dataviz.src.get_blocked_days.Client")
+@patch("services.dataviz.src.get_blocked_days.get_notion_client")
 @patch("services.dataviz.src.get_blocked_days.fetch_blocked_days_from_airbnb_ical")
 def test_push_blocked_days_to_notion_creates_new_pages(mock_fetch, mock_client):
     mock_notion = MagicMock()
@@ -86,5 +114,158 @@ def test_push_blocked_days_to_notion_creates_new_pages(mock_fetch, mock_client):
     assert mock_notion.pages.create.called
 
 
+def _ical_response(status_code=200, content=b"BEGIN:VCALENDAR", etag='"v1"'):
+    response = MagicMock()
+    response.status_code = status_code
+    response.content = content
+    response.text = content.decode()
+    response.headers = {"ETag": etag, "Last-Modified": "Fri, 01 Sep 2023 00:00:00 GMT"}
+    return response
+
+
+@patch("services.dataviz.src.get_blocked_days.iter_blocked_periods")
+@patch("services.dataviz.src.get_blocked_days.get_http_client")
+def test_fetch_airbnb_ical_is_conditional(mock_http, mock_parse):
+    mock_get = mock_http.return_value.get
+    mock_parse.return_value = iter([])
+    state = {"url": "http://fake-url"}
+
+    mock_get.return_value = _ical_response()
+    assert (
+        get_blocked_days.fetch_blocked_days_from_airbnb_ical("http://fake-url", state)
+        == []
+    )
+    assert state["etag"] == '"v1"'
+
+    # The validators are sent back, a 304 skips the parsing.
+    mock_get.return_value = _ical_response(status_code=304)
+    assert (
+        get_blocked_days.fetch_blocked_days_from_airbnb_ical("http://fake-url", state)
+        is None
+    )
+    assert mock_get.call_args.kwargs["headers"]["If-None-Match"] == '"v1"'
+    assert mock_parse.call_count == 1
+
+
+def _blocked_feed(dtstamp: str, end: str = "20230903") -> bytes:
+    return (
+        "BEGIN:VCALENDAR\r\nBEGIN:VEVENT\r\n"
+        f"DTSTAMP:{dtstamp}\r\nDTSTART;VALUE=DATE:20230901\r\n"
+        f"DTEND;VALUE=DATE:{end}\r\nSUMMARY:Airbnb (Not available)\r\n"
+        "END:VEVENT\r\nEND:VCALENDAR\r\n"
+    ).encode()
+
+
+@patch("services.dataviz.src.get_blocked_days.get_http_client")
+def test_fetch_airbnb_ical_ignores_a_regenerated_dtstamp(mock_http):
+    mock_get = mock_http.return_value.get
+    state = {"url": "http://fake-url"}
+
+    mock_get.return_value = _ical_response(content=_blocked_feed("20230901T100000Z"))
+    assert get_blocked_days.fetch_blocked_days_from_airbnb_ical(
+        "http://fake-url", state
+    )
+
+    # Servers ignoring the validators: same periods, new DTSTAMP.
+    mock_get.return_value = _ical_response(content=_blocked_feed("20230901T110000Z"))
+    assert (
+        get_blocked_days.fetch_blocked_days_from_airbnb_ical("http://fake-url", state)
+        is None
+    )
+
+    mock_get.return_value = _ical_response(
+        content=_blocked_feed("20230901T120000Z", end="20230904")
+    )
+    periods = get_blocked_days.fetch_blocked_days_from_airbnb_ical(
+        "http://fake-url", state
+    )
+    assert periods[0]["end_date"] == datetime.date(2023, 9, 4)
+
+
+@patch("services.dataviz.src.get_blocked_days.fetch_blocked_days_from_airbnb_ical")
+def test_push_blocked_days_synchronizes_notion(mock_fetch, tmp_path):
+    notion = FakeNotionClient()
+    get_blocked_days.BLOCKED_DATE_DB_ID = "fake_db_id"
+    state_path = str(tmp_path / "ical_state.json")
+    today = datetime.date.today()
+
+    def period(days_from_today, nights=2):
+        start = today + datetime.timedelta(days=days_from_today)
+        return {
+            "start_date": start,
+            "end_date": start + datetime.timedelta(days=nights),
+            "Name": "Airbnb (Not available)",
+        }
+
+    def key(row):
+        return (str(row["start_date"]), str(row["end_date"]))
+
+    def notion_periods():
+        pages = [page for page in notion.rows.values() if not page["archived"]]
+        return sorted(get_blocked_days.index_blocked_pages(pages))
+
+    with patch.object(get_blocked_days, "get_notion_client", lambda token: notion):
+        # More periods than one page of query results.
+        mock_fetch.return_value = [period(-30)] + [
+            period(3 * day) for day in range(150)
+        ]
+        get_blocked_days.push_blocked_days_to_notion("http://fake-url", state_path)
+        assert notion.calls["pages.create"] == 151
+
+        # The past period rolled out of the feed, an upcoming one was removed.
+        mock_fetch.return_value = [period(3 * day) for day in range(1, 150)] + [
+            period(1000)
+        ]
+        get_blocked_days.push_blocked_days_to_notion("http://fake-url", state_path)
+        assert notion.calls["pages.create"] == 152
+        assert notion.calls["pages.update"] == 1
+        assert len(notion_periods()) == 151
+        assert key(period(-30)) in notion_periods()
+        assert key(period(0)) not in notion_periods()
+
+        # Unchanged feed: nothing is queried nor pushed.
+        queries = notion.calls["databases.query"]
+        mock_fetch.return_value = None
+        get_blocked_days.push_blocked_days_to_notion("http://fake-url", state_path)
+        assert notion.calls["databases.query"] == queries
+
+
+@patch("services.dataviz.src.get_blocked_days.push_blocked_days_to_notion")
+def test_push_all_listings_isolates_failures(mock_push, tmp_path, monkeypatch):
+    config = tmp_path / "listings.json"
+    config.write_text(
+        json.dumps(
+            [
+                {"name": "a", "database_id": "db", "label": "a"},
+                {"name": "b", "database_id": "db", "ical_url": "u", "label": "b"},
+                {"name": "c", "database_id": "db", "blocked_database_id": "x"},
+                {
+                    "name": "d",
+                    "database_id": "db",
+                    "label": "d",
+                    "ical_url": "https://d",
+                    "blocked_database_id": "blocked_d",
+                },
+                {
+                    "name": "e",
+                    "database_id": "db",
+                    "label": "e",
+                    "ical_url": "https://e",
+                    "blocked_database_id": "blocked_e",
+                },
+            ]
+        )
+    )
+    monkeypatch.setenv("LISTINGS_CONFIG", str(config))
+    monkeypatch.setenv("ICAL_STATE_PATH", str(tmp_path / "state.json"))
+    mock_push.side_effect = [RuntimeError("feed down"), None]
+
+    assert get_blocked_days.push_all_listings() == ["d"]
+    assert [call.kwargs for call in mock_push.call_args_list] == [
+        {"state_path": str(tmp_path / "state-d.json"), "database_id": "blocked_d"},
+        {"state_path": str(tmp_path / "state-e.json"), "database_id": "blocked_e"},
+    ]
+
+
 if __name__ == "__main__":
     pytest.main(["-v", __file__])
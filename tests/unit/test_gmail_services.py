@@ -5,8 +5,12 @@ import googleapiclient.discovery
 import pytest
 from googleapiclient.errors import HttpError
 
+from benchmarks.corpus import build_reservation_mails
+from benchmarks.fakes import fake_backends
+
 # Import the module to test
 from services.google_integration import gmail_services
+from services.google_integration.gmail_search import SearchQuery
 
 
 # Dummy implementations to bypass real API calls
@@ -260,3 +264,72 @@ def test_mark_mails_as_read_for_label(gmail_service_instance, monkeypatch):
     monkeypatch.setattr(gmail_service_instance, "mark_as_read", dummy_mark_as_read)
     gmail_service_instance.mark_mails_as_read_for_label("reserved")
     assert called is True
+
+
+def test_search_query_build_and_env(monkeypatch):
+    query = SearchQuery(
+        senders=("airbnb.com",),
+        subject_keywords=("Reservation confirmed",),
+        after=date(2025, 1, 31),
+    )
+    assert query.build() == (
+        '{from:airbnb.com subject:"Reservation confirmed"} after:2025/01/31'
+    )
+    monkeypatch.setenv("GMAIL_SEARCH_KEYWORDS", "booking, réservation")
+    assert SearchQuery.from_env() is None
+    monkeypatch.setenv("GMAIL_SEARCH", "1")
+    assert SearchQuery.from_env().subject_keywords == ("booking", "réservation")
+    monkeypatch.setenv("GMAIL_SEARCH", "0")
+    assert SearchQuery.from_env() is None
+
+
+def test_booking_outside_the_search_keywords_is_kept_by_default(monkeypatch):
+    # Forwarded by the host, so only the subject could match the query.
+    mails = build_reservation_mails(1)
+    monkeypatch.setenv("GMAIL_SEARCH_KEYWORDS", "étoiles")
+    with fake_backends(mails) as backends:
+        gmail = backends["gmail"]
+        gmail_services.GmailService().process_unread_emails()
+        assert "Label_reserved" in gmail.store["msg00000000"]["labelIds"]
+        assert "Label_poubelle" not in gmail.store["msg00000000"]["labelIds"]
+
+
+def test_only_search_candidates_are_downloaded(monkeypatch):
+    noise = [
+        {
+            "Sender": f"news{index}@shop.example",
+            "Subject": "Your weekly deals",
+            "Date": "2024-01-01",
+            "Message_body": "Deals",
+        }
+        for index in range(5)
+    ]
+    mails = build_reservation_mails(2) + noise
+    monkeypatch.setenv("GMAIL_SEARCH", "1")
+    with fake_backends(mails) as backends:
+        gmail = backends["gmail"]
+        gmail_services.GmailService().process_unread_emails()
+        assert gmail.calls["messages.get"] == 2
+        assert gmail.calls["messages.batchModify"] == 1
+        for index in range(2, 7):
+            labels = gmail.store[f"msg{index:08d}"]["labelIds"]
+            assert "Label_poubelle" in labels and "UNREAD" not in labels
+        assert "Label_reserved" in gmail.store["msg00000000"]["labelIds"]
+
+
+def test_old_booking_outside_the_search_window_is_not_trashed(monkeypatch):
+    old_booking = {**build_reservation_mails(1)[0], "Date": "2020-01-01"}
+    noise = {
+        "Sender": "news@shop.example",
+        "Subject": "Your weekly deals",
+        "Date": "2020-01-01",
+        "Message_body": "Deals",
+    }
+    monkeypatch.setenv("GMAIL_SEARCH", "1")
+    monkeypatch.setenv("GMAIL_SEARCH_DAYS", "30")
+    with fake_backends([old_booking, noise]) as backends:
+        gmail = backends["gmail"]
+        gmail_services.GmailService().process_unread_emails()
+        assert gmail.calls.get("messages.get", 0) == 0
+        assert gmail.store["msg00000000"]["labelIds"] == {"INBOX", "UNREAD"}
+        assert "Label_poubelle" in gmail.store["msg00000001"]["labelIds"]
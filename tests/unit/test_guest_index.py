@@ -0,0 +1,87 @@
+from unittest.mock import MagicMock
+
+import pytest
+
+from services.listings.registry import Listing
+from services.mail_processing.mail_processor import (
+    ListingServices,
+    MailProcessorService,
+)
+from services.notion_client.guest_index import GuestIndex, GuestStay, normalize_name
+
+
+def stay(page_id, name, arrival, departure):
+    return GuestStay(page_id, name, arrival, departure)
+
+
+def test_normalize_name_folds_accents_case_and_punctuation():
+    assert normalize_name("  Zoë  O'Brien ") == "zoe o brien"
+    assert normalize_name("JOSÉ-Luis") == "jose luis"
+
+
+def test_lookup_requires_every_token():
+    index = GuestIndex(
+        [
+            stay("p1", "Jean-Pierre Martin", "2024-01-01", "2024-01-05"),
+            stay("p2", "Jean Dupont", "2024-02-01", "2024-02-03"),
+        ]
+    )
+    assert index.lookup("jean pierre") == "p1"
+    assert index.lookup("Dupont") == "p2"
+    assert index.lookup("Marie") is None
+
+
+def test_lookup_prefers_most_recent_stay_before_the_review():
+    index = GuestIndex(
+        [
+            stay("old", "Léa Durand", "2024-01-01", "2024-01-05"),
+            stay("recent", "Lea Martin", "2024-03-01", "2024-03-04"),
+            stay("future", "Léa Petit", "2024-06-01", "2024-06-07"),
+        ]
+    )
+    assert index.lookup("Lea", review_date="2024-03-10") == "recent"
+    assert index.lookup("Léa", review_date="2024-01-20") == "old"
+    assert index.lookup("Léa") == "future"
+
+
+def test_from_pages_reads_notion_properties():
+    page = {
+        "id": "p1",
+        "properties": {
+            "Name": {"type": "title", "title": [{"plain_text": "Élodie"}]},
+            "Arrival Date": {"type": "date", "date": {"start": "2024-05-01"}},
+            "Departure Date": {"type": "date", "date": None},
+        },
+    }
+    index = GuestIndex.from_pages([page, {"id": "p2", "properties": {}}])
+    assert index.size == 1
+    assert index.lookup("elodie", review_date="2024-05-02") == "p1"
+
+
+def test_process_review_mails_batches_rating_updates():
+    service = MailProcessorService.__new__(MailProcessorService)
+    service.gmail_service = MagicMock()
+    service.listings = [Listing(name="default", database_id="db")]
+    notion_client = MagicMock()
+    service._listing_services = {
+        "default": ListingServices(service.listings[0], notion_client, MagicMock())
+    }
+    service.gmail_service.list_unread_ids_by_label.return_value = ["m1", "m2"]
+    service.gmail_service.get_mail_content.side_effect = [
+        {"Subject": "TR : Léa left a 5-star review", "Date": "2024-03-10"},
+        {"Subject": "TR : Tom a laissé un commentaire 4 étoiles", "Date": "2024-03-11"},
+    ]
+    service.gmail_service.parse_reservation_header.side_effect = [
+        {"type": "review", "full_name": "Léa", "rating": "5"},
+        {"type": "review", "full_name": "Tom", "rating": "4"},
+    ]
+    notion_client.build_guest_index.return_value = GuestIndex(
+        [stay("p1", "Lea Martin", "2024-03-01", "2024-03-04")]
+    )
+
+    with pytest.warns(UserWarning, match="No page found with name containing: Tom"):
+        assert service.process_review_mails() == {}
+
+    notion_client.build_guest_index.assert_called_once()
+    notion_client.update_ratings.assert_called_once_with({"p1": 5})
+    assert service.gmail_service.mark_as_read.call_count == 2
@@ -0,0 +1,34 @@
+import pytest
+
+from services.transport import http_client
+
+
+@pytest.fixture(autouse=True)
+def fresh_transport():
+    http_client.close_transport()
+    yield
+    http_client.close_transport()
+
+
+def test_notion_clients_share_the_transport():
+    client = http_client.get_notion_client("token-a")
+    assert http_client.get_notion_client("token-a") is client
+    other = http_client.get_notion_client("token-b")
+    assert other is not client
+    transport = http_client.get_transport()
+    assert client.client._transport is transport
+    assert other.client._transport is transport
+    assert http_client.get_http_client()._transport is transport
+    assert client.client.timeout == http_client.DEFAULT_TIMEOUT
+
+
+def test_plain_client_does_not_leak_notion_headers():
+    http_client.get_notion_client("secret")
+    headers = http_client.get_http_client().headers
+    assert "authorization" not in headers
+    assert "notion-version" not in headers
+
+
+def test_http2_can_be_disabled(monkeypatch):
+    monkeypatch.setenv("HTTP2", "0")
+    assert not http_client.http2_enabled()
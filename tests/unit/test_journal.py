@@ -0,0 +1,75 @@
+import pytest
+
+from benchmarks.corpus import build_reservation_mails
+from benchmarks.fakes import fake_backends
+from services.mail_processing.journal import RunJournal
+from services.mail_processing.mail_processor import MailProcessorService
+
+
+def test_journal_is_reloaded_after_a_crash(tmp_path):
+    path = tmp_path / "journal.jsonl"
+    journal = RunJournal(str(path))
+    journal.record("fetched", "m1", {"subject": "Réservation confirmée"})
+    journal.record("notion", "m1")
+
+    resumed = RunJournal(str(path))
+    assert resumed.resumed
+    assert resumed.payload("fetched", "m1") == {"subject": "Réservation confirmée"}
+    assert resumed.done("notion", "m1")
+    assert not resumed.done("calendar", "m1")
+    assert resumed.pending("calendar", ["m1", "m2"]) == ["m1", "m2"]
+
+
+def test_truncated_last_line_is_ignored(tmp_path):
+    path = tmp_path / "journal.jsonl"
+    RunJournal(str(path)).record("parsed", "m1", {"name": "Alice"})
+    with open(path, "a") as journal_file:
+        journal_file.write('{"stage": "notion", "mess')
+
+    with pytest.warns(UserWarning, match="unreadable journal line 2"):
+        journal = RunJournal(str(path))
+    assert journal.message_ids() == {"m1"}
+    assert journal.message_ids("notion") == set()
+
+
+def test_complete_removes_the_file(tmp_path):
+    path = tmp_path / "journal.jsonl"
+    journal = RunJournal(str(path))
+    journal.record("read", "m1")
+    journal.complete()
+    assert not path.exists()
+    assert journal.message_ids() == set()
+    with pytest.raises(ValueError):
+        journal.record("unknown", "m1")
+
+
+def test_interrupted_run_resumes_without_duplicates(monkeypatch):
+    mails = build_reservation_mails(3)
+    with fake_backends(mails) as backends:
+        service = MailProcessorService()
+        calendar_service = service.listing_services(
+            service.listings[0]
+        ).calendar_service
+        original_create_event = calendar_service.create_event
+        calls = {"count": 0}
+
+        def flaky_create_event(**reservation):
+            calls["count"] += 1
+            if calls["count"] == 2:
+                raise RuntimeError("network down")
+            return original_create_event(**reservation)
+
+        monkeypatch.setattr(calendar_service, "create_event", flaky_create_event)
+        with pytest.raises(RuntimeError):
+            service.run_workflow()
+        assert backends["notion"].calls["pages.create"] == 3
+
+        monkeypatch.undo()
+        MailProcessorService().run_workflow()
+
+    assert backends["notion"].calls["pages.create"] == 3
+    assert backends["calendar"].calls["events.insert"] == 3
+    assert all(
+        "UNREAD" not in message["labelIds"]
+        for message in backends["gmail"].store.values()
+    )
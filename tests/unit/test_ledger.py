@@ -0,0 +1,66 @@
+from benchmarks.corpus import build_reservation_mails
+from benchmarks.fakes import fake_backends
+from services.mail_processing.ledger import BloomFilter, MessageLedger
+from services.mail_processing.mail_processor import MailProcessorService
+
+
+def test_bloom_filter_has_no_false_negatives():
+    bloom = BloomFilter(capacity=1000)
+    keys = [f"msg{index:08d}" for index in range(1000)]
+    for key in keys:
+        bloom.add(key)
+    assert all(key in bloom for key in keys)
+    false_positives = sum(f"other{index}" in bloom for index in range(10_000))
+    assert false_positives < 300
+
+
+def test_message_is_completed_once_written_to_every_sink(tmp_path):
+    path = str(tmp_path / "ledger.sqlite3")
+    ledger = MessageLedger(path)
+    ledger.record_parse("m1", "HM1", "parsed")
+    ledger.record_sink("m1", "notion")
+    assert not ledger.is_completed("m1")
+    ledger.record_sink("m1", "calendar")
+    assert ledger.is_completed("m1")
+    ledger.close()
+
+    reopened = MessageLedger(path)
+    assert reopened.is_completed("m1")
+    assert reopened.code_completed("HM1")
+    assert not reopened.is_completed("m2")
+    assert reopened.status("m1")["parse_status"] == "parsed"
+
+
+def test_completed_mails_are_not_downloaded_again():
+    mails = build_reservation_mails(3)
+    with fake_backends(mails) as backends:
+        # Debug runs save the reservations but leave the mails unread.
+        MailProcessorService(debug=True).run_workflow()
+        downloads = backends["gmail"].calls["messages.get"]
+
+        MailProcessorService().run_workflow()
+        assert backends["gmail"].calls["messages.get"] == downloads
+        assert backends["notion"].calls["pages.create"] == 3
+        assert backends["calendar"].calls["events.insert"] == 3
+        assert all(
+            "UNREAD" not in message["labelIds"]
+            for message in backends["gmail"].store.values()
+        )
+
+
+def test_booking_forwarded_again_is_not_saved_twice():
+    mails = build_reservation_mails(2)
+    with fake_backends(mails) as backends:
+        MailProcessorService().run_workflow()
+        gmail, notion = backends["gmail"], backends["notion"]
+        queries = notion.calls["databases.query"]
+        gmail.store["msg00000002"] = {
+            "mail": dict(mails[0]),
+            "labelIds": {"INBOX", "UNREAD"},
+        }
+        MailProcessorService().run_workflow()
+        # Skipped before the Notion lookup of its confirmation code.
+        assert notion.calls["databases.query"] == queries
+        assert notion.calls["pages.create"] == 2
+        assert backends["calendar"].calls["events.insert"] == 2
+        assert "UNREAD" not in gmail.store["msg00000002"]["labelIds"]
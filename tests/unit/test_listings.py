@@ -0,0 +1,110 @@
+import json
+
+import pytest
+
+from benchmarks.corpus import build_reservation_mails
+from benchmarks.fakes import fake_backends
+from services.listings.registry import (
+    Listing,
+    default_listing,
+    load_listings,
+    route_messages,
+    unrouted,
+)
+from services.mail_processing.mail_processor import MailProcessorService
+
+
+def write_config(tmp_path, entries):
+    path = tmp_path / "listings.json"
+    path.write_text(json.dumps(entries))
+    return str(path)
+
+
+def test_default_listing_comes_from_the_environment(monkeypatch):
+    monkeypatch.delenv("LISTINGS_CONFIG", raising=False)
+    monkeypatch.delenv("DATE_DATABASE_ID", raising=False)
+    monkeypatch.setenv("DATABASE_ID", "db")
+    monkeypatch.setenv("CALENDAR_URL", "https://example.com/cal.ics")
+    monkeypatch.setenv("BLOCKED_DATE_DB_ID", "blocked")
+    assert load_listings() == [default_listing()]
+    assert default_listing() == Listing(
+        name="default",
+        database_id="db",
+        ical_url="https://example.com/cal.ics",
+        blocked_database_id="blocked",
+    )
+
+
+@pytest.mark.parametrize(
+    "entries, message",
+    [
+        ([], "empty"),
+        ([{"name": "a", "database_id": "db", "colour": "red"}], "Unknown"),
+        ([{"name": "a"}], "without name or database_id"),
+        (
+            [
+                {"name": "a", "database_id": "db1", "label": "x"},
+                {"name": "b", "database_id": "db2", "label": "x"},
+            ],
+            "Duplicate listing label: x",
+        ),
+        (
+            [{"name": "a", "database_id": "db1"}, {"name": "b", "database_id": "db2"}],
+            "without a label",
+        ),
+    ],
+)
+def test_invalid_registries_are_rejected(tmp_path, entries, message):
+    with pytest.raises(ValueError, match=message):
+        load_listings(write_config(tmp_path, entries))
+
+
+def test_route_messages_by_label_with_a_fallback_listing():
+    listings = [
+        Listing(name="curial", database_id="db1"),
+        Listing(name="loft", database_id="db2", label="loft"),
+        Listing(name="studio", database_id="db3", label="studio"),
+    ]
+    labelled = {"loft": ["m2", "m4"], "studio": ["m3", "m4"]}
+    routes = route_messages(listings, ["m1", "m2", "m3", "m4"], labelled)
+    assert routes == {"curial": ["m1"], "loft": ["m2"], "studio": ["m3"]}
+    assert unrouted(["m1", "m2", "m3", "m4"], routes) == ["m4"]
+
+
+def test_listings_are_saved_independently(tmp_path, monkeypatch):
+    monkeypatch.setenv(
+        "LISTINGS_CONFIG",
+        write_config(
+            tmp_path,
+            [
+                {"name": "curial", "database_id": "db_curial"},
+                {
+                    "name": "loft",
+                    "database_id": "db_loft",
+                    "label": "loft",
+                    "calendar": "Missing calendar",
+                },
+            ],
+        ),
+    )
+    with fake_backends(build_reservation_mails(4)) as backends:
+        gmail = backends["gmail"]
+        gmail.label_list.append({"id": "Label_loft", "name": "loft"})
+        loft_ids = sorted(gmail.store)[:2]
+        for msg_id in loft_ids:
+            gmail.store[msg_id]["labelIds"].add("Label_loft")
+
+        with pytest.raises(RuntimeError, match="listing\\(s\\): loft"):
+            MailProcessorService().run_workflow()
+
+    databases = [
+        page["parent"]["database_id"] for page in backends["notion"].rows.values()
+    ]
+    assert databases == ["db_curial", "db_curial"]
+    assert backends["calendar"].calls["events.insert"] == 2
+    unread = {
+        msg_id
+        for msg_id, message in gmail.store.items()
+        if "UNREAD" in message["labelIds"]
+    }
+    assert unread == set(loft_ids)
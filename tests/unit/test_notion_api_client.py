@@ -9,7 +9,9 @@ from services.notion_client.notion_api_client import NotionClient
 def mock_client(monkeypatch):  # added monkeypatch parameter
     monkeypatch.setenv("NOTION_API", "dummy")
     monkeypatch.setenv("DATABASE_ID", "dummy")
-    with patch("services.notion_client.notion_api_client.Client") as mock_cls:
+    with patch(
+        "services.notion_client.notion_api_client.get_notion_client"
+    ) as mock_cls:
         yield mock_cls
 
 
@@ -37,3 +39,53 @@ def test_row_exists_by_reservation_id_false(mock_client):
     instance = NotionClient()
     instance.client.databases.query.return_value = {"results": []}
     assert not instance.row_exists_by_reservation_id("TEST123")
+
+
+def test_get_all_pages_follows_pagination(mock_client):
+    instance = NotionClient()
+    instance.client.databases.query.side_effect = [
+        {"results": [{"id": "p1"}], "has_more": True, "next_cursor": "c1"},
+        {"results": [{"id": "p2"}], "has_more": False, "next_cursor": None},
+    ]
+    assert [page["id"] for page in instance.get_all_pages()] == ["p1", "p2"]
+    second_call = instance.client.databases.query.call_args_list[1]
+    assert second_call.kwargs["start_cursor"] == "c1"
+
+
+def test_upsert_reservations_creates_patches_and_skips(monkeypatch):
+    from benchmarks.fakes import FakeNotionClient
+
+    monkeypatch.setenv("NOTION_API", "dummy")
+    monkeypatch.setenv("DATABASE_ID", "db")
+    fake = FakeNotionClient()
+    monkeypatch.setattr(
+        "services.notion_client.notion_api_client.get_notion_client",
+        lambda token: fake,
+    )
+    instance = NotionClient()
+    reservations = [
+        {"confirmation_code": "HM1", "name": "Alice", "host_payout": 100.0},
+        {"confirmation_code": "HM2", "name": "Bob", "host_payout": 200.0},
+    ]
+    assert instance.upsert_reservations(
+        [instance.build_properties(**reservation) for reservation in reservations]
+    ) == {
+        "created": 2,
+        "updated": 0,
+        "unchanged": 0,
+        "skipped": 0,
+    }
+
+    reservations[1] = {**reservations[1], "host_payout": 250.0, "message_id": "m2"}
+    with pytest.warns(UserWarning, match="Invalid reservation ID"):
+        counts = instance.upsert_reservations(
+            [
+                instance.build_properties(**reservation)
+                for reservation in reservations + [{"name": "No code"}]
+            ]
+        )
+    assert counts == {"created": 0, "updated": 1, "unchanged": 1, "skipped": 1}
+    assert fake.calls["pages.create"] == 2
+    assert fake.calls["pages.update"] == 1
+    page = instance.get_pages_by_reservation_codes(["HM2"])["HM2"]
+    assert instance.parse_page(page)["Host Payout"] == 250.0
@@ -0,0 +1,44 @@
+import datetime
+
+import pytest
+
+from services.notion_client.schema import RESERVATION_SCHEMA, ReservationSchema
+
+
+def test_serialize_builds_notion_properties():
+    properties = RESERVATION_SCHEMA.serialize(
+        {
+            "name": "Alice",
+            "arrival_date": datetime.date(2025, 5, 4),
+            "host_payout": 120.5,
+            "country": "France",
+            "tourist_tax": None,
+            "message_id": "m1",
+        }
+    )
+    assert properties == {
+        "Name": {"title": [{"text": {"content": "Alice"}}]},
+        "Arrival Date": {"date": {"start": "2025-05-04"}},
+        "Host Payout": {"number": 120.5},
+        "Country": {"select": {"name": "France"}},
+    }
+
+
+def test_serialize_reports_invalid_and_unmapped_fields():
+    with pytest.warns(UserWarning) as record:
+        properties = RESERVATION_SCHEMA.serialize(
+            {"host_payout": "N/A", "number_of_adults": True, "nickname": "Al"}
+        )
+    assert properties == {}
+    messages = [str(warning.message) for warning in record]
+    assert any("Invalid value for 'host_payout'" in m for m in messages)
+    assert any("Invalid value for 'number_of_adults'" in m for m in messages)
+    assert any("'nickname' has no Notion property" in m for m in messages)
+    assert RESERVATION_SCHEMA.unmapped_fields(
+        {"nickname": "Al", "message_id": "m"}
+    ) == ["nickname"]
+
+
+def test_unknown_property_type_is_rejected():
+    with pytest.raises(ValueError):
+        ReservationSchema({"name": ("Name", "people")})
@@ -0,0 +1,67 @@
+import datetime
+
+import pytest
+
+pd = pytest.importorskip("pandas")
+
+from services.dataviz.src.data_layer import reservations_frame  # noqa: E402
+from services.dataviz.src.occupancy import (  # noqa: E402
+    OccupancyCalendar,
+    expand_nights,
+)
+
+
+def calendar():
+    # Stays: 1-3, 4-6 (orphan night on the 3rd), 10-12; blocked 12-14.
+    return OccupancyCalendar.from_intervals(
+        booked=(
+            ["2024-01-01", "2024-01-04", "2024-01-10"],
+            ["2024-01-03", "2024-01-06", "2024-01-12"],
+        ),
+        blocked=(["2024-01-12"], ["2024-01-14"]),
+    )
+
+
+def test_expand_nights_lists_every_night():
+    nights = expand_nights(["2024-01-30", None, "2024-03-01"], [3, 2, 0])
+    assert [str(day) for day in nights] == ["2024-01-30", "2024-01-31", "2024-02-01"]
+
+
+def test_counts_and_occupancy_rate():
+    occupancy = calendar()
+    assert occupancy.counts() == {"booked": 6, "blocked": 2, "free": 5}
+    assert occupancy.occupancy_rate() == pytest.approx(6 / 11)
+    assert occupancy.counts("2024-01-03", "2024-01-05") == {
+        "booked": 1,
+        "blocked": 0,
+        "free": 1,
+    }
+    assert occupancy.is_free("2024-01-06", "2024-01-10")
+    assert not occupancy.is_free("2024-01-05", "2024-01-07")
+
+
+def test_gaps_and_orphan_nights():
+    occupancy = calendar()
+    gaps = occupancy.gaps()
+    assert [(gap.start, gap.nights) for gap in gaps] == [
+        (datetime.date(2024, 1, 3), 1),
+        (datetime.date(2024, 1, 6), 4),
+    ]
+    assert [gap.start for gap in occupancy.orphan_nights(min_stay=2)] == [
+        datetime.date(2024, 1, 3)
+    ]
+
+
+def test_booked_nights_override_blocked_ones_and_monthly_rollup():
+    frame = reservations_frame(
+        [
+            {"Arrival Date": "2024-01-30", "Number of Nights": 3},
+            {"Arrival Date": "2024-02-05", "Departure Date": "2024-02-07"},
+        ]
+    )
+    occupancy = OccupancyCalendar.from_frames(
+        frame, [{"start_date": "2024-02-01", "end_date": "2024-02-03"}]
+    )
+    monthly = occupancy.monthly()
+    assert monthly["booked"].tolist() == [2, 3]
+    assert monthly["blocked"].tolist() == [0, 1]
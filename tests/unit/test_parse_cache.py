@@ -0,0 +1,58 @@
+import re
+
+from benchmarks.corpus import build_reservation_mails
+from benchmarks.fakes import fake_backends
+from services.mail_processing import parse_cache
+from services.mail_processing.mail_processor import MailProcessorService
+from services.mail_processing.parse_cache import ParseCache, pattern_fingerprint
+from services.mail_processing.parser import Parser
+
+
+def test_cached_reservation_is_returned_until_patterns_change(monkeypatch):
+    cache = ParseCache(":memory:")
+    assert cache.get("m1") is None
+    cache.put("m1", "en", {"confirmation_code": "HM1"})
+    assert cache.get("m1") == {"confirmation_code": "HM1"}
+
+    patterns = Parser.get_language_patterns("en")
+    patterns["confirmation_code"] = re.compile(r"code: (\w+)")
+    monkeypatch.setattr(Parser, "get_language_patterns", lambda language: patterns)
+    pattern_fingerprint.cache_clear()
+    try:
+        assert cache.get("m1") is None
+    finally:
+        monkeypatch.undo()
+        pattern_fingerprint.cache_clear()
+    assert cache.stats == {"hits": 1, "misses": 1, "stale": 1}
+    assert "1 hit(s)" in cache.summary()
+
+
+def test_parser_version_invalidates_every_entry(monkeypatch):
+    cache = ParseCache(":memory:")
+    cache.put("m1", "fr", {"confirmation_code": "HM1"})
+    monkeypatch.setattr(parse_cache, "PARSER_VERSION", parse_cache.PARSER_VERSION + 1)
+    pattern_fingerprint.cache_clear()
+    try:
+        assert cache.get("m1") is None
+    finally:
+        monkeypatch.undo()
+        pattern_fingerprint.cache_clear()
+
+
+def test_cached_mails_are_neither_downloaded_nor_parsed(monkeypatch):
+    mails = build_reservation_mails(3)
+    with fake_backends(mails) as backends:
+        for message in backends["gmail"].store.values():
+            message["labelIds"].add("Label_reserved")
+        first = MailProcessorService().parse_reserved_mails()
+        downloads = backends["gmail"].calls["messages.get"]
+
+        def fail(*args, **kwargs):
+            raise AssertionError("cached mail parsed again")
+
+        monkeypatch.setattr(Parser, "parse_reservation", fail)
+        service = MailProcessorService()
+        second = service.parse_reserved_mails()
+        assert backends["gmail"].calls["messages.get"] == downloads
+        assert second == first
+        assert service.parse_cache.stats["hits"] == 3
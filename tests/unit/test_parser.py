@@ -1,6 +1,10 @@
+import datetime
+import time
+
 import pytest
 
 from services.mail_processing.parser import Parser
+from services.mail_processing.reservation import ParsedReservation
 
 # Sample email data taken from your main code:
 FRENCH_SAMPLE = {
@@ -57,39 +61,59 @@ def test_detect_language_english():
     assert parser.detect_language() == "en"
 
 
-def test_parse_data_french():
+def test_parse_reservation_french():
     parser = Parser(FRENCH_SAMPLE)
     with pytest.warns(UserWarning) as record:
-        data = parser.parse_data()  # removed print_data argument
+        reservation = parser.parse_reservation()
     # Assert expected warning is raised about guest_location
     assert any("guest_location not found" in str(w.message) for w in record)
-    # Check that language-specific fields are parsed.
-    assert data.get("confirmation_code") == "HMFANA2QCA"
-    # Since the French sample does not include the full expected block for arrival/departure,
-    # we check that the fields are present even if with default values.
-    for key in ["arrival_day_of_week", "arrival_day", "arrival_month", "arrival_year"]:
-        assert key in data
-    # Check extra fields from __init__
-    assert data.get("mail_date") == "2025-02-02"
+    assert reservation.confirmation_code == "HMFANA2QCA"
+    assert reservation.arrival_date == datetime.date(2025, 5, 4)
+    assert reservation.arrival_day_of_week == "dim"
+    assert reservation.mail_date == datetime.date(2025, 2, 2)
     # Person name should have been extracted from subject (e.g. "Kurt Pihl")
-    assert "Kurt Pihl" in data.get("name", "")
+    assert reservation.name == "Kurt Pihl"
+    # Missing fields are None, not 0.0.
+    assert reservation.host_payout is None
 
 
-def test_parse_data_english():
+def test_parse_reservation_english():
     parser = Parser(ENGLISH_SAMPLE)
     with pytest.warns(UserWarning) as record:
-        data = parser.parse_data()  # removed print_data argument
+        reservation = parser.parse_reservation()
     # Assert expected warnings are raised about tourist_tax and guest_payout
     assert any("tourist_tax not found" in str(w.message) for w in record)
     assert any("guest_payout not found" in str(w.message) for w in record)
-    assert data.get("confirmation_code") == "HM5A8PDQY9"
-    # Check that English language was detected and some expected fields exist.
-    for key in ["arrival_day_of_week", "arrival_day", "arrival_month", "arrival_year"]:
-        assert key in data
-    # Check extra fields from __init__
-    assert data.get("mail_date") == "2024-09-12"
+    assert reservation.confirmation_code == "HM5A8PDQY9"
+    assert reservation.arrival_date == datetime.date(2024, 10, 2)
+    assert reservation.mail_date == datetime.date(2024, 9, 12)
     # Person name should be extracted from subject (e.g. "Orwis Huang")
-    assert "Orwis Huang" in data.get("name", "")
+    assert reservation.name == "Orwis Huang"
+    assert reservation.tourist_tax is None and reservation.guest_payout is None
+
+
+@pytest.mark.parametrize(
+    "location, city, country",
+    [
+        ("Paris, France", "Paris", "France"),
+        ("Paris, République dominicaine", "Paris", "République dominicaine"),
+        ("Sarajevo, Bosnia and Herzegovina", "Sarajevo", "Bosnia and Herzegovina"),
+    ],
+)
+def test_guest_location_accepts_long_country_names(location, city, country):
+    pattern = Parser.get_language_patterns("en")["guest_location"]
+    match = pattern.search(
+        f"[https://a0.muscache.com/x-bec06f.jpg] {location}\r\n\r\nNext"
+    )
+    assert match["city"] == city
+    assert match["country"] == country
+
+
+def test_guest_location_country_stops_at_the_line_break():
+    with pytest.warns(UserWarning):
+        reservation = Parser(ENGLISH_SAMPLE).parse_reservation()
+    assert reservation.city == "Shanghai"
+    assert reservation.country == "China"
 
 
 def test_raw_string_input_language_unknown():
@@ -99,4 +123,127 @@ def test_raw_string_input_language_unknown():
     # As no keywords are found, language should be 'unknown'
     assert parser.detect_language() == "unknown"
     with pytest.raises(ValueError, match="Language not detected or unsupported."):
-        parser.parse_data()
+        parser.parse_reservation()
+
+
+GERMAN_SAMPLE = {
+    "Subject": "WG: Buchung bestätigt: Kurt Pihl reist am 4. Mai an",
+    "Date": "2025-02-02",
+    "Message_body": "Neue Buchung bestätigt!\r\n\r\nAnreise\r\n\r\nSo., 4. Mai\r\n\r\n"
+    "Abreise\r\n\r\nDi., 6. Mai\r\n\r\nGäste\r\n\r\n2 Erwachsene",
+}
+
+SPANISH_SAMPLE = {
+    "Subject": "RV: Reserva confirmada: Kurt Pihl llega el 4 de mayo",
+    "Date": "2025-02-02",
+    "Message_body": "Llegada\r\n\r\ndom, 4 may\r\n\r\nSalida\r\n\r\nmar, 6 may\r\n\r\n"
+    "Huéspedes\r\n\r\n2 adultos",
+}
+
+
+@pytest.mark.parametrize(
+    "mail, language",
+    [(GERMAN_SAMPLE, "de"), (SPANISH_SAMPLE, "es")],
+)
+def test_detect_language_other_locales(mail, language):
+    parser = Parser(mail)
+    assert parser.language == language
+    assert not parser.is_supported
+
+
+def test_detect_language_reads_only_the_header_region():
+    body = "Hello\r\n" + "x" * 5000 + "\r\nBuchung bestätigt, Anreise, Abreise"
+    assert (
+        Parser({"Subject": "Reservation confirmed", "Message_body": body}).language
+        == "en"
+    )
+
+
+def test_unsupported_locale_is_skipped_with_a_warning():
+    from benchmarks.corpus import build_reservation_mails
+    from benchmarks.fakes import fake_backends
+    from services.mail_processing.mail_processor import MailProcessorService
+
+    german_mail = {"Sender": "Host <host@example.com>", **GERMAN_SAMPLE}
+    mails = build_reservation_mails(2) + [german_mail]
+    with fake_backends(mails) as backends:
+        for message in backends["gmail"].store.values():
+            message["labelIds"].add("Label_reserved")
+        service = MailProcessorService()
+        with pytest.warns(UserWarning, match="language 'de' is not supported"):
+            parsed = service.parse_reserved_mails()
+    assert len(parsed) == 2
+    assert backends["gmail"].store["msg00000002"]["labelIds"] >= {"UNREAD"}
+
+
+def test_parse_reservation_is_typed():
+    with pytest.warns(UserWarning):
+        reservation = Parser(ENGLISH_SAMPLE).parse_reservation()
+    assert reservation.confirmation_code == "HM5A8PDQY9"
+    assert reservation.arrival_date == datetime.date(2024, 10, 2)
+    assert reservation.departure_date == datetime.date(2024, 10, 5)
+    assert reservation.number_of_adults == 2
+    assert reservation.cleaning_fee == 65.0
+    # Missing fields are None, not "N/A" or 0.0, and are not sent to Notion.
+    assert reservation.tourist_tax is None
+    assert "tourist_tax" in reservation.missing_fields()
+    assert "Tourist Tax" not in reservation.to_notion()
+    assert reservation.to_calendar()["arrival_date"] == "2024-10-02"
+
+
+def test_parsed_reservation_json_round_trip():
+    with pytest.warns(UserWarning):
+        reservation = Parser(FRENCH_SAMPLE).parse_reservation()
+    reservation.message_id = "m1"
+    payload = reservation.to_json()
+    assert payload["arrival_date"] == "2025-05-04"
+    assert "host_payout" not in payload
+    assert ParsedReservation.from_json(payload) == reservation
+
+
+def test_quality_check_rejects_a_reservation_without_host_payout():
+    from benchmarks.fakes import fake_backends
+    from services.mail_processing.mail_processor import MailProcessorService
+
+    reservation = ParsedReservation(confirmation_code="HM1", host_payout=None)
+    with fake_backends([]):
+        service = MailProcessorService()
+        with pytest.raises(ValueError, match="'host_payout' is missing"):
+            service.quality_check([reservation])
+        reservation.host_payout = 0.0
+        service.quality_check([reservation])
+
+
+def test_unparsable_amount_is_reported_not_zeroed():
+    body = ENGLISH_SAMPLE["Message_body"].replace(
+        "Cleaning fee\r\n\r\n€ 65.00", "Cleaning fee\r\n\r\n€ 6.5.0"
+    )
+    mail = {**ENGLISH_SAMPLE, "Message_body": body}
+    with pytest.warns(UserWarning) as record:
+        reservation = Parser(mail).parse_reservation()
+    messages = [str(warning.message) for warning in record]
+    assert "cleaning_fee: unparsable amount '6.5.0'" in messages
+    assert reservation.cleaning_fee is None
+
+
+def test_extraction_time_budget_returns_a_partial_result(monkeypatch):
+    class SlowPattern:
+        def search(self, body):
+            time.sleep(0.02)
+
+    patterns = Parser.get_language_patterns("en")
+    patterns["arrival_date"] = SlowPattern()
+    monkeypatch.setattr(
+        Parser, "get_language_patterns", staticmethod(lambda language: patterns)
+    )
+
+    parser = Parser(ENGLISH_SAMPLE, time_budget=0.01)
+    with pytest.warns(UserWarning) as record:
+        reservation = parser.parse_reservation()
+    messages = [str(warning.message) for warning in record]
+    assert any("time budget of 0.01s exceeded" in message for message in messages)
+    assert parser.is_partial
+    assert "host_payout" in parser.skipped_fields
+    # The confirmation code is searched first.
+    assert reservation.confirmation_code == "HM5A8PDQY9"
+    assert reservation.host_payout is None
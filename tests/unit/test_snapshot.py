@@ -0,0 +1,70 @@
+import pytest
+
+pytest.importorskip("pandas")
+pytest.importorskip("pyarrow")
+
+from benchmarks.fakes import FakeNotionClient  # noqa: E402
+from services.dataviz.src import snapshot  # noqa: E402
+from services.notion_client.notion_api_client import NotionClient  # noqa: E402
+
+
+@pytest.fixture
+def notion(monkeypatch):
+    monkeypatch.setenv("NOTION_API", "dummy")
+    monkeypatch.setenv("DATABASE_ID", "db")
+    fake = FakeNotionClient()
+    monkeypatch.setattr(
+        "services.notion_client.notion_api_client.get_notion_client",
+        lambda token: fake,
+    )
+    client = NotionClient()
+    client.create_page(
+        name="Alice",
+        confirmation_code="HM1",
+        arrival_date="2024-06-01",
+        host_payout=100.0,
+    )
+    client.create_page(
+        name="Bob",
+        confirmation_code="HM2",
+        arrival_date="2024-07-01",
+        host_payout=200.0,
+    )
+    return client
+
+
+def test_snapshot_round_trip_keeps_types_and_metadata(tmp_path, notion):
+    store = snapshot.SnapshotStore(str(tmp_path / "reservations.parquet"))
+    frame = snapshot.sync_reservations(notion, store)
+
+    loaded = store.load()
+    assert loaded.last_sync.endswith("+00:00")
+    assert loaded.frame["Host Payout"].tolist() == [100.0, 200.0]
+    assert loaded.frame["Arrival Date"].dtype == frame["Arrival Date"].dtype
+
+
+def test_delta_sync_only_fetches_edited_pages(tmp_path, notion):
+    store = snapshot.SnapshotStore(str(tmp_path / "reservations.parquet"))
+    snapshot.sync_reservations(notion, store)
+    # Pretend the snapshot is old, only Bob's row is edited afterwards.
+    old = store.load()
+    store.save(old.frame, "2000-01-01T00:00:00+00:00")
+    for page in notion.client.rows.values():
+        page["last_edited_time"] = "1999-01-01T00:00:00+00:00"
+    bob = notion.get_pages_by_reservation_codes(["HM2"])["HM2"]
+    notion._update(bob["id"], properties={"Host Payout": {"number": 250.0}})
+
+    frame = snapshot.sync_reservations(notion, store)
+
+    assert sorted(frame["Host Payout"].tolist()) == [100.0, 250.0]
+    assert len(frame) == 2
+    queries = notion.client.calls["databases.query"]
+    assert queries == 3  # full sync, code lookup, delta
+
+
+def test_snapshot_with_other_schema_version_is_ignored(tmp_path, notion, monkeypatch):
+    store = snapshot.SnapshotStore(str(tmp_path / "reservations.parquet"))
+    snapshot.sync_reservations(notion, store)
+    monkeypatch.setattr(snapshot, "SNAPSHOT_SCHEMA_VERSION", 3)
+    with pytest.warns(UserWarning, match="schema version '2'"):
+        assert store.load() is None
@@ -0,0 +1,131 @@
+import json
+
+import httplib2
+import pytest
+from googleapiclient.errors import HttpError
+
+from services.telemetry import tracer as tracer_module
+from services.telemetry.tracer import Tracer, traced_execute
+
+
+class DummyRequest:
+    def __init__(self, response):
+        self.response = response
+
+    def execute(self):
+        return self.response
+
+
+def test_nested_spans_share_trace_and_parent():
+    tracer = Tracer()
+    with tracer.trace("workflow.run") as root:
+        with tracer.span("gmail.messages.list") as child:
+            pass
+    assert child.trace_id == root.trace_id
+    assert child.parent_id == root.span_id
+    assert root.parent_id is None
+    assert len(tracer.trace_spans(root.trace_id)) == 2
+
+
+def test_span_records_errors():
+    tracer = Tracer()
+    with pytest.raises(RuntimeError):
+        with tracer.trace("workflow.run"):
+            with tracer.span("notion.pages.create"):
+                raise RuntimeError("boom")
+    assert [span.status for span in tracer.spans] == ["error", "error"]
+    assert "boom" in tracer.spans[0].error
+
+
+def test_spans_outside_a_trace_are_not_kept():
+    tracer = Tracer()
+    with tracer.span("gmail.labels.list") as span:
+        pass
+    assert span.duration_ns > 0
+    assert tracer.spans == []
+
+
+def test_summary_aggregates_by_name():
+    tracer = Tracer()
+    with tracer.trace("workflow.run") as root:
+        for _ in range(3):
+            with tracer.span("gmail.messages.get") as span:
+                span.set_response({"id": "1"})
+                span.record_retry()
+    rows = {row["name"]: row for row in tracer.summarize(tracer.spans)}
+    assert rows["gmail.messages.get"]["count"] == 3
+    assert rows["gmail.messages.get"]["retries"] == 3
+    assert rows["gmail.messages.get"]["response_bytes"] == 3 * len('{"id": "1"}')
+    tracer.discard(root.trace_id)
+    assert tracer.spans == []
+
+
+def test_traced_execute_records_payload_sizes(monkeypatch):
+    tracer = Tracer()
+    monkeypatch.setattr("services.telemetry.tracer._tracer", tracer)
+    with tracer.trace("workflow.run"):
+        response = traced_execute(
+            "gmail.messages.modify",
+            DummyRequest({"ok": True}),
+            body={"addLabelIds": ["x"]},
+        )
+    assert response == {"ok": True}
+    span = tracer.spans[0]
+    assert span.request_bytes == len(json.dumps({"addLabelIds": ["x"]}))
+    assert span.response_bytes == len(json.dumps({"ok": True}))
+
+
+class FlakyRequest:
+    def __init__(self, statuses):
+        self.statuses = list(statuses)
+        self.attempts = 0
+
+    def execute(self):
+        self.attempts += 1
+        if self.statuses:
+            status = self.statuses.pop(0)
+            raise HttpError(httplib2.Response({"status": status}), b"error")
+        return {"ok": True}
+
+
+def test_traced_execute_retries_server_errors(monkeypatch):
+    tracer = Tracer()
+    monkeypatch.setattr("services.telemetry.tracer._tracer", tracer)
+    monkeypatch.setattr(tracer_module, "RETRY_BACKOFF", 0)
+    with tracer.trace("workflow.run"):
+        request = FlakyRequest([503, 429])
+        assert traced_execute("gmail.messages.get", request) == {"ok": True}
+        assert request.attempts == 3
+
+        request = FlakyRequest([404])
+        with pytest.raises(HttpError):
+            traced_execute("gmail.messages.get", request)
+        assert request.attempts == 1
+    assert [span.retries for span in tracer.spans[:2]] == [2, 0]
+
+
+def test_exports_jsonl_and_otlp(tmp_path):
+    tracer = Tracer()
+    with tracer.trace("workflow.run") as root:
+        with tracer.span("calendar.events.insert", reservation="HM1"):
+            pass
+    spans = tracer.trace_spans(root.trace_id)
+
+    jsonl_path = tmp_path / "trace.jsonl"
+    tracer.export(spans, str(jsonl_path), "jsonl")
+    lines = [json.loads(line) for line in jsonl_path.read_text().splitlines()]
+    assert [line["name"] for line in lines] == [
+        "calendar.events.insert",
+        "workflow.run",
+    ]
+
+    otlp = tracer.to_otlp(spans)
+    otlp_spans = otlp["resourceSpans"][0]["scopeSpans"][0]["spans"]
+    child = otlp_spans[0]
+    assert child["parentSpanId"] == root.span_id
+    assert child["kind"] == 3
+    assert {"key": "reservation", "value": {"stringValue": "HM1"}} in child[
+        "attributes"
+    ]
+    with pytest.raises(ValueError):
+        tracer.export(spans, str(tmp_path / "x"), "csv")
@@ -0,0 +1,138 @@
+import datetime
+
+import pytest
+
+from benchmarks.corpus import build_reservation_mails
+from benchmarks.fakes import fake_backends
+from services.google_integration.gmail_services import GmailService, classify_update
+from services.mail_processing.mail_processor import MailProcessorService
+from services.mail_processing.parser import Parser
+from services.mail_processing.reservation import ReservationPatch
+from services.mail_processing.updates import parse_update
+
+
+@pytest.mark.parametrize(
+    "subject, kind",
+    [
+        ("TR : Réservation annulée : HMABCDEF12", "cancellation"),
+        ("Reservation canceled - Alice", "cancellation"),
+        ("TR : Réservation modifiée pour Alice", "alteration"),
+        ("Reservation altered - Alice arrives Saturday", "alteration"),
+        ("TR : Reservation HMABCDEF12 cancelled", "cancellation"),
+        ("Votre réservation a été modifiée", "alteration"),
+        ("Reservation alteration request from Alice", None),
+        ("TR : Reservation confirmed - Alice", None),
+        ("Update to our cancellation policy", None),
+        ("Modification de nos conditions générales", None),
+        ("Annulation gratuite jusqu'au 1er mai", None),
+        ("Your trip was canceled? Here is what to do", None),
+    ],
+)
+def test_update_mails_are_classified_from_their_subject(subject, kind):
+    assert classify_update(subject) == kind
+
+
+@pytest.mark.parametrize(
+    "mail, kind",
+    [
+        (
+            {
+                "Sender": "Airbnb <automated@airbnb.com>",
+                "Subject": "Reservation canceled",
+            },
+            "cancellation",
+        ),
+        (
+            {
+                "Sender": "Host <host@example.com>",
+                "Subject": "TR : Réservation annulée",
+                "Message_body": "____\r\nDe : Airbnb \r\nEnvoyé : lundi",
+            },
+            "cancellation",
+        ),
+        # Same subject, not from Airbnb.
+        (
+            {"Sender": "news@shop.example", "Subject": "Reservation canceled"},
+            "none",
+        ),
+        (
+            {
+                "Sender": "Airbnb <automated@airbnb.com>",
+                "Subject": "Update to our cancellation policy",
+            },
+            "none",
+        ),
+        (
+            {
+                "Sender": "Host <host@example.com>",
+                "Subject": "TR : Reservation confirmed - Alice (free cancellation)",
+            },
+            "reservation",
+        ),
+    ],
+)
+def test_only_airbnb_update_mails_are_tagged(mail, kind):
+    with fake_backends([]):
+        header = GmailService().parse_reservation_header(mail)
+    assert header["type"] == kind
+
+
+def test_cancellation_patch_takes_the_code_from_the_mail():
+    mail = {
+        "Sender": "automated@airbnb.com",
+        "Subject": "Reservation canceled",
+        "Date": "2025-03-01",
+        "Message_body": "Reservation HMABCDEF12 was canceled by the guest.",
+    }
+    patch = parse_update(Parser(mail), "cancellation")
+    assert patch.confirmation_code == "HMABCDEF12"
+    assert patch.is_cancellation and patch.changes == {}
+    assert patch.mail_date == datetime.date(2025, 3, 1)
+
+    with pytest.raises(ValueError, match="No confirmation code"):
+        parse_update(Parser({**mail, "Message_body": "Canceled."}), "cancellation")
+
+
+def test_patch_json_round_trip():
+    patch = ReservationPatch(
+        kind="alteration",
+        confirmation_code="HMABCDEF12",
+        changes={"arrival_date": datetime.date(2025, 5, 3), "number_of_adults": 3},
+        mail_date=datetime.date(2025, 3, 1),
+        message_id="m1",
+    )
+    assert ReservationPatch.from_json(patch.to_json()) == patch
+
+
+def test_alteration_and_cancellation_update_notion_and_calendar():
+    confirmed = build_reservation_mails(2, french_ratio=0)
+    altered = build_reservation_mails(1, seed=1, french_ratio=0)[0]
+    altered["Subject"] = altered["Subject"].replace("confirmed", "altered")
+    canceled = {
+        **confirmed[1],
+        "Subject": "TR : Reservation canceled",
+        "Message_body": "De : Airbnb \r\nReservation HM00000001 was canceled.",
+    }
+    with fake_backends(confirmed) as backends:
+        MailProcessorService().run_workflow()
+        gmail, notion = backends["gmail"], backends["notion"]
+        for index, mail in enumerate((altered, canceled), start=len(confirmed)):
+            gmail.store[f"msg{index:08d}"] = {
+                "mail": mail,
+                "labelIds": {"INBOX", "UNREAD"},
+            }
+        MailProcessorService().run_workflow()
+
+        pages = {
+            page["properties"]["Confirmation Code"]["rich_text"][0]["plain_text"]: page
+            for page in notion.rows.values()
+        }
+        assert notion.calls["pages.create"] == 2
+        assert notion.calls["pages.update"] == 2
+        assert pages["HM00000001"]["archived"]
+        assert not pages["HM00000000"]["archived"]
+        assert backends["calendar"].calls["events.patch"] == 1
+        assert backends["calendar"].calls["events.delete"] == 1
+        assert all(
+            "UNREAD" not in message["labelIds"] for message in gmail.store.values()
+        )